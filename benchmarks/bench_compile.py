@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Compares interpreted parsing (calling Argument.parse for every argument) with the
+compiled parse function RequestParser.parse_args uses.
+
+Usage: PYTHONPATH=. python benchmarks/bench_compile.py
+"""
+import timeit
+import urllib
+
+from webapp2 import Request
+
+from webapp2_restful.reqparse import RequestParser
+
+__author__ = 'ekampf'
+
+ITERATIONS = 2000
+
+
+def build_parser(arg_count):
+    parser = RequestParser()
+    for i in xrange(arg_count):
+        if i % 4 == 0:
+            parser.add_argument('arg%d' % i, type=int)
+        elif i % 4 == 1:
+            parser.add_argument('arg%d' % i, type=bool)
+        elif i % 4 == 2:
+            parser.add_argument('arg%d' % i, choices=['a', 'b', 'c'], case_sensitive=False, trim=True)
+        else:
+            parser.add_argument('arg%d' % i, location=['params'], action='append')
+
+    return parser
+
+
+def build_request(arg_count):
+    params = []
+    for i in xrange(arg_count):
+        params.append(('arg%d' % i, ['1', 'true', ' B ', 'x'][i % 4]))
+
+    return Request.blank('/bench?' + urllib.urlencode(params))
+
+
+def interpreted_parse(parser, request):
+    results = parser.namespace_class()
+    for arg in parser.args:
+        results[arg.dest or arg.name] = arg.parse(request)
+
+    return results
+
+
+def main():
+    print("%8s %16s %16s %8s" % ('args', 'interpreted/s', 'compiled/s', 'speedup'))
+    for arg_count in (5, 15, 40):
+        parser = build_parser(arg_count)
+        request = build_request(arg_count)
+        parser.compile()
+
+        assert interpreted_parse(parser, request) == parser.parse_args(request)
+
+        interpreted = timeit.timeit(lambda: interpreted_parse(parser, request), number=ITERATIONS)
+        compiled = timeit.timeit(lambda: parser.parse_args(request), number=ITERATIONS)
+        print("%8d %16.0f %16.0f %7.2fx" % (arg_count, ITERATIONS / interpreted, ITERATIONS / compiled, interpreted / compiled))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+Compares DateStringArgument's compiled date formats with datetime.strptime.
+
+Usage: PYTHONPATH=. python benchmarks/bench_dates.py
+"""
+import timeit
+from datetime import datetime
+
+from webapp2_restful.reqparse.arguments import DateStringArgument
+
+__author__ = 'ekampf'
+
+NUMBER = 100000
+
+CASES = [
+    ('%Y-%m-%d', u'2015-07-16'),
+    ('%Y-%m-%dT%H:%M:%S', u'2015-07-16T08:34:57'),
+    ('%Y-%m-%d %H:%M:%S%f', u'2015-07-16 08:34:57700140'),
+    ('%Y-%m-%d', u'2015-7-6'),
+]
+
+
+def main():
+    print("%-24s %-28s %12s %12s %8s" % ('format', 'value', 'strptime/s', 'compiled/s', 'speedup'))
+    for date_format, value in CASES:
+        argument = DateStringArgument(date_format)
+        assert argument(value) == datetime.strptime(value, date_format)
+
+        strptime = timeit.timeit(lambda: datetime.strptime(value, date_format), number=NUMBER)
+        compiled = timeit.timeit(lambda: argument(value), number=NUMBER)
+        print("%-24s %-28r %12.0f %12.0f %7.2fx" % (date_format, value, NUMBER / strptime, NUMBER / compiled, strptime / compiled))
+
+    argument = DateStringArgument(DateStringArgument.ISO8601)
+    iso = timeit.timeit(lambda: argument(u'2015-07-16T08:34:57.7Z'), number=NUMBER)
+    print("%-24s %-28r %12s %12.0f" % ('iso8601', u'2015-07-16T08:34:57.7Z', '-', NUMBER / iso))
+
+
+if __name__ == '__main__':
+    main()
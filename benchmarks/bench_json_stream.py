@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Compares parse_args on JSON bodies carrying a large value the parser doesn't declare (a single
+string blob or a list of small objects), decoding the whole body (the default) and streaming
+only the declared keys (stream_json=True).
+
+Usage: PYTHONPATH=. python benchmarks/bench_json_stream.py
+"""
+import json
+import timeit
+
+from webapp2 import Request
+
+from webapp2_restful.reqparse import RequestParser
+
+__author__ = 'ekampf'
+
+ARGUMENTS = 5
+
+
+def build_parser(stream_json):
+    parser = RequestParser(stream_json=stream_json)
+    for i in xrange(ARGUMENTS):
+        parser.add_argument('arg%d' % i, type=int, location='json')
+
+    return parser
+
+
+def build_request(attachments, size):
+    body = dict(('arg%d' % i, i) for i in xrange(ARGUMENTS))
+    if attachments == 'blob':
+        body['attachments'] = 'x' * size
+    else:
+        body['attachments'] = [{'name': 'file%d' % i, 'data': 'x' * 1024} for i in xrange(size / 1024)]
+
+    return Request.blank('/bench', POST=json.dumps(body), environ={
+        'CONTENT_TYPE': 'application/json',
+    })
+
+
+def main():
+    decoding, streaming = build_parser(False), build_parser(True)
+
+    print("%8s %10s %14s %14s %8s" % ('shape', 'body', 'decode/s', 'stream/s', 'speedup'))
+    for attachments in ('blob', 'list'):
+        for size in (10 * 1024, 1024 * 1024, 8 * 1024 * 1024):
+            request = build_request(attachments, size)
+            number = max(5, 50 * 1024 * 1024 / (size * 10))
+
+            assert decoding.parse_args(request) == streaming.parse_args(request)
+
+            decode = timeit.timeit(lambda: decoding.parse_args(request), number=number)
+            stream = timeit.timeit(lambda: streaming.parse_args(request), number=number)
+            print("%8s %9dK %14.1f %14.1f %7.2fx" % (
+                attachments, size / 1024, number / decode, number / stream, decode / stream))
+
+
+if __name__ == '__main__':
+    main()
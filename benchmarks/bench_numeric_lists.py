@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Compares parsing 10k numeric values as a list of ints (action='append', type=int) with
+NumericListArgument's arrays, for repeated params, comma separated and JSON array values,
+and the memory taken by the results.
+
+Usage: PYTHONPATH=. python benchmarks/bench_numeric_lists.py
+"""
+import json
+import sys
+import timeit
+import urllib
+
+from webapp2 import Request
+
+from webapp2_restful.reqparse import RequestParser
+from webapp2_restful.reqparse.arguments import NumericListArgument
+
+__author__ = 'ekampf'
+
+VALUES = 10000
+ITERATIONS = 50
+
+
+def build_parser(list_type):
+    parser = RequestParser()
+    if list_type:
+        parser.add_argument('ids', type=NumericListArgument(min_value=0))
+    else:
+        parser.add_argument('ids', type=int, action='append')
+
+    return parser
+
+
+def build_requests():
+    ids = range(VALUES)
+    return [
+        ('repeated', Request.blank('/bench?' + urllib.urlencode([('ids', i) for i in ids]))),
+        ('comma', Request.blank('/bench?' + urllib.urlencode({'ids': ','.join(map(str, ids))}))),
+        ('json', Request.blank('/bench', POST=json.dumps({'ids': ids}), environ={
+            'CONTENT_TYPE': 'application/json',
+        })),
+    ]
+
+
+def list_size(values):
+    return sys.getsizeof(values) + sum(sys.getsizeof(value) for value in values)
+
+
+def main():
+    int_parser = build_parser(list_type=False)
+    array_parser = build_parser(list_type=True)
+
+    print("%d values:" % VALUES)
+    print("%10s %14s %14s %8s" % ('encoding', 'int list/s', 'array/s', 'speedup'))
+    for encoding, request in build_requests():
+        array_seconds = timeit.timeit(lambda: array_parser.parse_args(request), number=ITERATIONS)
+        if encoding == 'repeated':
+            list_seconds = timeit.timeit(lambda: int_parser.parse_args(request), number=ITERATIONS)
+            print("%10s %14.1f %14.1f %7.2fx" % (encoding, ITERATIONS / list_seconds, ITERATIONS / array_seconds,
+                                                 list_seconds / array_seconds))
+        else:
+            # An int argument can't parse these encodings, they're only supported by NumericListArgument
+            print("%10s %14s %14.1f %8s" % (encoding, '-', ITERATIONS / array_seconds, '-'))
+
+    request = build_requests()[0][1]
+    print("Result size:")
+    print("  int list: %7d bytes" % list_size(int_parser.parse_args(request).ids))
+    print("  array:    %7d bytes" % sys.getsizeof(array_parser.parse_args(request).ids))
+
+
+if __name__ == '__main__':
+    main()
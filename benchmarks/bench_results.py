@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the memory footprint and attribute access time of Namespace and Record parse
+results, and the size of a slotted Argument.
+
+Usage: PYTHONPATH=. python benchmarks/bench_results.py
+"""
+import sys
+import timeit
+
+from webapp2_restful.reqparse import Argument, Namespace, Record
+
+__author__ = 'ekampf'
+
+FIELDS = 20
+ACCESSES = 1000000
+
+RESULTS = {}
+
+
+def sizeof(obj):
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+
+    return size
+
+
+def main():
+    fields = ['field%d' % i for i in xrange(FIELDS)]
+    namespace = Namespace((field, i) for i, field in enumerate(fields))
+    record = Record.for_fields(fields)(*range(FIELDS))
+
+    print("Result object size (%d fields):" % FIELDS)
+    print("  Namespace: %5d bytes" % sizeof(namespace))
+    print("  Record:    %5d bytes" % sizeof(record))
+    print("Argument size: %d bytes" % sizeof(Argument('foo')))
+
+    RESULTS.update(Namespace=namespace, Record=record)
+    print("Attribute access (%d reads):" % ACCESSES)
+    for name in ('Namespace', 'Record'):
+        setup = 'from __main__ import RESULTS; result = RESULTS[%r]' % name
+        seconds = timeit.timeit('result.field10', setup=setup, number=ACCESSES)
+        print("  %-10s %6.1f ns/read" % (name + ':', seconds * 1e9 / ACCESSES))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Compares matching paths with webapp2's router trying each ResourceRoute's routes in turn and
+with a RadixRoute over the same resources.
+
+Usage: PYTHONPATH=. python benchmarks/bench_routes.py
+"""
+import timeit
+
+import webapp2
+
+from webapp2_restful.routes import ResourceRoute, RadixRoute
+
+__author__ = 'ekampf'
+
+RESOURCES = 150
+NUMBER = 20
+
+
+class Handler(webapp2.RequestHandler):
+    pass
+
+
+def make_routes():
+    return [ResourceRoute('resource%ds' % i, Handler, actions=['search'], member_actions=['history'],
+                          sub_resources=[ResourceRoute('comments', Handler)])
+            for i in xrange(RESOURCES)]
+
+
+def main():
+    linear = webapp2.Router(make_routes())
+    radix = webapp2.Router([RadixRoute(make_routes())])
+    print("%d resources, %d routes" % (RESOURCES, len(linear.match_routes)))
+
+    print("%-36s %12s %12s %8s" % ('path', 'linear/s', 'radix/s', 'speedup'))
+    for path in ('/resource0s', '/resource75s/1/history', '/resource149s/1/comments/2'):
+        request = webapp2.Request.blank(path)
+        assert linear.match(request)[1:] == radix.match(request)[1:]
+
+        linear_time = timeit.timeit(lambda: linear.match(request), number=NUMBER)
+        radix_time = timeit.timeit(lambda: radix.match(request), number=NUMBER)
+        print("%-36s %12.0f %12.0f %7.1fx" % (path, NUMBER / linear_time, NUMBER / radix_time, linear_time / radix_time))
+
+
+if __name__ == '__main__':
+    main()
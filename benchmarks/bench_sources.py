@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Measures parse_args throughput on JSON bodies as the number of arguments and the body
+size grow, comparing per-argument source resolution (Argument.parse, which decodes the
+body once per argument) with the request-scoped sources RequestParser.parse_args uses.
+
+Usage: PYTHONPATH=. python benchmarks/bench_sources.py
+"""
+import json
+import timeit
+
+from webapp2 import Request
+
+from webapp2_restful.reqparse import RequestParser
+
+__author__ = 'ekampf'
+
+
+def build_parser(arg_count):
+    parser = RequestParser()
+    for i in xrange(arg_count):
+        parser.add_argument('arg%d' % i, type=int)
+
+    return parser
+
+
+def build_request(arg_count, body_size):
+    body = dict(('arg%d' % i, i) for i in xrange(arg_count))
+    body['padding'] = 'x' * body_size
+    return Request.blank('/bench', POST=json.dumps(body), environ={
+        'CONTENT_TYPE': 'application/json',
+    })
+
+
+def per_argument_parse(parser, request):
+    results = parser.namespace_class()
+    for arg in parser.args:
+        results[arg.dest or arg.name] = arg.parse(request)
+
+    return results
+
+
+def main():
+    print("%6s %10s %16s %16s %8s" % ('args', 'body', 'per-arg/s', 'shared/s', 'speedup'))
+    for body_size in (1024, 20 * 1024, 200 * 1024):
+        for arg_count in (5, 15, 30):
+            parser = build_parser(arg_count)
+            request = build_request(arg_count, body_size)
+            number = max(10, 2000000 / (body_size * arg_count))
+
+            assert per_argument_parse(parser, request) == parser.parse_args(request)
+
+            per_argument = timeit.timeit(lambda: per_argument_parse(parser, request), number=number)
+            shared = timeit.timeit(lambda: parser.parse_args(request), number=number)
+            print("%6d %9dK %16.0f %16.0f %7.2fx" % (
+                arg_count, body_size / 1024, number / per_argument, number / shared, per_argument / shared))
+
+
+if __name__ == '__main__':
+    main()
@@ -20,3 +20,43 @@ class TestBase64Argument(unittest.TestCase):
         expected = "I'm a value"
         result = self.target(base64.urlsafe_b64encode(expected))
         self.assertEqual(expected, result)
+
+    def test_unpaddedValue_returnsDecodedValue(self):
+        for expected in ("", "a", "ab", "abc", "I'm a value"):
+            self.assertEqual(expected, self.target(base64.urlsafe_b64encode(expected).rstrip('=')))
+
+    def test_partialPadding_raisesValueError(self):
+        with self.assertRaises(ValueError):
+            self.target("YQ=")
+
+    def test_urlSafeCharacters_returnsDecodedValue(self):
+        expected = '\xfb\xff\xfe' * 10
+        encoded = base64.urlsafe_b64encode(expected)
+        self.assertIn('-', encoded)
+
+        self.assertEqual(expected, self.target(encoded))
+        self.assertEqual(expected, self.target(unicode(encoded)))
+        self.assertEqual(expected, self.target(bytearray(encoded)))
+        self.assertEqual(expected, self.target(memoryview(encoded)))
+        self.assertEqual(expected, self.target(memoryview(encoded.rstrip('='))))
+
+    def test_maxSize_largerValue_raisesValueError(self):
+        target = Base64StringArgument(max_size=10)
+        self.assertEqual('x' * 10, target(base64.urlsafe_b64encode('x' * 10)))
+        with self.assertRaises(ValueError):
+            target(base64.urlsafe_b64encode('x' * 11))
+
+    def test_resultType(self):
+        encoded = base64.urlsafe_b64encode("I'm a value")
+
+        result = Base64StringArgument(result_type=bytearray)(encoded)
+        self.assertIsInstance(result, bytearray)
+        self.assertEqual(bytearray("I'm a value"), result)
+
+        result = Base64StringArgument(result_type=memoryview)(encoded)
+        self.assertIsInstance(result, memoryview)
+        self.assertEqual("I'm a value", result.tobytes())
+
+    def test_invalidResultType_raisesValueError(self):
+        with self.assertRaises(ValueError):
+            Base64StringArgument(result_type=list)
@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 import unittest
+from datetime import datetime
 
-from webapp2_restful.reqparse.arguments import DateStringArgument
+from webapp2_restful.reqparse.arguments import DateStringArgument, compile_date_format
 
 __author__ = 'ekampf'
 
@@ -15,3 +16,55 @@ class TestDateStringArgument(unittest.TestCase):
         self.assertEqual(dt.day, 16)
         self.assertEqual(dt.hour, 8)
         self.assertEqual(dt.minute, 34)
+
+    def test_compiledFormats_agreeWithStrptime(self):
+        cases = [
+            ('%Y-%m-%d', ['2015-07-16', '2015-7-6', '2015-02-30', '2015-13-01', '15-07-16', '2015-07-16x', '2015/07/16',
+                          u'2015-07-16', u'٢015-07-16']),
+            ('%Y-%m-%dT%H:%M:%S', ['2015-07-16T08:34:57', '2015-07-16t08:34:57', '2015-07-16T24:00:00',
+                                   '2015-07-16T8:4:5', '2015-07-16T08:34:60']),
+            ('%d/%m/%Y %H:%M', ['16/07/2015 08:34', '16/07/2015   08:34', ' 6/07/2015 08:34', '16/07/2015']),
+            ('%Y-%m-%d %H:%M:%S.%f', ['2015-07-16 08:34:57.7', '2015-07-16 08:34:57.700140', '2015-07-16 08:34:57.']),
+            ('%Y%%%m', ['2015%07', '2015%7', '201507']),
+            ('%b %d %Y', ['Jul 16 2015', 'Foo 16 2015']),
+            # Literal characters that are also directive letters
+            ('%Hh%Mm', ['14h30m', '14h3012', '14H30M', '14h30']),
+            ('%%Y%Y', ['%Y2015', '%05110511', '%y2015']),
+            ('%Y/m/d', ['2015/m/d', '2015/07/16', '2015/M/D']),
+            ('%Y-%m-%dT%H:%M:%SZ', ['2015-07-16T08:34:57Z', '2015-07-16T08:34:5712']),
+        ]
+
+        for date_format, values in cases:
+            parse = compile_date_format(date_format)
+            for value in values:
+                try:
+                    expected = datetime.strptime(value, date_format)
+                except ValueError:
+                    self.assertRaises(ValueError, parse, value)
+                else:
+                    self.assertEqual(expected, parse(value), (date_format, value))
+
+    def test_iso8601(self):
+        target = DateStringArgument(DateStringArgument.ISO8601)
+        self.assertEqual(datetime(2015, 7, 16), target('2015-07-16'))
+        self.assertEqual(datetime(2015, 7, 16, 8, 34), target('2015-07-16T08:34'))
+        self.assertEqual(datetime(2015, 7, 16, 8, 34, 57, 700000), target('2015-07-16T08:34:57.7Z'))
+        self.assertEqual(datetime(2015, 7, 16, 6, 4, 57), target('2015-07-16T08:34:57+02:30'))
+        self.assertEqual(datetime(2015, 7, 16, 10, 34, 57), target('2015-07-16T08:34:57-0200'))
+        self.assertRaises(ValueError, target, '2015-07-16T08')
+        self.assertRaises(ValueError, target, '2015-02-30')
+
+    def test_epoch(self):
+        target = DateStringArgument(DateStringArgument.EPOCH)
+        self.assertEqual(datetime(2015, 7, 16, 8, 34, 57), target('1437035697'))
+        self.assertEqual(datetime(2015, 7, 16, 8, 34, 57, 500000), target('1437035697.5'))
+        self.assertRaises(ValueError, target, 'yesterday')
+
+    def test_multipleFormats_learnsOrder(self):
+        target = DateStringArgument(['%Y-%m-%d', DateStringArgument.ISO8601, DateStringArgument.EPOCH])
+
+        self.assertEqual(datetime(2015, 7, 16, 8, 34, 57), target('1437035697'))
+        self.assertEqual(DateStringArgument.EPOCH, target._parsers[0][0])
+        self.assertEqual(datetime(2015, 7, 16), target('2015-07-16'))
+        self.assertEqual('%Y-%m-%d', target._parsers[0][0])
+        self.assertRaises(ValueError, target, 'yesterday')
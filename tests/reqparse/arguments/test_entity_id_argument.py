@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+import base64
+import pickle
+import unittest
+from mock import patch
+
+from webapp2 import Request
+
+from webapp2_restful.reqparse import RequestParser, MissingParameterError
+from webapp2_restful.cache import LocalMemcache
+from webapp2_restful.reqparse import arguments_ndb
+from webapp2_restful.reqparse.arguments_ndb import EntityCache, EntityIDArgument, EntityLongIDArgument
+
+__author__ = 'ekampf'
+
+
+class InMemoryClient(object):
+    """A stand-in for the ndb client that stores entities in a dict and records get_multi calls"""
+    def __init__(self, entities=None):
+        self.entities = entities or {}
+        self.get_multi_calls = []
+
+    def key(self, kind, entity_id):
+        return kind, entity_id
+
+    def get_multi(self, keys):
+        self.get_multi_calls.append(list(keys))
+        return [self.entities.get(key) for key in keys]
+
+
+class TestEntityIDArgument(unittest.TestCase):
+    def setUp(self):
+        self.client = InMemoryClient(dict(
+            (('Photo', str(i)), 'photo%d' % i) for i in xrange(100)
+        ))
+        self.client.entities[('User', 'u1')] = 'user1'
+        self.client.entities[('Store', 7L)] = 'store7'
+
+    def test_call_fetchesSingleEntity(self):
+        target = EntityIDArgument('User', client=self.client)
+        self.assertEqual('user1', target('u1'))
+        self.assertEqual([[('User', 'u1')]], self.client.get_multi_calls)
+
+    def test_call_keyOnly_doesNotFetch(self):
+        target = EntityIDArgument('User', key_only=True, client=self.client)
+        self.assertEqual(('User', 'u1'), target('u1'))
+        self.assertEqual([], self.client.get_multi_calls)
+
+    def test_call_base64(self):
+        target = EntityIDArgument('User', is_base64=True, client=self.client)
+        self.assertEqual('user1', target(base64.urlsafe_b64encode('u1')))
+
+    def test_call_longId(self):
+        target = EntityLongIDArgument('Store', client=self.client)
+        self.assertEqual('store7', target('7'))
+
+    def testRequestParser_parse_fetchesAllEntitiesInOneBatch(self):
+        parser = RequestParser()
+        parser.add_argument('user_id', dest='user', type=EntityIDArgument('User', client=self.client))
+        parser.add_argument('store_id', dest='store', type=EntityLongIDArgument('Store', client=self.client))
+        parser.add_argument('photo_ids', dest='photos', action='append', type=EntityIDArgument('Photo', client=self.client))
+        parser.add_argument('photo_id', dest='photo_key', type=EntityIDArgument('Photo', key_only=True, client=self.client))
+        parser.add_argument('limit', type=int)
+
+        query = '&'.join('photo_ids=%d' % i for i in xrange(50))
+        args = parser.parse_args(Request.blank('/?user_id=u1&store_id=7&photo_id=3&limit=5&' + query))
+
+        self.assertEqual('user1', args.user)
+        self.assertEqual('store7', args.store)
+        self.assertEqual(['photo%d' % i for i in xrange(50)], args.photos)
+        self.assertEqual(('Photo', '3'), args.photo_key)
+        self.assertEqual(5, args.limit)
+        self.assertEqual(1, len(self.client.get_multi_calls))
+        self.assertEqual(52, len(self.client.get_multi_calls[0]))
+
+    def testRequestParser_parse_missingEntity(self):
+        parser = RequestParser()
+        parser.add_argument('user_id', dest='user', type=EntityIDArgument('User', client=self.client))
+        parser.add_argument('owner_id', dest='owner', required=True, type=EntityIDArgument('User', client=self.client))
+
+        self.assertIsNone(parser.parse_args(Request.blank('/?user_id=nope&owner_id=u1')).user)
+        self.assertRaises(MissingParameterError, parser.parse_args, Request.blank('/?user_id=u1&owner_id=nope'))
+
+    def testRequestParser_parse_noEntityIds_doesNotFetch(self):
+        parser = RequestParser()
+        parser.add_argument('user_id', dest='user', type=EntityIDArgument('User', client=self.client))
+
+        self.assertIsNone(parser.parse_args(Request.blank('/')).user)
+        self.assertEqual([], self.client.get_multi_calls)
+
+    def testRequestParser_parse_separateClients_separateBatches(self):
+        other_client = InMemoryClient({('User', 'u2'): 'user2'})
+        parser = RequestParser()
+        parser.add_argument('a', type=EntityIDArgument('User', client=self.client))
+        parser.add_argument('b', type=EntityIDArgument('User', client=other_client))
+
+        args = parser.parse_args(Request.blank('/?a=u1&b=u2'))
+        self.assertEqual(dict(a='user1', b='user2'), args)
+        self.assertEqual(1, len(self.client.get_multi_calls))
+        self.assertEqual(1, len(other_client.get_multi_calls))
+
+
+class StubNDB(object):
+    """A stand-in for the ndb module, backed by an InMemoryClient"""
+    def __init__(self, client):
+        self.client = client
+
+    @staticmethod
+    def Key(kind, entity_id):  # pylint: disable=C0103
+        return kind, entity_id
+
+    def get_multi(self, keys):
+        return self.client.get_multi(keys)
+
+
+class TestDefaultClient(unittest.TestCase):
+    def test_defaultClients_batchedTogether(self):
+        client = InMemoryClient({('User', u'u1'): 'user1', ('Store', 7L): 'store7'})
+        with patch.object(arguments_ndb, 'ndb', StubNDB(client)), patch.object(arguments_ndb, '_default_client', None):
+            parser = RequestParser()
+            parser.add_argument('user_id', dest='user', type=EntityIDArgument('User'))
+            parser.add_argument('store_id', dest='store', type=EntityLongIDArgument('Store'))
+
+            self.assertEqual(dict(user='user1', store='store7'), parser.parse_args(Request.blank('/?user_id=u1&store_id=7')))
+
+        self.assertEqual(1, len(client.get_multi_calls))
+        self.assertEqual(set([('User', u'u1'), ('Store', 7L)]), set(client.get_multi_calls[0]))
+
+
+class TestEntityCache(unittest.TestCase):
+    def setUp(self):
+        self.client = InMemoryClient({('User', 'u1'): 'user1', ('User', 'u2'): 'user2'})
+        self.backend = LocalMemcache()
+        self.cache = EntityCache(ttl=60, negative_ttl=10, backend=self.backend)
+        self.target = EntityIDArgument('User', client=self.client, cache=self.cache)
+
+    def test_call_cachesEntitiesLocally(self):
+        self.assertEqual('user1', self.target('u1'))
+        self.assertEqual('user1', self.target('u1'))
+
+        self.assertEqual(1, len(self.client.get_multi_calls))
+        self.assertEqual(dict(local_hits=1, backend_hits=0, negative_hits=0, misses=1, hits=1), self.cache.stats)
+
+    def test_call_returnsCopiesOfCachedEntities(self):
+        self.client.entities[('User', 'u3')] = dict(name='user3')
+        user = self.target('u3')
+        user['name'] = 'changed'
+
+        self.assertEqual(dict(name='user3'), self.target('u3'))
+        self.assertIsNot(self.target('u3'), self.target('u3'))
+
+        cache = EntityCache(copy_entities=False)
+        target = EntityIDArgument('User', client=self.client, cache=cache)
+        self.assertIs(target('u3'), target('u3'))
+
+    def test_call_missingIdsCachedNegatively(self):
+        self.assertIsNone(self.target('nope'))
+        self.assertIsNone(self.target('nope'))
+
+        self.assertEqual(1, len(self.client.get_multi_calls))
+        self.assertEqual(1, self.cache.negative_hits)
+
+    def test_call_negativeCachingDisabled(self):
+        cache = EntityCache(negative_ttl=0)
+        target = EntityIDArgument('User', client=self.client, cache=cache)
+        self.assertIsNone(target('nope'))
+        self.assertIsNone(target('nope'))
+
+        self.assertEqual(2, len(self.client.get_multi_calls))
+
+    def test_call_secondTierBackend(self):
+        self.target('u1')
+        self.target('nope')
+        self.cache.local.clear()
+
+        self.assertEqual('user1', self.target('u1'))
+        self.assertIsNone(self.target('nope'))
+        self.assertEqual(2, len(self.client.get_multi_calls))
+        self.assertEqual(2, self.cache.backend_hits)
+
+    def test_missingMarker_picklesToSingleton(self):
+        from webapp2_restful.reqparse import arguments_ndb
+        self.assertIs(arguments_ndb._MISSING, pickle.loads(pickle.dumps(arguments_ndb._MISSING)))
+
+    def test_deleteMulti_invalidates(self):
+        self.target('u1')
+        self.cache.delete_multi([('User', 'u1')])
+        self.client.entities[('User', 'u1')] = 'user1-updated'
+
+        self.assertEqual('user1-updated', self.target('u1'))
+
+    def testRequestParser_parse_fetchesOnlyUncachedEntities(self):
+        self.target('u1')
+
+        parser = RequestParser()
+        parser.add_argument('ids', action='append', type=self.target)
+        args = parser.parse_args(Request.blank('/?ids=u1&ids=u2&ids=nope'))
+
+        self.assertEqual(['user1', 'user2'], args.ids)
+        self.assertEqual([[('User', 'u2'), ('User', 'nope')]], self.client.get_multi_calls[1:])
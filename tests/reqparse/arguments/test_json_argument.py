@@ -2,7 +2,7 @@
 import unittest
 
 import json, jsonschema
-from webapp2_restful.reqparse.arguments import JSONArgument
+from webapp2_restful.reqparse.arguments import JSONArgument, compile_fast_validator, get_schema_validator
 
 __author__ = 'ekampf'
 
@@ -58,3 +58,70 @@ class TestJSONArgument(unittest.TestCase):
         target = JSONArgument(schema=schema)
         with self.assertRaises(jsonschema.ValidationError):
             target(obj_json)
+
+    def test_schema_validatorSharedBetweenArguments(self):
+        schema = {'type': 'object', 'properties': {'id': {'type': 'number'}}}
+        same_schema = {'properties': {'id': {'type': 'number'}}, 'type': 'object'}
+
+        self.assertIs(get_schema_validator(schema), get_schema_validator(same_schema))
+        self.assertEqual(JSONArgument(schema=schema)._validate, JSONArgument(schema=same_schema)._validate)
+
+    def test_invalidSchema_schemaErrorOnConstruction(self):
+        with self.assertRaises(jsonschema.SchemaError):
+            JSONArgument(schema={'type': 'not-a-type'})
+
+    def test_fastValidation_usedForSupportedSchema(self):
+        target = JSONArgument(schema=self.FAST_SCHEMA, fast_validation=True)
+        self.assertNotEqual(get_schema_validator(self.FAST_SCHEMA).validate, target._validate)
+
+        obj = {'id': 1, 'name': 'Jenna', 'tags': ['a', 'b'], 'kind': 'photo'}
+        self.assertEqual(obj, target(json.dumps(obj)))
+
+    def test_fastValidation_unsupportedSchema_fallsBackToJsonschema(self):
+        schema = {'type': 'string', 'pattern': '^[a-z]+$'}
+        target = JSONArgument(schema=schema, fast_validation=True)
+
+        self.assertEqual(get_schema_validator(schema).validate, target._validate)
+        with self.assertRaises(jsonschema.ValidationError):
+            target(json.dumps('ABC'))
+
+    def test_fastValidation_agreesWithJsonschema(self):
+        validate = compile_fast_validator(self.FAST_SCHEMA)
+        instances = [
+            {'id': 1, 'name': 'Jenna'},
+            {'id': 1},
+            {'id': '1', 'name': 'Jenna'},
+            {'id': True, 'name': 'Jenna'},
+            {'id': 1, 'name': ''},
+            {'id': 1, 'name': 'x' * 11},
+            {'id': -1, 'name': 'Jenna'},
+            {'id': 1, 'name': 'Jenna', 'tags': []},
+            {'id': 1, 'name': 'Jenna', 'tags': ['a', 1]},
+            {'id': 1, 'name': 'Jenna', 'kind': 'video'},
+            {'id': 1, 'name': 'Jenna', 'extra': 1},
+            [],
+            None,
+        ]
+
+        for instance in instances:
+            expected_valid = jsonschema.Draft4Validator(self.FAST_SCHEMA).is_valid(instance)
+            try:
+                validate(instance)
+                valid = True
+            except jsonschema.ValidationError:
+                valid = False
+
+            self.assertEqual(expected_valid, valid, instance)
+
+    FAST_SCHEMA = {
+        'type': 'object',
+        'title': 'photo',
+        'required': ['id', 'name'],
+        'additionalProperties': False,
+        'properties': {
+            'id': {'type': 'integer', 'minimum': 0},
+            'name': {'type': 'string', 'minLength': 1, 'maxLength': 10},
+            'tags': {'type': 'array', 'minItems': 1, 'items': {'type': 'string'}},
+            'kind': {'enum': ['photo', 'album']},
+        }
+    }
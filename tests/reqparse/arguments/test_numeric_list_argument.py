@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import array
+import json
+import unittest
+
+from webapp2 import Request
+
+from webapp2_restful.reqparse import RequestParser, InvalidParameterValue, MissingParameterError
+from webapp2_restful.reqparse.arguments import NumericListArgument
+
+__author__ = 'ekampf'
+
+
+class TestNumericListArgument(unittest.TestCase):
+    def setUp(self):
+        self.target = NumericListArgument()
+
+    def test_encodings_returnArray(self):
+        expected = array.array('l', [1, 2, 3])
+        self.assertEqual(expected, self.target.convert_values(['1', '2', '3']))
+        self.assertEqual(expected, self.target.convert_values(['1,2, 3']))
+        self.assertEqual(expected, self.target.convert_values(['[1, 2, 3]']))
+        self.assertEqual(expected, self.target.convert_values([[1, 2, 3]]))
+        self.assertEqual(expected, self.target.convert_values([['1', '2', '3']]))
+        self.assertEqual(expected, self.target('1,2,3'))
+
+    def test_floatTypecode(self):
+        self.assertEqual(array.array('d', [1.5, 2.0]), NumericListArgument('d').convert_values(['1.5,2']))
+
+    def test_emptyValue_returnsEmptyArray(self):
+        self.assertEqual(array.array('l'), self.target.convert_values(['']))
+
+    def test_invalidValues_raiseValueError(self):
+        for values in (['1.5'], ['a'], ['1,,2'], ['true'], [[True]], ['{}'], [[None]], ['99999999999999999999999']):
+            with self.assertRaises(ValueError):
+                self.target.convert_values(values)
+
+    def test_bounds(self):
+        with self.assertRaises(ValueError):
+            NumericListArgument('B').convert_values(['256'])
+
+        with self.assertRaises(ValueError):
+            NumericListArgument(min_value=0).convert_values(['1,-1'])
+
+        with self.assertRaises(ValueError):
+            NumericListArgument(max_value=10).convert_values(['1,11'])
+
+        self.assertEqual(array.array('l', [0, 10]), NumericListArgument(min_value=0, max_value=10)('0,10'))
+
+    def test_choices(self):
+        target = NumericListArgument(choices=[1, 2])
+        self.assertEqual(array.array('l', [2, 1, 2]), target('2,1,2'))
+        with self.assertRaises(ValueError):
+            target('1,3')
+
+    def test_maxLength(self):
+        target = NumericListArgument(max_length=2)
+        self.assertEqual(array.array('l', [1, 2]), target('1,2'))
+
+        for values in (['1,2,3'], ['1', '2', '3'], [[1, 2, 3]]):
+            with self.assertRaises(ValueError):
+                target.convert_values(values)
+
+    def test_invalidTypecode_raisesValueError(self):
+        with self.assertRaises(ValueError):
+            NumericListArgument('c')
+
+    def test_parser_repeatedParams(self):
+        parser = RequestParser()
+        parser.add_argument('ids', type=NumericListArgument(), location='params')
+        request = Request.blank('/bubble?ids=1&ids=2,3')
+
+        self.assertEqual(array.array('l', [1, 2, 3]), parser.parse_args(request).ids)
+        self.assertEqual(array.array('l', [1, 2, 3]), parser.args[0].parse(request))
+
+    def test_parser_jsonBody(self):
+        parser = RequestParser()
+        parser.add_argument('ids', type=NumericListArgument('d'), location='json')
+        request = Request.blank('/bubble', POST=json.dumps({'ids': [1, 2.5]}),
+                                environ={'CONTENT_TYPE': 'application/json'})
+
+        self.assertEqual(array.array('d', [1, 2.5]), parser.parse_args(request).ids)
+
+    def test_parser_invalidValues_raisesInvalidParameterValue(self):
+        parser = RequestParser()
+        parser.add_argument('ids', type=NumericListArgument(), location='params')
+        request = Request.blank('/bubble?ids=1&ids=x')
+
+        with self.assertRaises(InvalidParameterValue):
+            parser.parse_args(request)
+
+        with self.assertRaises(InvalidParameterValue):
+            parser.args[0].parse(request)
+
+    def test_parser_missingValues(self):
+        parser = RequestParser()
+        parser.add_argument('ids', type=NumericListArgument(), location='params', default=())
+        parser.add_argument('required_ids', type=NumericListArgument(), location='params', required=True)
+
+        with self.assertRaises(MissingParameterError):
+            parser.parse_args(Request.blank('/bubble'))
+
+        self.assertEqual((), parser.parse_args(Request.blank('/bubble?required_ids=1')).ids)
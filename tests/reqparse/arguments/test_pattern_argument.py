@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import re
+import unittest
+
+from webapp2_restful.reqparse.arguments import (PatternArgument, EmailArgument, UUIDArgument, SlugArgument,
+                                                HexIDArgument, PhoneArgument)
+
+__author__ = 'ekampf'
+
+
+class TestPatternArgument(unittest.TestCase):
+    def test_patternCompiledOnce(self):
+        target = PatternArgument(r'[a-c]+\Z')
+        self.assertTrue(hasattr(target.regex, 'match'))
+        self.assertEqual('abc', target('abc'))
+
+    def test_compiledPattern_used(self):
+        regex = re.compile(r'x+\Z')
+        self.assertIs(regex, PatternArgument(regex).regex)
+
+    def test_noMatch_throwsValueError(self):
+        with self.assertRaises(ValueError):
+            PatternArgument(r'[a-c]+\Z')('abd')
+
+    def test_memo_validValuesRemembered(self):
+        target = PatternArgument(r'[a-c]+\Z', memo_size=2)
+        target('a')
+        target('b')
+        self.assertEqual({'a', 'b'}, set(target._memo))
+
+        target('c')
+        self.assertEqual({'c'}, set(target._memo))
+
+    def test_memo_invalidValuesNotRemembered(self):
+        target = PatternArgument(r'[a-c]+\Z', memo_size=2)
+        with self.assertRaises(ValueError):
+            target('x')
+
+        self.assertEqual({}, target._memo)
+
+    def test_email_keepsEmailRegexAttribute(self):
+        self.assertEqual(EmailArgument.pattern, EmailArgument().email_regex)
+        self.assertEqual(r'.+@x\.com$', EmailArgument(r'.+@x\.com$').email_regex)
+
+    def test_email_memo_returnsLowercase(self):
+        target = EmailArgument(memo_size=10)
+        self.assertEqual('eran@ekampf.com', target('Eran@ekampf.com'))
+        self.assertEqual('eran@ekampf.com', target('ERAN@ekampf.com'))
+
+    def test_uuid(self):
+        target = UUIDArgument()
+        self.assertEqual('1b4e28ba-2fa1-11d2-883f-0016d3cca427', target('1B4E28BA-2FA1-11D2-883F-0016D3CCA427'))
+        self.assertEqual('1b4e28ba2fa111d2883f0016d3cca427', target('1b4e28ba2fa111d2883f0016d3cca427'))
+
+        for value in ('1b4e28ba-2fa111d2-883f-0016d3cca427', '1b4e28ba-2fa1-11d2-883f-0016d3cca42', 'not-a-uuid',
+                      '1b4e28ba-2fa1-11d2-883f-0016d3cca42g'):
+            with self.assertRaises(ValueError):
+                target(value)
+
+    def test_slug(self):
+        target = SlugArgument()
+        self.assertEqual('hello-world-2', target('hello-world-2'))
+
+        for value in ('', 'Hello', 'hello--world', '-hello', 'hello-', 'hello world', 'hello\n'):
+            with self.assertRaises(ValueError):
+                target(value)
+
+    def test_hexID(self):
+        self.assertEqual('deadbeef', HexIDArgument()('DEADBEEF'))
+        self.assertEqual('00ff', HexIDArgument(length=4)('00ff'))
+
+        for target, value in ((HexIDArgument(), ''), (HexIDArgument(), '0xff'), (HexIDArgument(length=4), 'fff')):
+            with self.assertRaises(ValueError):
+                target(value)
+
+    def test_phone(self):
+        target = PhoneArgument()
+        self.assertEqual('+14155552671', target('+1 (415) 555-2671'))
+        self.assertEqual('4155552671', target('415.555.2671'))
+
+        for value in ('+0123456789', '12345', '+1234567890123456', '415-555-CALL'):
+            with self.assertRaises(ValueError):
+                target(value)
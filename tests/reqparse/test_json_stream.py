@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import unittest
+
+from webapp2_restful.reqparse.json_stream import extract_json_keys
+
+__author__ = 'ekampf'
+
+
+class RecordingStream(io.BytesIO):
+    """Records the largest chunk read from it"""
+    max_read = 0
+
+    def read(self, size=-1):
+        data = io.BytesIO.read(self, size)
+        self.max_read = max(self.max_read, len(data))
+        return data
+
+
+class TestExtractJsonKeys(unittest.TestCase):
+    DOCUMENT = {
+        'foo': 1,
+        'bar': {'nested': [1, 2, {'baz': 'qux'}], 'text': u'with "quotes" \\ and braces }]'},
+        'skipped': [{'a': '}'}, [[]], u'אב', None, True, -1.5e3],
+        'text': u'א "x" \\',
+        'null': None,
+        'last': [],
+    }
+
+    def extract(self, document, names, chunk_size):
+        return extract_json_keys(io.BytesIO(document), names, chunk_size=chunk_size)
+
+    def test_onlyNamedKeysExtracted(self):
+        names = {'foo', 'bar', 'text', 'null', 'last', 'missing'}
+        expected = dict((k, v) for k, v in self.DOCUMENT.items() if k in names)
+
+        for document in (json.dumps(self.DOCUMENT), json.dumps(self.DOCUMENT, indent=2, ensure_ascii=False).encode('utf-8')):
+            for chunk_size in (1, 2, 3, 5, 8, 1024):
+                self.assertEqual(expected, self.extract(document, names, chunk_size))
+
+    def test_noNames_returnsEmptyDict(self):
+        self.assertEqual({}, self.extract(json.dumps(self.DOCUMENT), set(), 4))
+
+    def test_emptyObject(self):
+        self.assertEqual({}, self.extract(' { } ', {'foo'}, 1))
+
+    def test_duplicateKeys_lastValueWins(self):
+        self.assertEqual({'foo': 2}, self.extract('{"foo": 1, "foo": 2}', {'foo'}, 3))
+
+    def test_notAnObject_decodedWhole(self):
+        self.assertEqual([1, {'foo': 2}], self.extract('[1, {"foo": 2}]', {'foo'}, 2))
+
+    def test_malformedDocuments_raiseValueError(self):
+        for document in ('', '{', '{"foo"', '{"foo": ', '{"foo": 1', '{"foo": 1,}', '{"foo" 1}', '{foo: 1}',
+                         '{"foo": 1} x', '{"bar": [1, 2}', '{"foo": tru}', '{"bar": "unterminated}'):
+            for chunk_size in (1, 1024):
+                with self.assertRaises(ValueError):
+                    self.extract(document, {'foo'}, chunk_size)
+
+    def test_skippedValues_readInChunks(self):
+        stream = RecordingStream(json.dumps({'blob': 'x' * 100000, 'foo': 1}))
+
+        self.assertEqual({'foo': 1}, extract_json_keys(stream, {'foo'}, chunk_size=1024))
+        self.assertEqual(1024, stream.max_read)
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import unittest
+
+from webapp2 import Request
+
+from webapp2_restful.reqparse import RequestParser, ParseFuture, InvalidParameterValue, MissingParameterError, \
+    BatchedType, is_future
+from webapp2_restful.reqparse.arguments_ndb import EntityIDArgument
+
+__author__ = 'ekampf'
+
+LATENCY = 0.1
+
+
+class ThreadFuture(object):
+    """A future computed on a thread, with ndb's get_result() interface"""
+    def __init__(self, func, *args):
+        self._result = self._error = None
+        self._thread = threading.Thread(target=self._run, args=(func,) + args)
+        self._thread.start()
+
+    def _run(self, func, *args):
+        try:
+            self._result = func(*args)
+        except Exception as error:  # pylint: disable=W0703
+            self._error = error
+
+    def get_result(self):
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class SlowBackend(object):
+    """A stand-in for a datastore client whose every lookup takes latency seconds"""
+    def __init__(self, entities, latency=LATENCY):
+        self.entities = entities
+        self.latency = latency
+        self.calls = 0
+
+    def key(self, kind, entity_id):
+        return kind, entity_id
+
+    def _lookup(self, keys):
+        self.calls += 1
+        time.sleep(self.latency)
+        return [self.entities.get(key) for key in keys]
+
+    def get_multi(self, keys):
+        return self._lookup(keys)
+
+    def get_multi_async(self, keys):
+        future = ThreadFuture(self._lookup, keys)
+        return [ThreadFuture(lambda i=i: future.get_result()[i]) for i in xrange(len(keys))]
+
+    def lookup_async(self, value):
+        return ThreadFuture(lambda: self._lookup([('Thing', value)])[0])
+
+
+class TestParseArgsAsync(unittest.TestCase):
+    ARGUMENTS = 5
+
+    def setUp(self):
+        self.backend = SlowBackend(dict((('Thing', str(i)), 'thing%d' % i) for i in xrange(10)))
+        self.query = '/?' + '&'.join('arg%d=%d' % (i, i) for i in xrange(self.ARGUMENTS))
+
+    def make_parser(self, async_types):
+        parser = RequestParser()
+        for i in xrange(self.ARGUMENTS):
+            if async_types:
+                parser.add_argument('arg%d' % i, type=self.backend.lookup_async)
+            else:
+                parser.add_argument('arg%d' % i, type=lambda value: self.backend.lookup_async(value).get_result())
+        parser.add_argument('count', type=int, default=0)
+
+        return parser
+
+    def test_parseArgsAsync_resolvesArgumentsConcurrently(self):
+        expected = dict(('arg%d' % i, 'thing%d' % i) for i in xrange(self.ARGUMENTS))
+        expected['count'] = 0
+
+        started = time.time()
+        self.assertEqual(expected, self.make_parser(async_types=False).parse_args(Request.blank(self.query)))
+        sync_time = time.time() - started
+
+        started = time.time()
+        future = self.make_parser(async_types=True).parse_args_async(Request.blank(self.query))
+        self.assertIsInstance(future, ParseFuture)
+        self.assertEqual(expected, future.get_result())
+        async_time = time.time() - started
+
+        self.assertGreaterEqual(sync_time, LATENCY * self.ARGUMENTS)
+        self.assertLess(async_time, sync_time / 2)
+
+    def test_parseArgsAsync_synchronousTypes(self):
+        parser = RequestParser()
+        parser.add_argument('foo', type=int)
+        parser.add_argument('bar', action='append', choices=['x', 'y'])
+
+        future = parser.parse_args_async(Request.blank('/?foo=1&bar=x&bar=y'))
+        self.assertEqual(dict(foo=1, bar=['x', 'y']), future.get_result())
+        self.assertTrue(future.done())
+
+        self.assertRaises(InvalidParameterValue, parser.parse_args_async, Request.blank('/?foo=spam'))
+
+    def test_parseArgsAsync_missingRequiredRaisesRightAway(self):
+        parser = RequestParser()
+        parser.add_argument('foo', type=self.backend.lookup_async)
+        parser.add_argument('bar', required=True)
+
+        self.assertRaises(MissingParameterError, parser.parse_args_async, Request.blank('/?foo=1'))
+        self.assertEqual(0, self.backend.calls)
+
+    def test_parseArgsAsync_futureErrorsRaiseInvalidParameterValue(self):
+        def fail(value):
+            raise ValueError('no %s' % value)
+
+        parser = RequestParser()
+        parser.add_argument('foo', type=lambda value: ThreadFuture(fail, value))
+        parser.add_argument('bar', type=lambda value: ThreadFuture(fail, value), ignore=True)
+
+        future = parser.parse_args_async(Request.blank('/?foo=1'))
+        self.assertRaises(InvalidParameterValue, future.get_result)
+        self.assertRaises(InvalidParameterValue, future.get_result)
+
+        future = parser.parse_args_async(Request.blank('/?bar=1'))
+        self.assertEqual(dict(foo=None, bar=None), future.get_result())
+
+    def test_parseArgsAsync_batchedTypesUseResolveBatchAsync(self):
+        parser = RequestParser()
+        parser.add_argument('thing_id', dest='thing', type=EntityIDArgument('Thing', client=self.backend))
+        parser.add_argument('thing_ids', dest='things', action='append', type=EntityIDArgument('Thing', client=self.backend))
+
+        future = parser.parse_args_async(Request.blank('/?thing_id=1&thing_ids=2&thing_ids=3'))
+        self.assertEqual(dict(thing='thing1', things=['thing2', 'thing3']), future.get_result())
+        self.assertEqual(1, self.backend.calls)
+
+    def test_parseArgsAsync_batchedFutureErrorsRaiseInvalidParameterValue(self):
+        def fail(value):
+            raise ValueError('no %s' % value)
+
+        class FailingType(BatchedType):
+            def resolve_batch_async(self, values):
+                return [ThreadFuture(fail, value) if value == 'bad' else value for value in values]
+
+        failing = FailingType()
+        parser = RequestParser()
+        parser.add_argument('foo', type=failing)
+        parser.add_argument('bar', type=failing, action='append', ignore=True)
+
+        future = parser.parse_args_async(Request.blank('/?foo=bad&bar=1'))
+        with self.assertRaises(InvalidParameterValue) as cm:
+            future.get_result()
+        self.assertEqual('foo', cm.exception.argument.name)
+
+        future = parser.parse_args_async(Request.blank('/?foo=1&bar=bad&bar=2'))
+        self.assertEqual(dict(foo='1', bar=['2']), future.get_result())
+
+    def test_isFuture(self):
+        self.assertTrue(is_future(ThreadFuture(int)))
+        self.assertFalse(is_future(1))
+        self.assertFalse(is_future(u'1'))
@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*-
 import json
 import unittest
-from mock import Mock, NonCallableMock
+from mock import Mock, NonCallableMock, patch
 from webapp2 import Request
+from webob.multidict import MultiDict
 
-from webapp2_restful.reqparse import Argument, Namespace, RequestParser, InvalidParameterValue, MissingParameterError
+from webapp2_restful.reqparse import Argument, Namespace, ParseContext, RequestParser, InvalidParameterValue, MissingParameterError, \
+    InvalidRequestBodyError, Interval, Record, LazyNamespace, InvalidChoiceParameterValue
 
 __author__ = 'ekampf'
 
@@ -461,6 +463,49 @@ class TestRequestParserArgument(unittest.TestCase):
         self.assertEquals(args['foo'], 101)
         self.assertEquals(args['bar'], u'baz')
 
+    def testRequestParser_copy_isSnapshot(self):
+        parser = RequestParser()
+        parser.add_argument('foo', type=int)
+        parser_copy = parser.copy()
+        parser.add_argument('bar')
+        parser.replace_argument('foo', type=str)
+
+        self.assertEqual(['foo'], [arg.name for arg in parser_copy.args])
+        self.assertEqual(dict(foo=1), parser_copy.parse_args(Request.blank("/bubble?foo=1&bar=baz")))
+
+    def testRequestParser_copy_modifyingArgumentsDoesNotAffectOriginal(self):
+        base = RequestParser()
+        base.add_argument('page', type=int, default=1)
+
+        parser_copy = base.copy()
+        self.assertIs(base.args[0], parser_copy._args[0])
+
+        parser_copy.args[0].required = True
+        self.assertEqual(dict(page=1), base.parse_args(Request.blank('/bubble')))
+        self.assertRaises(MissingParameterError, parser_copy.parse_args, Request.blank('/bubble'))
+
+    def testRequestParser_freezeCopy_doesNotFreezeOriginal(self):
+        base = RequestParser()
+        base.add_argument('page', type=int, default=1)
+
+        for derived in (base.copy(), base.extend()):
+            derived.freeze()
+            self.assertTrue(all(arg.frozen for arg in derived.args))
+
+        self.assertFalse(base.args[0].frozen)
+        base.args[0].default = 5
+        self.assertEqual(dict(page=5), base.parse_args(Request.blank('/bubble')))
+
+    def testRequestParser_replaceArgument_afterArgsAssignedDirectly(self):
+        parser = RequestParser()
+        parser.add_argument('a')
+        parser.add_argument('b')
+        parser.replace_argument('a', type=int)
+
+        parser.args[1] = Argument('c')
+        parser.replace_argument('c', type=int)
+        self.assertEqual(dict(a=1, c=2), parser.parse_args(Request.blank('/bubble?a=1&c=2')))
+
     def testRequestParser_replace_argument(self):
         req = Request.blank("/bubble?foo=baz")
         parser = RequestParser()
@@ -472,3 +517,802 @@ class TestRequestParserArgument(unittest.TestCase):
         self.assertEquals(args['foo'], u'baz')
 
     # endregion
+
+    # region Compiled parser
+    def testRequestParser_compile_matchesInterpretedParse(self):
+        req = Request.blank("/bubble?foo=1&foo=2&bar=%20BAT%20&baz=t")
+        parser = RequestParser()
+        parser.add_argument('foo', type=int, action='append')
+        parser.add_argument('bar', choices=['bat'], case_sensitive=False, trim=True)
+        parser.add_argument('baz', type=bool, dest='flag')
+        parser.add_argument('missing', default=lambda: 'default')
+
+        expected = dict((arg.dest or arg.name, arg.parse(req)) for arg in parser.args)
+        self.assertEqual(expected, parser.compile()(req))
+        self.assertEqual(dict(foo=[1, 2], bar='bat', flag=True, missing='default'), expected)
+
+    def testRequestParser_compile_isCached(self):
+        parser = RequestParser()
+        parser.add_argument('foo')
+        self.assertIs(parser.compile(), parser.compile())
+
+    def testRequestParser_compile_rebuiltWhenArgsChange(self):
+        req = Request.blank("/bubble?foo=1&bar=2")
+        parser = RequestParser()
+        parser.add_argument('foo', type=int)
+        self.assertEqual(dict(foo=1), parser.parse_args(req))
+
+        parser.add_argument('bar', type=int)
+        self.assertEqual(dict(foo=1, bar=2), parser.parse_args(req))
+
+        parser.args.pop()
+        self.assertEqual(dict(foo=1), parser.parse_args(req))
+
+    def testRequestParser_compile_rebuiltWhenArgumentModified(self):
+        parser = RequestParser()
+        parser.add_argument('foo')
+        self.assertEqual(dict(foo=None), parser.parse_args(Request.blank("/bubble")))
+
+        parser.args[0].required = True
+        self.assertRaises(MissingParameterError, parser.parse_args, Request.blank("/bubble"))
+
+        parser.args[0].dest = 'bar'
+        self.assertEqual(dict(bar=u'1'), parser.parse_args(Request.blank("/bubble?foo=1")))
+        self.assertEqual(dict(bar=u'1'), parser.parse_args_async(Request.blank("/bubble?foo=1")).get_result())
+
+    def testRequestParser_compile_doesNotMutateChoices(self):
+        req = Request.blank("/bubble?foo=BAT")
+        parser = RequestParser()
+        parser.add_argument("foo", choices=["BAT"], case_sensitive=False)
+
+        self.assertEqual('bat', parser.parse_args(req).foo)
+        self.assertEqual(["BAT"], parser.args[0].choices)
+
+    def testRequestParser_compile_usesOverriddenArgumentMethods(self):
+        class UpperArgument(Argument):
+            def convert(self, value):
+                return value.upper()
+
+        req = Request.blank("/bubble?foo=bar")
+        parser = RequestParser(argument_class=UpperArgument)
+        parser.add_argument('foo')
+
+        self.assertEqual('BAR', parser.parse_args(req).foo)
+
+    # endregion
+
+    # region Request-scoped sources
+    def testParseContext_resolve_resolvesLocationOnce(self):
+        req = Mock(['get_json'])
+        req.get_json.return_value = {'foo': 'bar'}
+        context = ParseContext(req)
+
+        self.assertEqual({'foo': 'bar'}, context.resolve('get_json'))
+        self.assertEqual({'foo': 'bar'}, context.resolve('get_json'))
+        self.assertEqual(1, req.get_json.call_count)
+
+    def testParseContext_resolve_missingLocationReturnsNone(self):
+        self.assertIsNone(ParseContext(Mock(['params'])).resolve('foo'))
+
+    def testParseContext_resolve_reraisesCachedError(self):
+        req = Mock(['get_json'])
+        req.get_json.side_effect = ValueError('No JSON object could be decoded')
+        context = ParseContext(req)
+
+        self.assertRaises(ValueError, context.resolve, 'get_json')
+        self.assertRaises(ValueError, context.resolve, 'get_json')
+        self.assertEqual(1, req.get_json.call_count)
+
+    def testRequestParser_parse_decodesJsonBodyOnce(self):
+        req = Request.blank('/', POST=json.dumps(dict(foo=1, bar=2, baz=3)), environ={
+            'CONTENT_TYPE': 'application/json',
+        })
+        req.get_json = Mock(side_effect=lambda: req.json)
+
+        parser = RequestParser()
+        parser.add_argument('foo', type=int, location='get_json')
+        parser.add_argument('bar', type=int, location=['get_json', 'params'])
+        parser.add_argument('baz', type=int, location=('get_json',))
+
+        self.assertEqual(dict(foo=1, bar=2, baz=3), parser.parse_args(req))
+        self.assertEqual(1, req.get_json.call_count)
+
+    def testRequestParser_parse_dictLocationsAreShared(self):
+        req = Request.blank('/bubble?foo=1')
+        overrides = {'foo': '2', 'bar': '3'}
+        parser = RequestParser()
+        parser.add_argument('foo', type=int, location=[overrides, 'params'])
+        parser.add_argument('bar', type=int, location=[overrides])
+
+        self.assertEqual(dict(foo=2, bar=3), parser.parse_args(req))
+
+    # endregion
+
+    # region Type calling conventions
+    def test_convert_builtinTypesUseFastConverters(self):
+        self.assertIs(Argument('foo', type=int)._converter, int)
+        self.assertIs(Argument('foo', type=float)._converter, float)
+        self.assertIs(Argument('foo')._converter, unicode)
+
+    def test_convert_oneArgumentFunction_calledWithValueOnly(self):
+        calls = []
+        arg = Argument('foo', type=lambda value: calls.append(value) or value)
+
+        self.assertEqual('bar', arg.convert('bar'))
+        self.assertEqual(['bar'], calls)
+
+    def test_convert_twoArgumentFunction_calledWithName(self):
+        arg = Argument('foo', type=lambda value, name: (name, value))
+        self.assertEqual(('foo', 'bar'), arg.convert('bar'))
+
+    def test_convert_class_calledAccordingToInit(self):
+        class OneArg(object):
+            def __init__(self, value):
+                self.value = value
+
+        class TwoArgs(object):
+            def __init__(self, value, name):
+                self.value, self.name = value, name
+
+        self.assertEqual('bar', Argument('foo', type=OneArg).convert('bar').value)
+        self.assertEqual('foo', Argument('foo', type=TwoArgs).convert('bar').name)
+
+    def test_convert_callableInstance_calledAccordingToCall(self):
+        class Converter(object):
+            def __call__(self, value, name):
+                return name
+
+        self.assertEqual('foo', Argument('foo', type=Converter()).convert('bar'))
+
+    def test_convert_uninspectableType_fallsBackToOneArgument(self):
+        import functools
+        arg = Argument('foo', type=functools.partial(int, base=16))
+        self.assertEqual(255, arg.convert('ff'))
+
+    def test_convert_optionalSecondArgument_fallsBackToOneArgument(self):
+        import uuid
+        value = '12345678123456781234567812345678'
+        self.assertEqual(uuid.UUID(value), Argument('foo', type=uuid.UUID).convert(value))
+        self.assertEqual(255, Argument('foo', type=lambda v, base=16: int(v, base)).convert('ff'))
+
+    def test_convert_typeSetAfterConstruction(self):
+        arg = Argument('foo')
+        arg.type = int
+        self.assertEqual(5, arg.convert('5'))
+
+        parser = RequestParser()
+        parser.add_argument('foo')
+        self.assertEqual(u'5', parser.parse_args(Request.blank('/bubble?foo=5')).foo)
+        parser.args[0].type = int
+        self.assertEqual(5, parser.parse_args(Request.blank('/bubble?foo=5')).foo)
+
+    def test_convert_typeErrorInOneArgumentType_isNotRetried(self):
+        calls = []
+
+        def converter(value):
+            calls.append(value)
+            raise TypeError('bad value')
+
+        self.assertRaises(TypeError, Argument('foo', type=converter).convert, 'bar')
+        self.assertEqual(['bar'], calls)
+
+    # endregion
+
+    # region Source indexing
+    def testParseContext_values_indexesMultiDictInOnePass(self):
+        source = MultiDict([('ids', '1'), ('q', 'x'), ('ids', '2'), ('other', 'y')])
+        source.getall = Mock(side_effect=AssertionError('getall should not be called'))
+        context = ParseContext(None, frozenset(['ids', 'q', 'missing']))
+
+        self.assertEqual(['1', '2'], context.values(source, 'ids'))
+        self.assertEqual(['x'], context.values(source, 'q'))
+        self.assertEqual((), context.values(source, 'missing'))
+        self.assertEqual(1, len(context.indexes))
+        self.assertNotIn('other', context.indexes[id(source)][1])
+
+    def testParseContext_values_getlistSourcesAreNotIndexed(self):
+        class GetlistMultiDict(dict):
+            """Like werkzeug's MultiDict, items() only yields the first value of each key"""
+            def __init__(self, pairs):
+                dict.__init__(self)
+                for key, value in pairs:
+                    self.setdefault(key, []).append(value)
+
+            def getlist(self, key):
+                return list(dict.get(self, key, ()))
+
+            def iteritems(self):
+                return ((key, values[0]) for key, values in dict.iteritems(self))
+
+            items = lambda self: list(self.iteritems())
+
+        source = GetlistMultiDict([('ids', '1'), ('ids', '2')])
+        self.assertEqual(['1', '2'], ParseContext(None, frozenset(['ids'])).values(source, 'ids'))
+
+        parser = RequestParser()
+        parser.add_argument('ids', type=int, action='append', location=[source])
+        self.assertEqual([1, 2], parser.args[0].parse(None))
+        self.assertEqual(dict(ids=[1, 2]), parser.parse_args(None))
+
+    def testParseContext_values_plainDict(self):
+        context = ParseContext(None)
+        self.assertEqual(['bar'], context.values({'foo': 'bar'}, 'foo'))
+        self.assertEqual([None], context.values({}, 'foo'))
+
+    def testRequestParser_parse_manyRepeatedParams(self):
+        req = Request.blank('/bubble?' + '&'.join('ids=%d&p%d=%d' % (i, i, i) for i in xrange(200)))
+        parser = RequestParser()
+        parser.add_argument('ids', type=int, action='append')
+        parser.add_argument('p7', type=int)
+
+        args = parser.parse_args(req)
+        self.assertEqual(range(200), args.ids)
+        self.assertEqual(7, args.p7)
+
+    # endregion
+
+    # region Content-type planning
+    class NoJsonRequest(Request):
+        @property
+        def json(self):
+            raise AssertionError('json should not be decoded')
+
+    def testRequestParser_parse_formBody_doesNotDecodeJson(self):
+        req = self.NoJsonRequest.blank('/bubble?bar=2', POST={'foo': '1'})
+        parser = RequestParser()
+        parser.add_argument('foo', type=int)
+        parser.add_argument('bar', type=int)
+
+        self.assertEqual(dict(foo=1, bar=2), parser.parse_args(req))
+
+    def testRequestParser_parse_emptyJsonBody_fallsBackToParams(self):
+        req = self.NoJsonRequest.blank('/bubble?foo=1', environ={'CONTENT_TYPE': 'application/json'})
+        parser = RequestParser()
+        parser.add_argument('foo', type=int)
+
+        self.assertEqual(dict(foo=1), parser.parse_args(req))
+
+    def testRequestParser_parse_jsonContentTypeWithoutBody_fallsBackToParams(self):
+        parser = RequestParser()
+        parser.add_argument('a', type=int)
+
+        req = self.NoJsonRequest.blank('/?a=1', headers={'Content-Type': 'application/json'})
+        self.assertIsNone(req.content_length)
+        self.assertEqual(dict(a=1), parser.parse_args(req))
+
+        for stream_json in (False, True):
+            req = Request.blank('/?a=1', headers={'Content-Type': 'application/json'}, method='POST')
+            self.assertIsNone(req.content_length)
+            self.assertEqual(dict(a=1), RequestParser(stream_json=stream_json).add_argument('a', type=int).parse_args(req))
+
+    def testRequestParser_parse_malformedJson_raisesInvalidRequestBodyError(self):
+        req = Request.blank('/bubble?foo=1', POST='{"foo": ', environ={'CONTENT_TYPE': 'application/json'})
+        parser = RequestParser()
+        parser.add_argument('foo', type=int)
+        parser.add_argument('bar', location='json')
+
+        with self.assertRaises(InvalidRequestBodyError) as cm:
+            parser.parse_args(req)
+
+        self.assertTrue(cm.exception.message.startswith(u'Invalid JSON in the post body'))
+
+    def testParseContext_hasJsonBody_vendorJsonContentType(self):
+        req = Request.blank('/', POST='{}', environ={'CONTENT_TYPE': 'application/vnd.api+json'})
+        self.assertTrue(ParseContext(req).has_json_body())
+        self.assertFalse(ParseContext(Request.blank('/', POST={'foo': 'bar'})).has_json_body())
+
+    # endregion
+
+    # region Choices
+    def test_choices_frozenAtConstruction(self):
+        arg = Argument("foo", choices=["bar", "baz"])
+        self.assertEqual(frozenset(["bar", "baz"]), arg._choices)
+
+        arg = Argument("foo", choices=["BAR", 1], case_sensitive=False)
+        self.assertEqual(frozenset(["bar", 1]), arg._choices)
+
+    def test_choices_setAfterConstruction(self):
+        arg = Argument("foo", choices=["A"])
+        arg.choices = ["B"]
+        self.assertEqual(frozenset(["B"]), arg._choices)
+
+        arg.case_sensitive = False
+        self.assertEqual(frozenset(["b"]), arg._choices)
+
+        parser = RequestParser()
+        parser.add_argument("foo", choices=["A"])
+        self.assertRaises(InvalidChoiceParameterValue, parser.parse_args, Request.blank("/bubble?foo=B"))
+        parser.args[0].choices = ["B"]
+        self.assertEqual("B", parser.parse_args(Request.blank("/bubble?foo=B")).foo)
+
+    def test_choices_unhashableChoices(self):
+        arg = Argument("foo", choices=[[1, 2], [3]])
+        self.assertEqual(([1, 2], [3]), arg._choices)
+
+    def test_choices_xrangeBecomesInterval(self):
+        choices = Argument("foo", choices=xrange(10, 0, -2))._choices
+        self.assertIsInstance(choices, Interval)
+        self.assertEqual([2, 4, 6, 8, 10], [i for i in xrange(-5, 15) if i in choices])
+
+    def test_interval_bounds(self):
+        self.assertIn(1, Interval(1, 100))
+        self.assertIn(100, Interval(1, 100))
+        self.assertIn(50.5, Interval(1, 100))
+        self.assertNotIn(0, Interval(1, 100))
+        self.assertNotIn(101, Interval(1, 100))
+        self.assertNotIn('50', Interval(1, 100))
+        self.assertIn(10 ** 9, Interval(min_value=0))
+        self.assertNotIn(3, Interval(0, 10, step=2))
+
+    def test_interval_stepRequiresMinValue(self):
+        self.assertRaises(ValueError, Interval, max_value=10, step=2)
+
+    def testRequestParser_choices_interval(self):
+        parser = RequestParser()
+        parser.add_argument("foo", type=int, choices=Interval(1, 100))
+
+        self.assertEqual(100, parser.parse_args(Request.blank("/bubble?foo=100")).foo)
+        self.assertRaises(InvalidParameterValue, parser.parse_args, Request.blank("/bubble?foo=101"))
+
+    def testRequestParser_choices_unhashableValue(self):
+        parser = RequestParser()
+        parser.add_argument("foo", type=lambda x: x, choices=['bar'], location='json')
+
+        req = Request.blank('/stam', POST=json.dumps(dict(foo=['bar'])), environ={
+            'CONTENT_TYPE': 'application/json',
+        })
+        self.assertRaises(InvalidParameterValue, parser.parse_args, req)
+
+    def test_parse_caseInsensitive_doesNotMutateChoices(self):
+        arg = Argument("foo", choices=["BAT"], case_sensitive=False)
+        self.assertEqual('bat', arg.parse(Request.blank("/bubble?foo=Bat")))
+        self.assertEqual(["BAT"], arg.choices)
+
+    # endregion
+
+    # region Frozen parsers
+    def test_freeze_argumentIsImmutable(self):
+        arg = Argument("foo").freeze()
+        self.assertTrue(arg.frozen)
+
+        with self.assertRaises(TypeError):
+            arg.choices = ['bar']
+
+    def testRequestParser_freeze(self):
+        parser = RequestParser()
+        parser.add_argument('foo', type=int)
+        self.assertIs(parser, parser.freeze())
+
+        self.assertTrue(parser.frozen)
+        self.assertTrue(all(arg.frozen for arg in parser.args))
+        self.assertRaises(TypeError, parser.add_argument, 'bar')
+        self.assertRaises(TypeError, parser.replace_argument, 'foo')
+        self.assertRaises(TypeError, setattr, parser, 'args', [])
+        self.assertEqual(dict(foo=1), parser.parse_args(Request.blank("/bubble?foo=1")))
+
+    def testRequestParser_copyOfFrozenParser_isModifiable(self):
+        parser = RequestParser()
+        parser.add_argument('foo', type=int)
+        parser.freeze()
+
+        parser_copy = parser.copy()
+        parser_copy.add_argument('bar')
+
+        self.assertFalse(parser_copy.frozen)
+        self.assertEqual(dict(foo=1, bar='baz'), parser_copy.parse_args(Request.blank("/bubble?foo=1&bar=baz")))
+
+    # endregion
+
+    # region Parser inheritance
+    def __base_parser(self):
+        parser = RequestParser()
+        parser.add_argument('page', type=int, default=1)
+        parser.add_argument('limit', type=int, default=20)
+        parser.add_argument('q')
+        return parser
+
+    def testRequestParser_extend_sharesParentArguments(self):
+        base = self.__base_parser()
+        child = base.extend()
+        child.add_argument('sort')
+
+        self.assertEqual(['sort'], [arg.name for arg in child._args])
+        self.assertEqual(base.args, list(child._iter_args())[:3])
+        self.assertEqual(dict(page=2, limit=20, q=None, sort='name'),
+                         child.parse_args(Request.blank('/?page=2&sort=name')))
+        self.assertEqual(dict(page=2, limit=20, q=None), base.parse_args(Request.blank('/?page=2&sort=name')))
+
+    def testRequestParser_extend_replaceArgument_storesOverride(self):
+        base = self.__base_parser()
+        child = base.extend().replace_argument('limit', type=int, default=50)
+
+        self.assertEqual(['limit'], child._overrides.keys())
+        self.assertEqual(['page', 'limit', 'q'], [arg.name for arg in child.args])
+        self.assertEqual(50, child.parse_args(Request.blank('/')).limit)
+        self.assertEqual(20, base.parse_args(Request.blank('/')).limit)
+
+    def testRequestParser_extend_modifyingArgumentsDoesNotAffectParent(self):
+        base = self.__base_parser()
+        child = base.extend()
+        child.args[0].default = 5
+
+        self.assertEqual(5, child.parse_args(Request.blank('/')).page)
+        self.assertEqual(1, base.parse_args(Request.blank('/')).page)
+
+    def testRequestParser_extend_seesLaterParentChanges(self):
+        base = self.__base_parser()
+        child = base.extend()
+        base.add_argument('lang', default='en')
+
+        self.assertEqual('en', child.parse_args(Request.blank('/')).lang)
+
+    def testRequestParser_extend_ofExtendedParser(self):
+        base = self.__base_parser()
+        child = base.extend().remove_argument('q')
+        grandchild = child.extend().replace_argument('page', type=int, default=0)
+        grandchild.replace_argument('q', default='ignored')
+
+        self.assertEqual(dict(page=0, limit=20), grandchild.parse_args(Request.blank('/')))
+
+    def testRequestParser_remove_argument(self):
+        parser = self.__base_parser()
+        parser.remove_argument('limit').remove_argument('missing')
+
+        self.assertEqual(['page', 'q'], [arg.name for arg in parser.args])
+        self.assertEqual(dict(page=1, q=None), parser.parse_args(Request.blank('/?limit=5')))
+
+    def testRequestParser_replace_argument_afterArgsModifiedDirectly(self):
+        parser = self.__base_parser()
+        parser.replace_argument('q', default='x')
+        parser.args.insert(0, Argument('first'))
+        parser.replace_argument('q', default='y')
+
+        self.assertEqual(['first', 'page', 'limit', 'q'], [arg.name for arg in parser.args])
+        self.assertEqual('y', parser.args[3].default)
+
+    def testRequestParser_replace_argument_missing_doesNothing(self):
+        parser = self.__base_parser().extend()
+        parser.replace_argument('missing', default='x')
+        self.assertEqual(['page', 'limit', 'q'], [arg.name for arg in parser.args])
+
+    # endregion
+
+    # region Slots and records
+    def test_argument_hasNoInstanceDict(self):
+        self.assertFalse(hasattr(Argument('foo'), '__dict__'))
+        self.assertFalse(hasattr(Namespace(), '__dict__'))
+
+    def test_argument_deepcopyOfFrozenArgument(self):
+        from copy import deepcopy
+        arg = deepcopy(Argument('foo', type=int, choices=[1, 2]).freeze())
+
+        self.assertTrue(arg.frozen)
+        self.assertEqual(frozenset([1, 2]), arg._choices)
+        self.assertEqual(1, arg.convert('1'))
+
+    def test_record_forFields(self):
+        record_class = Record.for_fields(['foo', 'bar'])
+        record = record_class(1, 2)
+
+        self.assertEqual(1, record.foo)
+        self.assertEqual(2, record['bar'])
+        self.assertEqual(None, record.get('baz'))
+        self.assertEqual(['foo', 'bar'], record.keys())
+        self.assertEqual(dict(foo=1, bar=2), record)
+        self.assertEqual("Record(foo=1, bar=2)", repr(record))
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertRaises(KeyError, lambda: record['baz'])
+        self.assertRaises(AttributeError, lambda: record.baz)
+
+    def test_record_invalidFieldNames(self):
+        self.assertRaises(ValueError, Record.for_fields, ['X-Header'])
+        self.assertRaises(ValueError, Record.for_fields, ['class'])
+        self.assertRaises(ValueError, Record.for_fields, ['keys'])
+        self.assertRaises(ValueError, Record.for_fields, ['foo', 'foo'])
+
+    def testRequestParser_recordNamespace(self):
+        parser = RequestParser(namespace_class=Record)
+        parser.add_argument('foo', type=int)
+        parser.add_argument('bar', dest='baz', default='x')
+
+        args = parser.parse_args(Request.blank('/?foo=1'))
+        self.assertIsInstance(args, Record)
+        self.assertEqual(1, args.foo)
+        self.assertEqual('x', args.baz)
+        self.assertEqual(('foo', 'baz'), args._fields)
+
+    # endregion
+
+    # region Streaming JSON bodies
+    def testRequestParser_streamJson_decodesDeclaredArguments(self):
+        body = json.dumps({'foo': '1', 'bar': [1, 2], 'attachments': ['x' * 1000] * 10})
+        req = Request.blank('/bubble?baz=3', POST=body, environ={'CONTENT_TYPE': 'application/json'})
+        parser = RequestParser(stream_json=True)
+        parser.add_argument('foo', type=int)
+        parser.add_argument('bar', location='json_body', type=list)
+        parser.add_argument('baz', type=int, location='params')
+
+        self.assertEqual(dict(foo=1, bar=[1, 2], baz=3), parser.parse_args(req))
+        self.assertTrue(parser.extend().stream_json)
+
+        # The body can still be read by the handler
+        self.assertEqual(json.loads(body), req.json)
+
+    def testRequestParser_streamJson_nonSeekableBody_canStillBeRead(self):
+        import io
+        body = json.dumps({'foo': '1', 'other': 'x' * 1000})
+        req = Request({'REQUEST_METHOD': 'POST', 'PATH_INFO': '/bubble', 'CONTENT_TYPE': 'application/json',
+                       'CONTENT_LENGTH': str(len(body)), 'wsgi.input': io.BytesIO(body)})
+        self.assertFalse(req.is_body_seekable)
+
+        parser = RequestParser(stream_json=True)
+        parser.add_argument('foo', type=int)
+
+        self.assertEqual(dict(foo=1), parser.parse_args(req))
+        self.assertEqual(body, req.body)
+        self.assertEqual(json.loads(body), req.json)
+
+    def testRequestParser_streamJson_withoutKeepBody_readsStraightFromStream(self):
+        import io
+        body = json.dumps({'foo': '1', 'other': 'x' * 1000})
+        req = Request({'REQUEST_METHOD': 'POST', 'PATH_INFO': '/bubble', 'CONTENT_TYPE': 'application/json',
+                       'CONTENT_LENGTH': str(len(body)), 'wsgi.input': io.BytesIO(body)})
+
+        parser = RequestParser(stream_json=True, keep_body=False)
+        parser.add_argument('foo', type=int)
+
+        self.assertEqual(dict(foo=1), parser.parse_args(req))
+        self.assertFalse(req.is_body_seekable)
+        self.assertFalse(parser.extend().keep_body)
+        self.assertFalse(parser.copy().keep_body)
+
+    def testRequestParser_streamJson_malformedJson_raisesInvalidRequestBodyError(self):
+        req = Request.blank('/bubble', POST='{"foo": 1, "bar": [', environ={'CONTENT_TYPE': 'application/json'})
+        parser = RequestParser(stream_json=True)
+        parser.add_argument('foo', type=int)
+        parser.add_argument('bar', location='json_body')
+
+        with self.assertRaises(InvalidRequestBodyError):
+            parser.parse_args(req)
+
+    def testParseContext_streamJson_requiresNames(self):
+        self.assertFalse(ParseContext(Request.blank('/'), stream_json=True).stream_json)
+        self.assertTrue(ParseContext(Request.blank('/'), ['foo'], stream_json=True).stream_json)
+
+    # endregion
+
+    # region Lazy results
+    def testRequestParser_lazyNamespace_convertsOnFirstRead(self):
+        converted = []
+
+        def convert(value):
+            converted.append(value)
+            return int(value)
+
+        parser = RequestParser(namespace_class=LazyNamespace)
+        parser.add_argument('foo', type=convert)
+        parser.add_argument('bar', type=convert)
+        parser.add_argument('baz', type=convert, default=3)
+
+        args = parser.parse_args(Request.blank('/bubble?foo=1&bar=2'))
+        self.assertIsInstance(args, LazyNamespace)
+        self.assertEqual([], converted)
+        self.assertEqual(frozenset(['foo', 'bar']), args.pending)
+        self.assertEqual(3, args.baz)
+        self.assertEqual(['bar', 'baz', 'foo'], sorted(args.keys()))
+
+        self.assertEqual(1, args.foo)
+        self.assertEqual(1, args['foo'])
+        self.assertEqual(['1'], converted)
+
+        self.assertEqual(dict(foo=1, bar=2, baz=3), args)
+        self.assertEqual(['1', '2'], converted)
+
+    def testRequestParser_lazyNamespace_missingRequiredRaisesOnParse(self):
+        parser = RequestParser(namespace_class=LazyNamespace)
+        parser.add_argument('foo', type=int)
+        parser.add_argument('bar', type=int, required=True)
+
+        with self.assertRaises(MissingParameterError):
+            parser.parse_args(Request.blank('/bubble?foo=1'))
+
+    def testRequestParser_lazyNamespace_invalidValueRaisesOnRead(self):
+        parser = RequestParser(namespace_class=LazyNamespace)
+        parser.add_argument('foo', type=int)
+        parser.add_argument('bar', type=int, required=True)
+
+        args = parser.parse_args(Request.blank('/bubble?foo=1&bar=spam'))
+        self.assertEqual(1, args.foo)
+        self.assertRaises(InvalidParameterValue, lambda: args.bar)
+        self.assertRaises(InvalidParameterValue, args.get, 'bar')
+        self.assertIn('bar', args.pending)
+
+    def testRequestParser_lazyNamespace_dictAndKeywordArguments(self):
+        parser = RequestParser(namespace_class=LazyNamespace)
+        parser.add_argument('a', type=int)
+        parser.add_argument('b', type=int)
+
+        args = parser.parse_args(Request.blank('/bubble?a=1&b=7'))
+        args.b  # pylint: disable=W0104
+        self.assertEqual(dict(a=1, b=7), dict(args))
+
+        def handler(a, b):
+            return a, b
+
+        args = parser.parse_args(Request.blank('/bubble?a=1&b=7'))
+        self.assertEqual((1, 7), handler(**args))
+        self.assertEqual(dict(a=1, b=7), json.loads(json.dumps(args.to_dict())))
+        self.assertEqual(RequestParser.cache_key(dict(a=1, b=7)), RequestParser.cache_key(args))
+
+        import copy
+        import pickle
+        args = parser.parse_args(Request.blank('/bubble?a=1&b=7'))
+        self.assertEqual(dict(a=1, b=7), copy.deepcopy(args))
+        self.assertEqual(dict(a=1, b=7), pickle.loads(pickle.dumps(args)))
+
+    def test_lazyNamespace_setAndDelete(self):
+        args = LazyNamespace()
+        args.defer('foo', lambda values: values[0], ['x'])
+        args.foo = 'y'
+        self.assertEqual('y', args.foo)
+        self.assertEqual(frozenset(), args.pending)
+
+        args.defer('bar', lambda values: values[0], ['x'])
+        del args['bar']
+        self.assertNotIn('bar', args)
+        self.assertRaises(AttributeError, lambda: args.bar)
+
+    # endregion
+
+    # region Conversion order
+    def testRequestParser_missingRequired_raisesBeforeConverting(self):
+        convert = Mock(side_effect=int)
+        parser = RequestParser()
+        parser.add_argument('foo', type=lambda value: convert(value))
+        parser.add_argument('bar', required=True)
+
+        with self.assertRaises(MissingParameterError):
+            parser.parse_args(Request.blank('/bubble?foo=1'))
+
+        self.assertFalse(convert.called)
+
+    def testRequestParser_convertsCheapestFirst(self):
+        converted = []
+
+        def converter(name):
+            def convert(value):
+                converted.append(name)
+                return value
+
+            return convert
+
+        parser = RequestParser()
+        parser.add_argument('foo', type=converter('foo'), cost=100)
+        parser.add_argument('bar', type=converter('bar'))
+        parser.add_argument('baz', type=converter('baz'), cost=1)
+
+        args = parser.parse_args(Request.blank('/bubble?foo=1&bar=2&baz=3'))
+        self.assertEqual(['baz', 'bar', 'foo'], converted)
+        self.assertEqual(dict(foo='1', bar='2', baz='3'), args)
+
+    def test_cost_defaultsToTypeCost(self):
+        from webapp2_restful.reqparse import _argument_cost
+        from webapp2_restful.reqparse.arguments import JSONArgument
+
+        self.assertEqual(1, _argument_cost(Argument('foo', type=int)))
+        self.assertEqual(JSONArgument.cost, _argument_cost(Argument('foo', type=JSONArgument())))
+        self.assertEqual(3, _argument_cost(Argument('foo', type=JSONArgument(), cost=3)))
+
+    # endregion
+
+    # region Errors
+    def testRequestParser_invalidValue_formatsMessageOnRead(self):
+        parser = RequestParser()
+        parser.add_argument('foo', type=int)
+
+        with patch.object(InvalidParameterValue, 'format_message', return_value='formatted') as format_message:
+            with self.assertRaises(InvalidParameterValue) as cm:
+                parser.parse_args(Request.blank('/bubble?foo=spam'))
+
+            self.assertFalse(format_message.called)
+            self.assertEqual('formatted', cm.exception.message)
+            self.assertEqual('formatted', cm.exception.message)
+            self.assertEqual(1, format_message.call_count)
+
+        self.assertEqual('foo', cm.exception.argument.name)
+        self.assertEqual('spam', cm.exception.value)
+        self.assertIsInstance(cm.exception.inner_error, ValueError)
+
+    def test_invalidParameterValue_toDict_truncatesValue(self):
+        error = InvalidParameterValue(Argument('foo', help='A foo'), 'x' * 10000, 'too long')
+
+        result = error.to_dict()
+        self.assertEqual('invalid_value', result['code'])
+        self.assertEqual('foo', result['argument'])
+        self.assertEqual('x' * 100 + '... (10000 characters)', result['value'])
+        self.assertLess(len(result['message']), 200)
+
+        self.assertEqual('<list of 1000 items>', InvalidParameterValue(Argument('foo'), [1] * 1000, 'bad').to_dict()['value'])
+        self.assertEqual("Invalid value for foo: [1, 2] (bad). ", str(InvalidParameterValue(Argument('foo'), [1, 2], 'bad')))
+
+    def test_invalidParameterValue_toDict_truncatesNestedValues(self):
+        for value in ([{'a': 'x' * 200000}], {'a': [['x' * 200000]]}, ('x' * 200000,), set(['x' * 200000]),
+                      bytearray('x' * 200000), memoryview('x' * 200000), [bytearray('x' * 200000)]):
+            error = InvalidParameterValue(Argument('foo'), value, 'bad')
+            self.assertLess(len(error.to_dict()['value']), 200, type(value))
+            self.assertLess(len(error.message), 400, type(value))
+
+        self.assertEqual("[{'a': '" + 'x' * 95 + "'...}]",
+                         InvalidParameterValue(Argument('foo'), [{'a': 'x' * 200}], 'bad').to_dict()['value'])
+        self.assertEqual("(1,)", InvalidParameterValue(Argument('foo'), (1,), 'bad').to_dict()['value'])
+
+        parser = RequestParser()
+        parser.add_argument('foo', type=lambda value: int(value), location='json')
+        body = json.dumps({'foo': [{'a': 'x' * 200000}]})
+        with self.assertRaises(InvalidParameterValue) as cm:
+            parser.parse_args(Request.blank('/bubble', POST=body, environ={'CONTENT_TYPE': 'application/json'}))
+        self.assertLess(len(cm.exception.to_dict()['value']), 200)
+
+    def test_parserErrors_toDict(self):
+        self.assertEqual(dict(code='missing_parameter', argument='foo', message=u'Missing required parameter foo in the query string'),
+                         MissingParameterError(Argument('foo', location='args')).to_dict())
+        self.assertEqual(dict(code='invalid_choice', argument='foo', value='bar',
+                              message='Invalid value for foo: bar (bar is not a valid choice value). '),
+                         InvalidChoiceParameterValue(Argument('foo', choices=['baz']), 'bar').to_dict())
+        self.assertEqual(dict(code='invalid_body', message=u'Invalid JSON in the post body (No JSON object)'),
+                         InvalidRequestBodyError(ValueError('No JSON object')).to_dict())
+
+    # endregion
+
+    # region Memoization
+    def testRequestParser_memo_reusesParsedValues(self):
+        parser = RequestParser(memo_size=10)
+        parser.add_argument('foo', type=int, action='append')
+        parser.add_argument('bar', choices=['x', 'y'])
+
+        first = parser.parse_args(Request.blank('/bubble?foo=1&foo=2&bar=x'))
+        first.foo.append(3)
+        second = parser.parse_args(Request.blank('/bubble?bar=x&foo=1&foo=2&baz=ignored'))
+
+        self.assertEqual(dict(foo=[1, 2], bar='x'), second)
+        self.assertEqual(dict(hits=1, misses=1, evictions=0, size=1), parser.memo_stats)
+
+    def testRequestParser_memo_keysOnValueTypes(self):
+        parser = RequestParser(memo_size=10)
+        parser.add_argument('foo', location='json')
+
+        req = Request.blank('/bubble', POST=json.dumps({'foo': 1}), environ={'CONTENT_TYPE': 'application/json'})
+        self.assertEqual(u'1', parser.parse_args(req).foo)
+        req = Request.blank('/bubble', POST=json.dumps({'foo': True}), environ={'CONTENT_TYPE': 'application/json'})
+        self.assertEqual(u'True', parser.parse_args(req).foo)
+
+        # Unhashable values aren't memoized
+        req = Request.blank('/bubble', POST=json.dumps({'foo': [1]}), environ={'CONTENT_TYPE': 'application/json'})
+        parser.parse_args(req)
+        self.assertEqual(dict(hits=0, misses=2, evictions=0, size=2), parser.memo_stats)
+
+    def testRequestParser_memo_onlyDeterministicArguments(self):
+        convert = Mock(side_effect=int)
+        parser = RequestParser(memo_size=10)
+        parser.add_argument('foo', type=lambda value: convert(value))
+        parser.add_argument('bar', type=int, default=lambda: 3)
+        parser.add_argument('baz', type=int)
+
+        for _ in xrange(2):
+            self.assertEqual(dict(foo=1, bar=3, baz=2), parser.parse_args(Request.blank('/bubble?foo=1&baz=2')))
+
+        self.assertEqual(2, convert.call_count)
+        self.assertEqual(1, parser.memo_stats['hits'])
+
+    def testRequestParser_memo_evictsAndResetsWhenArgsChange(self):
+        parser = RequestParser(memo_size=1)
+        parser.add_argument('foo', type=int)
+        parser.parse_args(Request.blank('/bubble?foo=1'))
+        parser.parse_args(Request.blank('/bubble?foo=2'))
+        self.assertEqual(dict(hits=0, misses=2, evictions=1, size=1), parser.memo_stats)
+
+        parser.replace_argument('foo', type=unicode)
+        self.assertEqual(u'2', parser.parse_args(Request.blank('/bubble?foo=2')).foo)
+        self.assertIsNone(RequestParser().memo_stats)
+
+    # endregion
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import threading
+import unittest
+
+from webapp2 import Request
+
+from webapp2_restful.reqparse import RequestParser, InvalidParameterValue
+
+__author__ = 'ekampf'
+
+
+class TestFrozenParserThreadSafety(unittest.TestCase):
+    THREADS = 16
+    ITERATIONS = 300
+
+    def setUp(self):
+        self.parser = RequestParser()
+        self.parser.add_argument('thread', type=int, required=True)
+        self.parser.add_argument('i', type=int, required=True)
+        self.parser.add_argument('color', choices=['RED', 'Green', 'blue'], case_sensitive=False, trim=True)
+        self.parser.add_argument('tags', action='append', location='params')
+        self.parser.freeze()
+
+    def __worker(self, thread_id, errors):
+        colors = [' Red', 'GREEN ', 'blue']
+        try:
+            for i in xrange(self.ITERATIONS):
+                color = colors[(thread_id + i) % len(colors)]
+                req = Request.blank('/?thread=%d&i=%d&color=%s&tags=%d&tags=%d' % (thread_id, i, color, thread_id, i))
+                args = self.parser.parse_args(req)
+
+                expected = dict(thread=thread_id, i=i, color=color.strip().lower(), tags=[unicode(thread_id), unicode(i)])
+                if args != expected:
+                    errors.append((expected, args))
+
+                try:
+                    self.parser.parse_args(Request.blank('/?thread=%d&i=%d&color=purple' % (thread_id, i)))
+                    errors.append('purple should be an invalid choice')
+                except InvalidParameterValue:
+                    pass
+        except Exception as ex:  # pylint: disable=W0703
+            errors.append(ex)
+
+    def test_sharedFrozenParser_parsesConcurrently(self):
+        errors = []
+        threads = [threading.Thread(target=self.__worker, args=(i, errors)) for i in xrange(self.THREADS)]
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([], errors)
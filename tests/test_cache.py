@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import pickle
+import unittest
+
+from webapp2_restful.cache import LRUCache, LocalMemcache
+
+__author__ = 'ekampf'
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_getSet(self):
+        cache = LRUCache(10)
+        cache.set('foo', 1)
+
+        self.assertEqual(1, cache.get('foo'))
+        self.assertIsNone(cache.get('bar'))
+        self.assertEqual('default', cache.get('bar', 'default'))
+        self.assertEqual(dict(hits=1, misses=2, evictions=0, size=1), cache.stats)
+
+    def test_evictsLeastRecentlyUsed(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(1, cache.evictions)
+
+    def test_ttl(self):
+        cache = LRUCache(10, ttl=5, clock=self.clock)
+        cache.set('foo', 1)
+        cache.set('bar', 2, ttl=60)
+
+        self.clock.now += 10
+        self.assertIsNone(cache.get('foo'))
+        self.assertEqual(2, cache.get('bar'))
+
+    def test_getMulti(self):
+        cache = LRUCache(10)
+        cache.set_multi(dict(a=1, b=None))
+        self.assertEqual(dict(a=1, b=None), cache.get_multi(['a', 'b', 'c']))
+
+    def test_invalidMaxSize(self):
+        self.assertRaises(ValueError, LRUCache, 0)
+
+
+class TestLocalMemcache(unittest.TestCase):
+    def test_getSetMulti(self):
+        clock = FakeClock()
+        memcache = LocalMemcache(clock=clock)
+        memcache.set_multi(dict(a=1, b=2), time=5, key_prefix='p:')
+        memcache.set('p:c', 3)
+
+        self.assertEqual(dict(a=1, b=2, c=3), memcache.get_multi(['a', 'b', 'c', 'd'], key_prefix='p:'))
+
+        clock.now += 10
+        self.assertEqual(dict(c=3), memcache.get_multi(['a', 'b', 'c'], key_prefix='p:'))
+
+        memcache.delete_multi(['c'], key_prefix='p:')
+        self.assertIsNone(memcache.get('p:c'))
+
+    def test_valuesArePicklable(self):
+        memcache = LocalMemcache()
+        memcache.set('foo', pickle.dumps([1, 2]))
+        self.assertEqual([1, 2], pickle.loads(memcache.get('foo')))
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+
+import webapp2
+
+from webapp2_restful.cache import LocalMemcache
+from webapp2_restful.reqparse import RequestParser
+from webapp2_restful.response_cache import ResponseCache
+from webapp2_restful.routes import ResourceRoute
+
+__author__ = 'ekampf'
+
+
+def make_app(responses):
+    parser = RequestParser()
+    parser.add_argument('q', case_sensitive=False)
+    parser.add_argument('page', type=int, default=1)
+
+    class PhotosHandler(webapp2.RequestHandler):
+        calls = []
+
+        @responses.cached(parser, resource='photos')
+        def index(self, args):
+            self.calls.append(('index', args))
+            self.response.write(json.dumps(dict(q=args.q, page=args.page)))
+
+        @responses.cached(parser, resource='photos')
+        def show(self, args, photo_id):
+            self.calls.append(('show', photo_id))
+            if photo_id == 'missing':
+                self.abort(404)
+            self.response.write(photo_id)
+
+        @responses.invalidates('photos')
+        def create(self):
+            self.calls.append(('create', None))
+
+    return webapp2.WSGIApplication([ResourceRoute('photos', PhotosHandler)]), PhotosHandler
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_cached_sameParsedArgsShareResponse(self):
+        responses = ResponseCache()
+        app, handler = make_app(responses)
+
+        first = webapp2.Request.blank('/photos?q=Cats&page=2').get_response(app)
+        second = webapp2.Request.blank('/photos?page=2&q=cats').get_response(app)
+
+        self.assertEqual(first.body, second.body)
+        self.assertEqual(first.headers['Content-Type'], second.headers['Content-Type'])
+        self.assertEqual(1, len(handler.calls))
+        self.assertEqual(dict(hits=1, misses=1), responses.stats)
+
+        webapp2.Request.blank('/photos?q=dogs').get_response(app)
+        self.assertEqual(2, len(handler.calls))
+
+    def test_cached_keysOnRouteArgs(self):
+        app, handler = make_app(ResponseCache())
+
+        self.assertEqual('1', webapp2.Request.blank('/photos/1').get_response(app).body)
+        self.assertEqual('2', webapp2.Request.blank('/photos/2').get_response(app).body)
+        self.assertEqual('1', webapp2.Request.blank('/photos/1').get_response(app).body)
+        self.assertEqual([('show', '1'), ('show', '2')], handler.calls)
+
+    def test_cached_onlySuccessfulResponses(self):
+        app, handler = make_app(ResponseCache())
+
+        for _ in xrange(2):
+            self.assertEqual(404, webapp2.Request.blank('/photos/missing').get_response(app).status_int)
+
+        self.assertEqual(2, len(handler.calls))
+
+    def test_invalidates(self):
+        responses = ResponseCache(LocalMemcache(), ttl=60)
+        app, handler = make_app(responses)
+
+        webapp2.Request.blank('/photos').get_response(app)
+        webapp2.Request.blank('/photos', POST='').get_response(app)
+        webapp2.Request.blank('/photos').get_response(app)
+
+        self.assertEqual(['index', 'create', 'index'], [action for action, _ in handler.calls])
+        self.assertEqual(dict(hits=0, misses=2), responses.stats)
+
+    def test_cached_returnedResponses(self):
+        responses = ResponseCache()
+        parser = RequestParser()
+        parser.add_argument('q')
+
+        class SearchHandler(webapp2.RequestHandler):
+            calls = []
+
+            @responses.cached(parser, resource='search')
+            def index(self, args):
+                self.calls.append(args.q)
+                return webapp2.Response('result for %s' % args.q)
+
+            @responses.cached(parser, resource='search')
+            def show(self, args, result_id):
+                self.calls.append(args.q)
+                self.response.write('ignored')
+                return dict(q=args.q)
+
+        app = webapp2.WSGIApplication([ResourceRoute('results', SearchHandler, only=['index', 'show'])])
+
+        for _ in xrange(2):
+            response = webapp2.Request.blank('/results?q=a').get_response(app)
+            self.assertEqual(200, response.status_int)
+            self.assertEqual('result for a', response.body)
+
+        self.assertEqual(['a'], SearchHandler.calls)
+        self.assertEqual(dict(hits=1, misses=1), responses.stats)
+
+        # Methods returning something else than a Response (e.g. for a custom dispatcher) aren't cached
+        for _ in xrange(2):
+            request = webapp2.Request.blank('/results/1?q=b')
+            handler = SearchHandler(request, webapp2.Response())
+            self.assertEqual(dict(q='b'), handler.show('1'))
+
+        self.assertEqual(['a', 'b', 'b'], SearchHandler.calls)
+
+    def make_session_app(self, responses, **cached_kwargs):
+        parser = RequestParser()
+        parser.add_argument('q')
+
+        class ProfileHandler(webapp2.RequestHandler):
+            calls = []
+
+            @responses.cached(parser, resource='profile', **cached_kwargs)
+            def index(self, args):
+                user = self.request.headers.get('X-User')
+                self.calls.append(user)
+                if self.request.get('cookie'):
+                    self.response.set_cookie('session', user)
+                if self.request.get('private'):
+                    self.response.cache_control = self.request.get('private')
+                self.response.headers['Authentication-Info'] = 'user=%s' % user
+                self.response.write('hello %s' % user)
+
+        return webapp2.WSGIApplication([ResourceRoute('profiles', ProfileHandler, only=['index'])]), ProfileHandler
+
+    def test_cached_responsesSettingCookiesAreNotCached(self):
+        app, handler = self.make_session_app(ResponseCache())
+
+        alice = webapp2.Request.blank('/profiles?q=x&cookie=1', headers={'X-User': 'alice'}).get_response(app)
+        bob = webapp2.Request.blank('/profiles?q=x&cookie=1', headers={'X-User': 'bob'}).get_response(app)
+
+        self.assertEqual('session=alice; Path=/', alice.headers['Set-Cookie'])
+        self.assertEqual('session=bob; Path=/', bob.headers['Set-Cookie'])
+        self.assertEqual('hello bob', bob.body)
+        self.assertEqual(['alice', 'bob'], handler.calls)
+
+    def test_cached_privateResponsesAreNotCached(self):
+        app, handler = self.make_session_app(ResponseCache())
+
+        for private in ('private', 'no-store', 'max-age=60, private'):
+            for user in ('alice', 'bob'):
+                response = webapp2.Request.blank('/profiles?private=' + private, headers={'X-User': user}).get_response(app)
+                self.assertEqual('hello %s' % user, response.body)
+
+        self.assertEqual(6, len(handler.calls))
+
+    def test_cached_stripsPerUserHeaders(self):
+        app, _ = self.make_session_app(ResponseCache())
+
+        webapp2.Request.blank('/profiles', headers={'X-User': 'alice'}).get_response(app)
+        response = webapp2.Request.blank('/profiles', headers={'X-User': 'bob'}).get_response(app)
+
+        self.assertEqual('hello alice', response.body)
+        self.assertNotIn('Authentication-Info', response.headers)
+
+    def test_cached_vary(self):
+        for vary in (('X-User',), lambda request: request.headers.get('X-User')):
+            app, handler = self.make_session_app(ResponseCache(), vary=vary)
+
+            for user in ('alice', 'bob', 'alice'):
+                response = webapp2.Request.blank('/profiles', headers={'X-User': user}).get_response(app)
+                self.assertEqual('hello %s' % user, response.body)
+
+            self.assertEqual(['alice', 'bob'], handler.calls)
+
+    def test_cacheKey_normalizesParsedValues(self):
+        parser = RequestParser()
+        parser.add_argument('tags', action='append')
+        parser.add_argument('q', case_sensitive=False)
+
+        first = parser.parse_args(webapp2.Request.blank('/?q=Foo&tags=a&tags=b'))
+        second = parser.parse_args(webapp2.Request.blank('/?tags=a&tags=b&q=foo'))
+        third = parser.parse_args(webapp2.Request.blank('/?tags=b&tags=a&q=foo'))
+
+        self.assertEqual(RequestParser.cache_key(first), RequestParser.cache_key(second))
+        self.assertNotEqual(RequestParser.cache_key(first), RequestParser.cache_key(third))
+        self.assertNotEqual(RequestParser.cache_key(dict(a=1)), RequestParser.cache_key(dict(a='1')))
+
+    def test_cacheKey_byteStrings_keyedByTheirBytes(self):
+        self.assertNotEqual(RequestParser.cache_key({'x': '\xff'}), RequestParser.cache_key({'x': '\xfe'}))
+        self.assertNotEqual(RequestParser.cache_key({'x': '\xff'}), RequestParser.cache_key({'x': u'\ufffd'}))
+        self.assertEqual(RequestParser.cache_key({'x': u'caf\xe9'}), RequestParser.cache_key({'x': 'caf\xc3\xa9'}))
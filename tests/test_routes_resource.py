@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 import unittest
 import webapp2
-from webapp2_restful.routes import ResourceRoute
+from webob import exc
+from webapp2_restful.routes import ResourceRoute, RadixRoute, MethodDispatchRoute, allow_header_matcher
 
 __author__ = 'ekampf'
 
@@ -169,9 +170,123 @@ class TestResourceRoute(unittest.TestCase):
             self.assertEqual(func('photo_comments', photo_id=123), '/photos/123/comments')
             self.assertEqual(func('photo_comment', photo_id=123, comment_id='bla'), '/photos/123/comments/bla')
 
+    def testRoutesMergedByTemplate(self):
+        route = ResourceRoute('photos', PhotosHandler, actions=[('delete_all', 'POST')])
+        routes = list(route.get_routes())
+
+        self.assertEqual(['/photos', '/photos/<photo_id>', '/photos/delete_all'], [r.template for r in routes])
+        self.assertTrue(all(isinstance(r, MethodDispatchRoute) for r in routes))
+        self.assertEqual(dict(GET='index', POST='create', OPTIONS='index'), routes[0].handler_methods)
+        self.assertEqual(dict(GET='show', PUT='update', DELETE='destroy', OPTIONS='show'), routes[1].handler_methods)
+
+        router = webapp2.Router([route])
+        route_match, _, _ = router.match(self.__blank('/photos', 'OPTIONS'))
+        self.assertEqual('index', route_match.handler_method)
+
+    def testMethodNotAllowedHasAllowHeader(self):
+        route = ResourceRoute('photos', PhotosHandler, only=['show', 'update'])
+        with self.assertRaises(exc.HTTPMethodNotAllowed) as context:
+            route.get_routes().next().match(self.__blank('/photos/1', 'DELETE'))
+        self.assertEqual('GET, OPTIONS, PUT', context.exception.headers['Allow'])
+
+        for routes in ([route], [RadixRoute([route])]):
+            app = webapp2.WSGIApplication(routes)
+            app.router.set_matcher(allow_header_matcher)
+            response = self.__blank('/photos/1', 'DELETE').get_response(app)
+            self.assertEqual(405, response.status_int)
+            self.assertEqual('GET, OPTIONS, PUT', response.headers['Allow'])
+            self.assertEqual(404, self.__blank('/nothing').get_response(app).status_int)
+
     def __blank(self, path, method=None):
         req = webapp2.Request.blank(path)
         if method:
             req.method = method
 
         return req
+
+
+class TestRadixRoute(unittest.TestCase):
+    def make_routes(self):
+        return [
+            ResourceRoute('photos', PhotosHandler, actions=[('delete_all', 'POST')], member_actions=['thumb', 'scale-up'],
+                          sub_resources=[ResourceRoute('comments', PhotosCommentsHandler, only=['index', 'show'])]),
+            ResourceRoute('users', PhotosHandler, path_prefix='/api/v1', without=['destroy']),
+            webapp2.Route('/years/<year:\d{4}>', PhotosHandler, handler_method='year', name='year'),
+            webapp2.Route('/files/<path:.*>', PhotosHandler, handler_method='file', name='file'),
+            webapp2.Route('/anonymous/<:\d+>', PhotosHandler, handler_method='anonymous'),
+        ]
+
+    def match(self, router, path, method='GET'):
+        req = webapp2.Request.blank(path)
+        req.method = method
+        try:
+            route, args, kwargs = router.match(req)
+            return route.handler, route.handler_method, args, kwargs
+        except exc.HTTPException as error:
+            return error.code
+
+    def testMatchesLikeLinearRouter(self):
+        radix = webapp2.Router([RadixRoute(self.make_routes())])
+        linear = webapp2.Router(self.make_routes())
+
+        cases = [
+            '/photos', '/photos/', '/photos/123', '/photos/delete_all', '/photos/123/thumb', '/photos/123/scale-up',
+            '/photos/123/comments', '/photos/123/comments/c7', '/photos/123/comments/c7/x', '/api/v1/users',
+            '/api/v1/users/u1', '/users', '/years/2015', '/years/15', '/files/a/b/c.txt', '/anonymous/12',
+            '/anonymous/x', '/nothing', '/',
+        ]
+        for path in cases:
+            for method in ('GET', 'POST', 'PUT', 'DELETE', 'OPTIONS', 'PATCH'):
+                self.assertEqual(self.match(linear, path, method), self.match(radix, path, method), (path, method))
+
+    def testBasicMatches(self):
+        router = webapp2.Router([RadixRoute(self.make_routes())])
+
+        self.assertEqual((PhotosHandler, 'show', (), dict(photo_id='123')), self.match(router, '/photos/123'))
+        self.assertEqual((PhotosHandler, 'delete_all', (), {}), self.match(router, '/photos/delete_all', 'POST'))
+        self.assertEqual((PhotosCommentsHandler, 'show', (), dict(photo_id='1', comment_id='2')),
+                         self.match(router, '/photos/1/comments/2'))
+        self.assertEqual((PhotosHandler, 'year', (), dict(year='2015')), self.match(router, '/years/2015'))
+        self.assertEqual((PhotosHandler, 'anonymous', ('12',), {}), self.match(router, '/anonymous/12'))
+        self.assertEqual(405, self.match(router, '/photos/1/comments', 'POST'))
+        self.assertEqual(404, self.match(router, '/years/15'))
+
+    def testRouteSubclassesOverridingMatchAreCalled(self):
+        class HostRoute(webapp2.Route):
+            def match(self, request):
+                if request.host.split(':')[0] != 'api.example.com':
+                    return None
+                return super(HostRoute, self).match(request)
+
+        class NamedRoute(webapp2.Route):
+            pass
+
+        routes = [HostRoute('/things/<thing_id>', PhotosHandler, handler_method='api_show'),
+                  NamedRoute('/things/<thing_id>', PhotosHandler, handler_method='show')]
+        radix = RadixRoute(routes)
+        self.assertEqual([routes[0]], [route for _, route in radix._fallback])
+
+        router = webapp2.Router([radix])
+        self.assertEqual((PhotosHandler, 'api_show', (), dict(thing_id='1')),
+                         self.match(router, 'http://api.example.com/things/1'))
+        self.assertEqual((PhotosHandler, 'show', (), dict(thing_id='1')), self.match(router, 'http://localhost/things/1'))
+
+    def testUriFor(self):
+        app = webapp2.WSGIApplication([RadixRoute(self.make_routes())])
+        req = webapp2.Request.blank('http://localhost:80/')
+        req.app = app
+        app.set_globals(app=app, request=req)
+
+        self.assertEqual('/photos/123', webapp2.uri_for('photo', photo_id=123))
+        self.assertEqual('/photos/123/comments/bla', webapp2.uri_for('photo_comment', photo_id=123, comment_id='bla'))
+        self.assertEqual('/api/v1/users', webapp2.uri_for('users'))
+        self.assertEqual('/files/a/b', webapp2.uri_for('file', path='a/b'))
+
+    def testDispatch(self):
+        class Handler(webapp2.RequestHandler):
+            def show(self, photo_id):
+                self.response.write('photo %s' % photo_id)
+
+        app = webapp2.WSGIApplication([RadixRoute([ResourceRoute('photos', Handler, only=['show'])])])
+        self.assertEqual('photo 7', webapp2.Request.blank('/photos/7').get_response(app).body)
+        self.assertEqual(405, webapp2.Request.blank('/photos/7', POST='').get_response(app).status_int)
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from collections import OrderedDict
+
+__author__ = 'ekampf'
+
+
+class LRUCache(object):
+    """
+    A process-local, thread-safe cache holding at most max_size entries, evicting the least
+    recently used one when full. Entries expire ttl seconds after being set (never if ttl is None).
+
+    Keeps hits/misses/evictions counters.
+    """
+    def __init__(self, max_size=1000, ttl=None, clock=time.time):
+        if max_size < 1:
+            raise ValueError('max_size must be positive')
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key, _NOT_FOUND, count=False) is not _NOT_FOUND
+
+    def get(self, key, default=None, count=True):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or (entry[1] is not None and entry[1] <= self._clock()):
+                if count:
+                    self.misses += 1
+                return default
+
+            self._entries[key] = entry
+            if count:
+                self.hits += 1
+            return entry[0]
+
+    def get_multi(self, keys):
+        """Returns a dict with the values of the keys found in the cache"""
+        found = {}
+        for key in keys:
+            value = self.get(key, _NOT_FOUND)
+            if value is not _NOT_FOUND:
+                found[key] = value
+
+        return found
+
+    def set(self, key, value, ttl=None):
+        """Sets key to value. ttl overrides the cache's default ttl for this entry."""
+        ttl = self.ttl if ttl is None else ttl
+        expires = None if ttl is None else self._clock() + ttl
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, expires)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set_multi(self, mapping, ttl=None):
+        for key, value in mapping.iteritems():
+            self.set(key, value, ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_multi(self, keys):
+        for key in keys:
+            self.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self):
+        return dict(hits=self.hits, misses=self.misses, evictions=self.evictions, size=len(self._entries))
+
+
+class LocalMemcache(object):
+    """
+    An in-process, dict based implementation of the subset of the App Engine memcache client
+    interface the caches in this package use. Stands in for memcache in tests and local runs.
+    """
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._data = {}
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        if entry[1] and entry[1] <= self._clock():
+            del self._data[key]
+            return None
+
+        return entry[0]
+
+    def get_multi(self, keys, key_prefix=''):
+        found = {}
+        for key in keys:
+            value = self.get(key_prefix + key)
+            if value is not None:
+                found[key] = value
+
+        return found
+
+    def set(self, key, value, time=0):  # pylint: disable=W0621
+        self._data[key] = (value, self._clock() + time if time else 0)
+        return True
+
+    def set_multi(self, mapping, time=0, key_prefix=''):  # pylint: disable=W0621
+        for key, value in mapping.iteritems():
+            self.set(key_prefix + key, value, time)
+
+        return []
+
+    def delete(self, key):
+        return 2 if self._data.pop(key, None) is not None else 1
+
+    def delete_multi(self, keys, key_prefix=''):
+        for key in keys:
+            self.delete(key_prefix + key)
+
+        return True
+
+    def flush_all(self):
+        self._data.clear()
+        return True
+
+
+_NOT_FOUND = object()
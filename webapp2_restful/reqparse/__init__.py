@@ -1,44 +1,299 @@
 # -*- coding: utf-8 -*-
+import collections
+import copy
+import datetime
+import hashlib
 import inspect
 import decimal
-from copy import deepcopy
+import json
+import keyword
+import numbers
+import re
+import uuid
 
 from webob.multidict import MultiDict
 
+from webapp2_restful.cache import LRUCache
+from webapp2_restful.reqparse.json_stream import extract_json_keys
+
 __author__ = 'ekampf'
 
 
 class ParserError(Exception):
+    """Base class of the errors raised when parsing a request.
+
+    Errors only store structured fields (the argument, a reason code and, for invalid values,
+    references to the value and the conversion error) when they're raised. Their message is
+    formatted the first time it's read, so rejecting a request costs little when the message
+    isn't used. Use :meth:`to_dict` for JSON error responses.
+    """
+    code = 'invalid_argument'
+
+    # pylint: disable=W0231
     def __init__(self, argument):
-        message = "Error parsing argument %s. %s" % (argument.name, argument.help or '')
-        super(ParserError, self).__init__(self, message)
+        Exception.__init__(self)
+        self.argument = argument
+        self._message = None
+
+    @property
+    def message(self):
+        if self._message is None:
+            self._message = self.format_message()
+
+        return self._message
+
+    @message.setter
+    def message(self, message):
+        self._message = message
+
+    def format_message(self):
+        return "Error parsing argument %s. %s" % (self.argument.name, self.argument.help or '')
+
+    def to_dict(self):
+        """Returns the error's fields as a dict. Values are truncated, see :func:`_preview`"""
+        return {'code': self.code, 'argument': self.argument.name, 'message': self.message}
+
+    def __str__(self):
+        message = self.message
+        return message.encode('utf-8') if isinstance(message, unicode) else message
+
+    def __unicode__(self):
+        message = self.message
+        return message if isinstance(message, unicode) else message.decode('utf-8', 'replace')
 
 
 class MissingParameterError(ParserError):
     MISSING_PARAMETER_FORMAT = u'Missing required parameter {0} in {1}'
+    code = 'missing_parameter'
 
-    def __init__(self, argument):
-        ParserError.__init__(self, argument)
+    def format_message(self):
+        argument = self.argument
         if isinstance(argument.location, basestring):
-            self.message = self.MISSING_PARAMETER_FORMAT.format(
+            return self.MISSING_PARAMETER_FORMAT.format(
                 argument.name, _friendly_location.get(argument.location, argument.location))
         elif isinstance(argument.location, list):
-            self.message = self.MISSING_PARAMETER_FORMAT.format(argument.name, argument.location)
+            return self.MISSING_PARAMETER_FORMAT.format(argument.name, argument.location)
         else:
             friendly_locations = [_friendly_location.get(loc, loc) for loc in argument.location]
-            self.message = self.MISSING_PARAMETER_FORMAT.format(argument.name, ' or '.join(friendly_locations))
+            return self.MISSING_PARAMETER_FORMAT.format(argument.name, ' or '.join(friendly_locations))
 
 
 class InvalidParameterValue(ParserError):
+    """Raised for values that fail to convert.
+
+    :param inner_error_message: The conversion error, or its message
+    """
+    code = 'invalid_value'
+
     def __init__(self, argument, value, inner_error_message):
         ParserError.__init__(self, argument)
-        self.message = "Invalid value for %s: %s (%s). %s" % (
-            argument.name, value, inner_error_message, argument.help or '')
+        self.value = value
+        self.inner_error = inner_error_message
+
+    @property
+    def inner_error_message(self):
+        return _error_text(self.inner_error)
+
+    def format_message(self):
+        return "Invalid value for %s: %s (%s). %s" % (
+            self.argument.name, _preview(self.value), _preview(self.inner_error_message, _PREVIEW_LENGTH * 2),
+            self.argument.help or '')
+
+    def to_dict(self):
+        result = ParserError.to_dict(self)
+        result['value'] = _preview(self.value)
+        return result
 
 
 class InvalidChoiceParameterValue(InvalidParameterValue):
+    code = 'invalid_choice'
+
     def __init__(self, argument, value):
-        InvalidParameterValue.__init__(self, argument, value, "%s is not a valid choice value" % value)
+        InvalidParameterValue.__init__(self, argument, value, None)
+
+    @property
+    def inner_error_message(self):
+        return "%s is not a valid choice value" % _preview(self.value)
+
+
+class InvalidRequestBodyError(ParserError):
+    """Raised for request bodies that fail to decode.
+
+    :param inner_error_message: The decoding error, or its message
+    """
+    code = 'invalid_body'
+
+    def __init__(self, inner_error_message):
+        ParserError.__init__(self, None)
+        self.inner_error = inner_error_message
+
+    def format_message(self):
+        return u'Invalid JSON in the post body (%s)' % _error_text(self.inner_error)
+
+    def to_dict(self):
+        return {'code': self.code, 'message': self.message}
+
+
+_PREVIEW_LENGTH = 100
+_PREVIEW_ITEMS = 10
+
+
+_BUFFER_TYPES = (bytearray, buffer, memoryview)
+
+
+def _preview(value, limit=_PREVIEW_LENGTH):
+    """Returns the text of value for error messages, without converting long strings, buffers or
+    containers to text in full: strings and buffers are described by their first limit characters,
+    containers of more than _PREVIEW_ITEMS items by their size and other containers by a preview
+    of their items (see :func:`_bounded_repr`).
+    """
+    if isinstance(value, basestring):
+        return value if len(value) <= limit else value[:limit] + '... (%d characters)' % len(value)
+
+    if isinstance(value, _BUFFER_TYPES):
+        head = _buffer_head(value, limit)
+        return head if len(value) <= limit else head + '... (%d bytes)' % len(value)
+
+    if isinstance(value, (list, tuple, dict, set, frozenset)):
+        if len(value) > _PREVIEW_ITEMS:
+            return '<%s of %d items>' % (type(value).__name__, len(value))
+
+        return _bounded_repr(value, limit)
+
+    text = '%s' % (value,)
+    return text if len(text) <= limit else text[:limit] + '...'
+
+
+def _buffer_head(value, size):
+    head = value[:size]
+    return head.tobytes() if isinstance(head, memoryview) else str(head)
+
+
+def _bounded_repr(value, limit):
+    """Returns repr(value), cut short with '...' after about limit characters. Strings, buffers and
+    containers (recursively) are only converted as far as needed, so nested values of any size
+    are cheap to preview.
+    """
+    if isinstance(value, basestring):
+        return repr(value) if len(value) <= limit else repr(value[:limit]) + '...'
+
+    if isinstance(value, _BUFFER_TYPES):
+        return '%s(%r%s)' % (type(value).__name__, _buffer_head(value, limit), '...' if len(value) > limit else '')
+
+    if isinstance(value, dict):
+        opening, closing, items = '{', '}', value.iteritems()
+    elif isinstance(value, list):
+        opening, closing, items = '[', ']', value
+    elif isinstance(value, tuple):
+        opening, closing, items = '(', ',)' if len(value) == 1 else ')', value
+    elif isinstance(value, (set, frozenset)):
+        opening, closing, items = type(value).__name__ + '([', '])', value
+    else:
+        text = repr(value)
+        return text if len(text) <= limit else text[:limit] + '...'
+
+    parts = []
+    remaining = limit
+    for i, item in enumerate(items):
+        if remaining <= 0 or i >= _PREVIEW_ITEMS:
+            parts.append('...')
+            break
+
+        if isinstance(value, dict):
+            key = _bounded_repr(item[0], remaining)
+            text = '%s: %s' % (key, _bounded_repr(item[1], remaining - len(key) - 2))
+        else:
+            text = _bounded_repr(item, remaining)
+
+        parts.append(text)
+        remaining -= len(text) + 2
+
+    return opening + ', '.join(parts) + closing
+
+
+def _error_text(error):
+    return error if isinstance(error, basestring) or error is None else str(error)
+
+
+class Interval(object):
+    """A choices container for a range of values that checks bounds instead of testing membership. Ex::
+
+        parser.add_argument('page_size', type=int, choices=Interval(1, 100))
+
+    :param min_value: The lowest allowed value (inclusive), or None for no lower bound.
+    :param max_value: The highest allowed value (inclusive), or None for no upper bound.
+    :param step: If given, only min_value plus multiples of step are allowed.
+    """
+
+    def __init__(self, min_value=None, max_value=None, step=None):
+        if step is not None and min_value is None:
+            raise ValueError('An Interval with a step requires a min_value')
+
+        self.min_value = min_value
+        self.max_value = max_value
+        self.step = step
+        self._numeric = isinstance(min_value, numbers.Number) or isinstance(max_value, numbers.Number)
+
+    @classmethod
+    def from_range(cls, values):
+        """Returns an Interval containing the same values as the given range/xrange"""
+        if not len(values):
+            return cls(1, 0)
+
+        first, last = values[0], values[-1]
+        step = values[1] - first if len(values) > 1 else 1
+        return cls(min(first, last), max(first, last), abs(step))
+
+    def __contains__(self, value):
+        if self._numeric and not isinstance(value, numbers.Number):
+            return False
+
+        try:
+            if self.min_value is not None and value < self.min_value:
+                return False
+
+            if self.max_value is not None and value > self.max_value:
+                return False
+
+            if self.step is not None and (value - self.min_value) % self.step:
+                return False
+        except TypeError:
+            return False
+
+        return True
+
+    def __repr__(self):
+        return 'Interval(%r, %r, %r)' % (self.min_value, self.max_value, self.step)
+
+
+def _normalize_choices(choices, case_sensitive):
+    """Returns choices as a container with fast membership tests, or None if there are no choices.
+
+    Iterables become frozensets (tuples if their items aren't hashable), lowercased when
+    case_sensitive is False, and xranges become an :class:`Interval`. Other containers are
+    used as is.
+    """
+    if isinstance(choices, xrange):
+        return Interval.from_range(choices)
+
+    if not hasattr(choices, '__iter__'):
+        return choices or None
+
+    if not case_sensitive:
+        choices = [choice.lower() if hasattr(choice, 'lower') else choice for choice in choices]
+
+    try:
+        return frozenset(choices) or None
+    except TypeError:
+        return tuple(choices) or None
+
+
+def _is_valid_choice(value, choices):
+    try:
+        return value in choices
+    except TypeError:
+        # Unhashable values (e.g. lists from a JSON body) can't be in a frozenset
+        return False
 
 
 _friendly_location = {
@@ -51,7 +306,367 @@ _friendly_location = {
 }
 
 
+_TRUE_STRINGS = frozenset(['True', 'true', '1', 't', 'y', 'yes'])
+
+_EMPTY_SOURCE = MultiDict()
+
+_JSON_LOCATIONS = frozenset(['json', 'json_body'])
+
+_JSON_CONTENT_TYPES = frozenset(['application/json', 'text/json'])
+
+
+def _source_values(source, name):
+    """Returns all the values of name in source, which can be a MultiDict, a dict or anything with getlist/getall"""
+    if hasattr(source, "getlist"):
+        return source.getlist(name)
+    elif hasattr(source, "getall"):
+        return source.getall(name)
+    else:
+        return [source.get(name)]
+
+
+_FAST_CONVERTERS = {
+    int: int,
+    long: long,
+    float: float,
+    str: str,
+    unicode: unicode,
+    bool: lambda value: str(value) in _TRUE_STRINGS,
+    decimal.Decimal: lambda value: decimal.Decimal(str(value)),
+}
+
+
+# Relative costs of converting a value, used to order conversions (see RequestParser._compile_values)
+_FAST_CONVERTER_COST = 1
+_DEFAULT_COST = 10
+
+
+def _argument_cost(argument):
+    """Returns the argument's declared cost, its type's cost attribute or an estimate from its type"""
+    if argument.cost is not None:
+        return argument.cost
+
+    cost = getattr(argument.type, 'cost', None)
+    if isinstance(cost, numbers.Number):
+        return cost
+
+    try:
+        if argument.type in _FAST_CONVERTERS:
+            return _FAST_CONVERTER_COST
+    except TypeError:
+        pass
+
+    return _DEFAULT_COST
+
+
+def _is_deterministic(argument):
+    """Returns whether the argument's parsed value only depends on its raw values in the request.
+
+    That's the case for builtin types and types with a true deterministic attribute, as long as
+    the argument's default isn't callable and it doesn't override convert() or parse().
+    """
+    if callable(argument.default) or isinstance(argument.type, BatchedType) \
+            or _is_overridden(argument, 'convert') or _is_overridden(argument, 'parse'):
+        return False
+
+    if getattr(argument.type, 'deterministic', False) is True:
+        return True
+
+    try:
+        return argument.type in _FAST_CONVERTERS
+    except TypeError:
+        return False
+
+
+_IMMUTABLE_TYPES = frozenset([type(None), bool, int, long, float, str, unicode, decimal.Decimal,
+                              datetime.date, datetime.datetime, datetime.time, datetime.timedelta])
+
+
+def _copy_result(value):
+    """Returns value, or a deep copy of it if it may be mutable"""
+    return value if type(value) in _IMMUTABLE_TYPES else copy.deepcopy(value)
+
+
+def _memo_key(raw, positions):
+    """Returns the memo key of the raw values at positions, or None if they're not hashable.
+
+    Values are keyed with their types, since equal values of different types (1, 1.0, True)
+    can convert differently.
+    """
+    key = tuple(tuple((type(value), value) for value in raw[position]) for position in positions)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+
+    return key
+
+
+def _canonical(value):
+    """Returns a JSON serializable normal form of a parsed value, see :meth:`RequestParser.cache_key`"""
+    if value is None or isinstance(value, (bool, numbers.Integral, float, unicode)):
+        return value
+
+    if isinstance(value, str):
+        # Byte strings that aren't UTF-8 are tagged and hex encoded, so that no two of them collide
+        try:
+            return value.decode('utf-8')
+        except UnicodeDecodeError:
+            return {u'bytes': value.encode('hex')}
+
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return unicode(value)
+
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+
+    if isinstance(value, (dict, Record, LazyNamespace)):
+        return dict((unicode(key), _canonical(item)) for key, item in value.items())
+
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+
+    if isinstance(value, (set, frozenset)):
+        return sorted((_canonical(item) for item in value), key=_canonical_text)
+
+    if hasattr(value, 'tolist'):
+        # array.array and NumPy arrays
+        return _canonical(value.tolist())
+
+    if hasattr(value, 'urlsafe'):
+        # ndb keys
+        return u'key:' + value.urlsafe()
+
+    if hasattr(getattr(value, 'key', None), 'urlsafe'):
+        # ndb entities
+        return u'key:' + value.key.urlsafe()
+
+    return u'repr:' + repr(value).decode('utf-8', 'replace')
+
+
+def _canonical_text(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+def _positional_arity(func):
+    """Returns how many positional arguments func requires and accepts when called as a (required, accepted)
+    tuple, or None if it can't be inspected (builtins)
+    """
+    try:
+        if inspect.isclass(func):
+            func, bound = func.__init__, True
+        elif not (inspect.isfunction(func) or inspect.ismethod(func)):
+            func, bound = func.__call__, True
+        else:
+            bound = False
+
+        if inspect.ismethod(func):
+            bound = bound or func.__self__ is not None
+        elif not inspect.isfunction(func):
+            return None
+
+        spec = inspect.getargspec(func)
+    except (AttributeError, TypeError):
+        return None
+
+    offset = 1 if bound else 0
+    required = len(spec.args) - len(spec.defaults or ()) - offset
+    accepted = float('inf') if spec.varargs else len(spec.args) - offset
+    return required, accepted
+
+
+def _make_converter(arg_type, name):
+    """Returns a function that converts a single value to arg_type.
+
+    Types that require a second argument are called as type(value, name) and types that only
+    accept one as type(value). The calling convention is detected here, once, so values don't
+    pay for a failed call. Types whose second argument is optional (e.g. uuid.UUID) and types
+    that can't be inspected are called as type(value, name), falling back to type(value) when
+    that raises a TypeError.
+    """
+    try:
+        return _FAST_CONVERTERS[arg_type]
+    except (KeyError, TypeError):
+        pass
+
+    arity = _positional_arity(arg_type)
+    if arity is not None and arity[0] >= 2:
+        return lambda value: arg_type(value, name)
+
+    if arity is not None and arity[1] < 2:
+        return arg_type
+
+    def convert(value):
+        try:
+            return arg_type(value, name)
+        except TypeError:
+            return arg_type(value)
+
+    return convert
+
+
+def _is_overridden(obj, method_name):
+    return getattr(type(obj), method_name).__func__ is not getattr(Argument, method_name).__func__
+
+
+class ParseContext(object):
+    """Holds the state of parsing a single request, shared by all of the parser's arguments.
+
+    Request locations are resolved at most once per request: webob re-decodes the body on
+    every access to request.json and builds a new MultiDict on every access to request.params,
+    so resolving them per argument is expensive. Likewise, multi-valued sources are indexed
+    by name in a single pass instead of scanning them with getall() for every argument (other
+    multi-valued sources are still read with getlist()/getall()).
+
+    The JSON body locations are planned from the request's Content-Type and Content-Length:
+    they resolve to None without decoding anything when the body isn't JSON or there's no body
+    (e.g. a GET sent with a JSON Content-Type), and a non-empty JSON body that fails to decode
+    raises a single :class:`InvalidRequestBodyError`.
+
+    With stream_json, the JSON body locations are read from request.body_file with
+    :func:`~webapp2_restful.reqparse.json_stream.extract_json_keys`, which only decodes the values
+    of the looked up names (so names have to be given). Other values in the body are skipped.
+    Streaming only pays off for large bodies whose values are mostly skipped: it is slower than
+    decoding the body with json.loads for small bodies and for bodies made of many small values
+    (e.g. a long list of objects), see benchmarks/bench_json_stream.py.
+
+    With keep_body (the default), bodies that aren't seekable (e.g. a server's wsgi.input) are
+    first copied in full with webob's make_body_seekable() (into a temporary file when they're
+    large), so that the handler can still read request.body afterwards. Without keep_body, or for
+    requests without make_body_seekable() (i.e. that aren't webob requests), the body is read
+    straight from body_file, which consumes non-seekable bodies.
+
+    :param request: The request being parsed
+    :param names: The argument names that will be looked up. When given, only these names are indexed.
+    :param stream_json: Whether to decode only the looked up names from JSON bodies
+    :param keep_body: Whether a streamed body has to stay readable by the handler
+    """
+
+    def __init__(self, request, names=None, stream_json=False, keep_body=True):
+        self.request = request
+        self.names = names
+        self.stream_json = stream_json and names is not None
+        self.keep_body = keep_body
+        self.sources = {}
+        self.errors = {}
+        self.indexes = {}
+
+    def resolve(self, location):
+        """Returns the request's attribute named location (called if it's callable) or None if it's missing.
+
+        Errors raised while resolving are re-raised on every subsequent call for the same location.
+        """
+        try:
+            return self.sources[location]
+        except KeyError:
+            pass
+
+        if location in self.errors:
+            raise self.errors[location]
+
+        is_json = location in _JSON_LOCATIONS
+        if is_json and not self.has_json_body():
+            self.sources[location] = None
+            return None
+
+        try:
+            if is_json and self.stream_json and hasattr(self.request, 'body_file'):
+                value = self._stream_json()
+            else:
+                value = getattr(self.request, location, None)
+                if callable(value):
+                    value = value()
+        except Exception as error:
+            if is_json and isinstance(error, ValueError):
+                if self._has_empty_body():
+                    self.sources[location] = None
+                    return None
+
+                error = InvalidRequestBodyError(error)
+
+            self.errors[location] = error
+            raise error
+
+        self.sources[location] = value
+        return value
+
+    def _stream_json(self):
+        # Both JSON locations are the same body, which can only be read from the stream once
+        for location in _JSON_LOCATIONS:
+            if location in self.sources:
+                return self.sources[location]
+            if location in self.errors:
+                raise self.errors[location]
+
+        request = self.request
+        if self.keep_body and hasattr(request, 'make_body_seekable'):
+            request.make_body_seekable()
+
+        value = extract_json_keys(request.body_file, self.names, getattr(request, 'charset', None) or 'utf-8')
+        if getattr(request, 'is_body_seekable', False):
+            request.body_file_raw.seek(0)
+
+        return value
+
+    def has_json_body(self):
+        """Returns whether the request's body should be decoded as JSON, judging by its headers.
+
+        Requests that don't expose content_type/content_length (i.e. aren't webob requests) are
+        assumed to have one and left for the location lookup to decide.
+        """
+        try:
+            content_type = self.request.content_type or ''
+            content_length = self.request.content_length
+        except AttributeError:
+            return True
+
+        if content_length == 0 or not getattr(self.request, 'is_body_readable', True):
+            return False
+
+        return content_type in _JSON_CONTENT_TYPES or content_type.endswith('+json')
+
+    def _has_empty_body(self):
+        # Bodies without a Content-Length (e.g. chunked) are only found to be empty by reading them
+        body = getattr(self.request, 'body', None)
+        return isinstance(body, basestring) and not body.strip()
+
+    def values(self, source, name):
+        """Returns all the values of name in source. Equivalent to looking them up with getlist/getall/get"""
+        try:
+            index = self.indexes[id(source)][1]
+        except KeyError:
+            index = self._index(source)
+            self.indexes[id(source)] = (source, index)
+
+        if index is None:
+            return _source_values(source, name)
+
+        return index.get(name, ())
+
+    def _index(self, source):
+        # Only webob MultiDicts are known to yield every (name, value) pair from iteritems(), other
+        # multi-valued sources (e.g. werkzeug's MultiDict, which has getlist) yield one value per name
+        if hasattr(source, "getlist") or not (hasattr(source, "getall") and hasattr(source, "iteritems")):
+            return None
+
+        names = self.names
+        index = {}
+        for key, value in source.iteritems():
+            if names is None or key in names:
+                if key in index:
+                    index[key].append(value)
+                else:
+                    index[key] = [value]
+
+        return index
+
+
 class Namespace(dict):
+    __slots__ = ()
+
     def __getattr__(self, name):
         try:
             return self[name]
@@ -62,13 +677,241 @@ class Namespace(dict):
         self[name] = value
 
 
+class LazyNamespace(collections.MutableMapping):
+    """A namespace whose values are converted when they're first read. Ex::
+
+        parser = RequestParser(namespace_class=LazyNamespace)
+        args = parser.parse_args(request)
+        args.foo
+
+    parse_args() only looks the arguments' raw values up, raising :class:`MissingParameterError`
+    for missing required arguments right away. Each value is converted and validated the first
+    time it's read (raising :class:`InvalidParameterValue` then) and memoized, so handlers don't
+    pay for converting arguments they don't use. Arguments missing from the request get their
+    default immediately.
+
+    Unlike :class:`Namespace` it isn't a dict (whose storage dict() and f(**args) would read
+    directly, skipping the pending values) but a mutable mapping with attribute access: reading
+    every value (dict(args), f(**args), items(), values(), comparisons, repr()) converts the
+    remaining ones.
+    """
+    __slots__ = ('_values', '_pending')
+
+    def __init__(self, *args, **kwargs):
+        object.__setattr__(self, '_values', {})
+        object.__setattr__(self, '_pending', {})
+        self.update(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if name in LazyNamespace.__slots__:
+            # Not set yet, e.g. while unpickling
+            raise AttributeError(name)
+
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+    def __delattr__(self, name):
+        try:
+            del self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def defer(self, key, resolve, values):
+        """Sets key's value to resolve(values), called when the key is first read"""
+        self._values.pop(key, None)
+        self._pending[key] = (resolve, values)
+
+    @property
+    def pending(self):
+        """The keys whose values haven't been converted yet"""
+        return frozenset(self._pending)
+
+    def resolve_all(self):
+        """Converts all the pending values"""
+        for key in list(self._pending):
+            self[key]  # pylint: disable=W0104
+
+        return self
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+
+        try:
+            resolve, values = self._pending[key]
+        except KeyError:
+            raise KeyError(key)
+
+        value = resolve(values)
+        del self._pending[key]
+        self._values[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        self._pending.pop(key, None)
+        self._values[key] = value
+
+    def __delitem__(self, key):
+        if self._pending.pop(key, None) is None:
+            del self._values[key]
+
+    def __contains__(self, key):
+        return key in self._values or key in self._pending
+
+    has_key = __contains__
+
+    def __iter__(self):
+        for key in list(self._values):
+            yield key
+
+        for key in list(self._pending):
+            yield key
+
+    def __len__(self):
+        return len(self._values) + len(self._pending)
+
+    def keys(self):
+        return list(self)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def clear(self):
+        self._pending.clear()
+        self._values.clear()
+
+    def to_dict(self):
+        """Returns the converted values as a dict"""
+        return dict(self.resolve_all()._values)
+
+    def copy(self):
+        return self.__class__(self.to_dict())
+
+    def __reduce__(self):
+        return self.__class__, (self.to_dict(),)
+
+    def __eq__(self, other):
+        if isinstance(other, LazyNamespace):
+            other = other.to_dict()
+
+        if not isinstance(other, collections.Mapping):
+            return NotImplemented
+
+        return self.to_dict() == dict(other.items())
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.to_dict())
+
+
+_IDENTIFIER_RE = re.compile(r'^[A-Za-z][A-Za-z0-9_]*$')
+
+
+class Record(object):
+    """A compact, fixed-field alternative to :class:`Namespace` for parse results. Ex::
+
+        parser = RequestParser(namespace_class=Record)
+        args = parser.parse_args(request)
+        args.foo
+
+    The parser generates a Record subclass whose fields are its arguments' dest names (which
+    must be valid identifiers), stored in __slots__. Attribute access is a plain slot read and
+    results don't carry a dict. Records also support the read-only mapping methods handler
+    code commonly uses with a Namespace (args['foo'], args.get('foo'), keys(), items()).
+    """
+    __slots__ = ()
+    _fields = ()
+    _field_set = frozenset()
+
+    # pylint: disable=W0122
+    @classmethod
+    def for_fields(cls, fields):
+        """Generates a Record subclass with the given fields, initialized positionally"""
+        fields = tuple(fields)
+        for field in fields:
+            if not _IDENTIFIER_RE.match(field) or keyword.iskeyword(field) or hasattr(cls, field):
+                raise ValueError('%r is not a valid Record field name' % field)
+
+        if len(set(fields)) != len(fields):
+            raise ValueError('Record fields must be unique: %r' % (fields,))
+
+        source = 'def __init__(self%s):\n    pass\n' % ''.join(', ' + field for field in fields)
+        source += ''.join('    self.%s = %s\n' % (field, field) for field in fields)
+        namespace = {}
+        exec source in namespace
+
+        return type(cls.__name__, (cls,), {
+            '__slots__': fields,
+            '_fields': fields,
+            '_field_set': frozenset(fields),
+            '__init__': namespace['__init__'],
+        })
+
+    def __getitem__(self, key):
+        if key not in self._field_set:
+            raise KeyError(key)
+
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._field_set else default
+
+    def __contains__(self, key):
+        return key in self._field_set
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def keys(self):
+        return list(self._fields)
+
+    def items(self):
+        return [(field, getattr(self, field)) for field in self._fields]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return self.to_dict() == dict(other.items())
+
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, ', '.join('%s=%r' % item for item in self.items()))
+
+
 # pylint: disable=R0902
 class Argument(object):
+    __slots__ = ('name', 'default', 'dest', 'required', 'ignore', 'location', 'type', 'choices', 'action', 'help',
+                 'case_sensitive', 'trim', 'cost', '_converter', '_choices', '_frozen', '_version')
+
     # pylint: disable=W0622
     def __init__(self, name, default=None, dest=None, required=False, ignore=False,
                  type=unicode, location=('json', 'params',),
                  choices=(), action='store', help=None,
-                 case_sensitive=True, trim=False):
+                 case_sensitive=True, trim=False, cost=None):
         """
         :param name: Either a name or a list of option strings, e.g. foo or -f, --foo.
         :param default: The value produced if the argument is absent from the request.
@@ -77,12 +920,15 @@ class Argument(object):
         :param ignore: Whether to ignore cases where the argument fails type conversion
         :param type: The type to which the request argument should be converted. If a type raises a ValidationError, the message in the error will be returned in the response.
         :param location: Where to source the arguments from the web request (ex: headers, args, etc.), can be an iterator, can also be dict with values inside the iterator.
-        :param choices: A container of the allowable values for the argument.
+        :param choices: A container of the allowable values for the argument. Iterables are frozen into a set when the argument is created; use an :class:`Interval` for ranges of values.
         :param action: The basic type of action to be taken when this argument is encountered in the request.
         :param help: A brief description of the argument, returned in the response when the argument is invalid. This takes precedence over the message passed to a ValidationError raised by a type converter.
         :param bool case_sensitive: Whether the arguments in the request are case sensitive or not
         :param bool trim: If enabled, trims whitespace around the argument.
+        :param cost: The relative cost of converting a value, which parsers use to convert cheap arguments first. Defaults to the type's cost attribute, or an estimate.
         """
+        object.__setattr__(self, '_frozen', False)
+        object.__setattr__(self, '_version', 0)
         self.name = name
         self.default = default
         self.dest = dest
@@ -95,6 +941,46 @@ class Argument(object):
         self.help = help
         self.case_sensitive = case_sensitive
         self.trim = trim
+        self.cost = cost
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise TypeError("Can't modify frozen argument %s" % self.name)
+
+        super(Argument, self).__setattr__(name, value)
+        object.__setattr__(self, '_version', self._version + 1)
+
+        if name in ('name', 'type') and hasattr(self, 'name') and hasattr(self, 'type'):
+            object.__setattr__(self, '_converter', _make_converter(self.type, self.name))
+        elif name in ('choices', 'case_sensitive') and hasattr(self, 'choices') and hasattr(self, 'case_sensitive'):
+            object.__setattr__(self, '_choices', _normalize_choices(self.choices, self.case_sensitive))
+
+    def __getstate__(self):
+        state = dict((slot, getattr(self, slot)) for slot in Argument.__slots__)
+        state.update(getattr(self, '__dict__', {}))
+        return state
+
+    def __setstate__(self, state):
+        for slot, value in state.iteritems():
+            object.__setattr__(self, slot, value)
+
+    @property
+    def frozen(self):
+        return self._frozen
+
+    @property
+    def version(self):
+        """A counter incremented whenever one of the argument's attributes is set, which parsers
+        use to recompile when their arguments are modified
+        """
+        return self._version
+
+    def freeze(self):
+        """Makes the argument immutable. Parsing never modifies an argument so frozen arguments
+        can be shared between threads.
+        """
+        object.__setattr__(self, '_frozen', True)
+        return self
 
     # noinspection PyBroadException
     # pylint: disable=E0110, W0702
@@ -127,20 +1013,46 @@ class Argument(object):
 
         return MultiDict()
 
+    # noinspection PyBroadException
+    # pylint: disable=E0110, W0702
+    def _compile_source(self):
+        """Returns a function equivalent to :meth:`source` that resolves locations through a :class:`ParseContext`"""
+        location = self.location
+
+        if isinstance(location, basestring):
+            def source(context):
+                value = context.resolve(location)
+                return _EMPTY_SOURCE if value is None else value
+
+            return source
+
+        locations = tuple(location)
+
+        def first_source(context):
+            for l in locations:
+                if isinstance(l, (dict, MultiDict)):
+                    return l
+
+                try:
+                    value = context.resolve(l)
+                except ParserError:
+                    raise
+                except:
+                    continue
+
+                if value is not None:
+                    return value
+
+            return _EMPTY_SOURCE
+
+        return first_source
+
     def convert(self, value):
         # Check if we're expecting a string and the value is None
         if value is None and inspect.isclass(self.type) and issubclass(self.type, basestring):
             return None
 
-        try:
-            if self.type is bool:
-                return str(value) in ['True', 'true', '1', 't', 'y', 'yes']
-            elif self.type is decimal.Decimal:
-                return self.type(str(value), self.name)
-            else:
-                return self.type(value, self.name)
-        except TypeError:
-            return self.type(value)
+        return self._converter(value)
 
     def parse(self, request):
         results = self.__parse_results(self.source(request))
@@ -163,22 +1075,16 @@ class Argument(object):
         return results
 
     def __parse_results(self, source, include_none=False):
-        if hasattr(source, "getlist"):
-            values = source.getlist(self.name)
-        elif hasattr(source, "getall"):
-            values = source.getall(self.name)
-        else:
-            values = [source.get(self.name)]
+        if isinstance(self.type, ListType):
+            return self.__parse_list_results(source)
 
         results = []
-        for value in values:
+        for value in _source_values(source, self.name):
             if hasattr(value, "strip") and self.trim:
                 value = value.strip()
 
             if hasattr(value, "lower") and not self.case_sensitive:
                 value = value.lower()
-                if hasattr(self.choices, "__iter__"):
-                    self.choices = [choice.lower() for choice in self.choices]
 
             try:
                 if value is not None:
@@ -186,15 +1092,395 @@ class Argument(object):
             except Exception as error:
                 if value is None or self.ignore:
                     continue
-                raise InvalidParameterValue(self, value, str(error))
+                raise InvalidParameterValue(self, value, error)
 
-            if self.choices and value not in self.choices:
+            if self._choices is not None and not _is_valid_choice(value, self._choices):
                 raise InvalidChoiceParameterValue(self, value)
 
             results.append(value)
 
         return [result for result in results if result is not None or include_none]
 
+    def __parse_list_results(self, source):
+        values = [value.strip() if self.trim and hasattr(value, "strip") else value
+                  for value in _source_values(source, self.name) if value is not None]
+        if not values:
+            return []
+
+        try:
+            return [self.type.convert_values(values)]
+        except Exception as error:
+            if self.ignore:
+                return []
+            raise InvalidParameterValue(self, values[0] if len(values) == 1 else values, error)
+
+    def compile(self):
+        """Compiles the argument into a function that takes a :class:`ParseContext` and returns the parsed value.
+
+        The result is equivalent to :meth:`parse` but everything that only depends on the
+        argument's configuration (location lookup, type dispatch, choices, action) is decided
+        once here rather than on every request. The argument should not be modified afterwards.
+        """
+        if _is_overridden(self, 'parse'):
+            return lambda context: self.parse(context.request)
+
+        collect, finish = self.compile_steps()
+        return lambda context: finish(collect(context))
+
+    def compile_steps(self, batched=False):
+        """Compiles the argument into the two steps of parsing it, see :meth:`compile`.
+
+        Returns a (collect, finish) tuple: collect(context) returns the list of converted
+        (non-None) values found in the request and finish(values) validates them against the
+        choices and applies the action/default/required logic, returning the parsed value.
+
+        With batched=True, values are converted using the :class:`BatchedType` type's prepare()
+        and have to be resolved before being passed to finish().
+        """
+        lookup, convert_all, finish = self.compile_stages(batched)
+        return lambda context: convert_all(lookup(context)), finish
+
+    def compile_stages(self, batched=False):
+        """Compiles the argument into the three stages of parsing it, see :meth:`compile_steps`.
+
+        Returns a (lookup, convert, finish) tuple: lookup(context) returns the list of the
+        argument's raw (trimmed, non-None) values in the request, convert(values) returns the
+        list of their converted (non-None) values and finish(values) is the same as in
+        :meth:`compile_steps`. Lookups are cheap, conversions may not be.
+        """
+        argument = self
+        name = self.name
+        if _is_overridden(self, 'source'):
+            source = lambda context: self.source(context.request)
+        else:
+            source = self._compile_source()
+
+        if batched:
+            convert = self.type.prepare
+        else:
+            convert = self.convert if _is_overridden(self, 'convert') else self._converter
+
+        trim = self.trim
+        lower = not self.case_sensitive
+        ignore = self.ignore
+        required = self.required
+        default = self.default
+        append = self.action == 'append'
+        store = self.action == 'store'
+
+        choices = self._choices
+
+        def lookup_list(context):
+            values = []
+            for value in context.values(source(context), name):
+                if value is not None:
+                    values.append(value.strip() if trim and hasattr(value, "strip") else value)
+
+            return values
+
+        def convert_list(values):
+            if not values:
+                return []
+
+            try:
+                return [convert_values(values)]
+            except Exception as error:
+                if ignore:
+                    return []
+                raise InvalidParameterValue(argument, values[0] if len(values) == 1 else values, error)
+
+        def lookup(context):
+            values = []
+            for value in context.values(source(context), name):
+                if value is None:
+                    continue
+
+                if trim and hasattr(value, "strip"):
+                    value = value.strip()
+
+                if lower and hasattr(value, "lower"):
+                    value = value.lower()
+
+                values.append(value)
+
+            return values
+
+        def convert_all(values):
+            results = []
+            for value in values:
+                try:
+                    value = convert(value)
+                except Exception as error:
+                    if ignore:
+                        continue
+                    raise InvalidParameterValue(argument, value, error)
+
+                if value is not None:
+                    results.append(value)
+
+            return results
+
+        def finish(results):
+            if choices is not None:
+                for value in results:
+                    if not _is_valid_choice(value, choices):
+                        raise InvalidChoiceParameterValue(argument, value)
+
+            if not results:
+                if required:
+                    raise MissingParameterError(argument)
+
+                return default() if callable(default) else default
+
+            if append:
+                return results
+
+            if store or len(results) == 1:
+                return results[0]
+
+            return results
+
+        if isinstance(self.type, ListType) and not batched:
+            convert_values = self.type.convert_values
+            return lookup_list, convert_list, finish
+
+        return lookup, convert_all, finish
+
+    def compile_lazy(self):
+        """Compiles the argument for :class:`LazyNamespace` results.
+
+        Returns a (lookup, resolve) tuple: lookup(context) returns the argument's raw values in
+        the request, raising :class:`MissingParameterError` if a required argument has none, and
+        resolve(values) converts and validates them, returning the parsed value. resolve is None
+        for arguments that override parse(), whose lookup returns the parsed value.
+
+        Batched arguments are resolved on their own (one resolve_batch call per argument).
+        """
+        if _is_overridden(self, 'parse'):
+            return lambda context: self.parse(context.request), None
+
+        batched = self.batched
+        lookup, convert_all, finish = self.compile_stages(batched)
+        argument = self
+
+        def checked_lookup(context):
+            values = lookup(context)
+            if not values and argument.required:
+                raise MissingParameterError(argument)
+
+            return values
+
+        if batched:
+            arg_type = self.type
+            return checked_lookup, lambda values: finish(_resolve_batches([(arg_type, convert_all(values))])[0])
+
+        return checked_lookup, lambda values: finish(convert_all(values))
+
+    def compile_async(self):
+        """Compiles the argument for :meth:`RequestParser.parse_args_async`.
+
+        Returns a (lookup, start, join) tuple: lookup is the same as in :meth:`compile_stages`,
+        start(values) converts the raw values without waiting for the results that are futures
+        (see :func:`is_future`) and returns a list of (value, result) tuples, and join(started)
+        waits for them and returns the parsed value. Errors of futures raise InvalidParameterValue
+        (unless the argument ignores them), like errors of synchronous conversions.
+        """
+        lookup, _, finish = self.compile_stages()
+        argument = self
+        ignore = self.ignore
+
+        if isinstance(self.type, ListType):
+            convert_values = self.type.convert_values
+
+            def start(values):
+                if not values:
+                    return []
+
+                value = values[0] if len(values) == 1 else values
+                try:
+                    return [(value, convert_values(values))]
+                except Exception as error:
+                    if ignore:
+                        return []
+                    raise InvalidParameterValue(argument, value, error)
+        else:
+            convert = self.convert if _is_overridden(self, 'convert') else self._converter
+
+            def start(values):
+                started = []
+                for value in values:
+                    try:
+                        started.append((value, convert(value)))
+                    except Exception as error:
+                        if ignore:
+                            continue
+                        raise InvalidParameterValue(argument, value, error)
+
+                return started
+
+        def join(started):
+            results = []
+            for value, result in started:
+                if is_future(result):
+                    try:
+                        result = future_result(result)
+                    except Exception as error:
+                        if ignore:
+                            continue
+                        raise InvalidParameterValue(argument, value, error)
+
+                if result is not None:
+                    results.append(result)
+
+            return finish(results)
+
+        return lookup, start, join
+
+    @property
+    def batched(self):
+        """Whether parsers resolve this argument's values in batches, see :class:`BatchedType`"""
+        return isinstance(self.type, BatchedType) and self.type.batch_group is not None \
+            and not _is_overridden(self, 'parse')
+
+
+class BatchedType(object):
+    """Base class for argument types that look values up (e.g. in a datastore) and can look many up at once.
+
+    When parsing a request, a :class:`RequestParser` converts the values of all of its batched
+    arguments with :meth:`prepare` (e.g. into datastore keys) and then, for each batch_group,
+    makes a single :meth:`resolve_batch` call with the prepared values of all the arguments
+    in the group. Called directly, a batched type resolves values one at a time.
+    """
+    cost = 1000
+
+    @property
+    def batch_group(self):
+        """Types with the same (hashable) batch_group are resolved together. None disables batching."""
+        return self
+
+    def prepare(self, value):
+        """Converts a request value into what :meth:`resolve_batch` looks up"""
+        return value
+
+    def resolve_batch(self, values):
+        """Returns a list of the results of looking up each of the prepared values (None for missing ones)"""
+        raise NotImplementedError()
+
+    def resolve_batch_async(self, values):
+        """Like :meth:`resolve_batch`, but the results can be futures (see :func:`is_future`).
+        Used by :meth:`RequestParser.parse_args_async`. Looks the values up synchronously by default.
+        """
+        return self.resolve_batch(values)
+
+    def __call__(self, value):
+        return self.resolve_batch([self.prepare(value)])[0]
+
+
+def _resolve_batches(pending):
+    """Resolves a list of (batched type, prepared values) tuples, making one resolve_batch call per
+    batch_group. Returns the list of resolved (non-None) values for each tuple.
+    """
+    return [[result for result in results if result is not None]
+            for results in _start_batches(pending, 'resolve_batch')]
+
+
+def _start_batches(pending, method_name):
+    """Calls the method_name method (resolve_batch or resolve_batch_async) once per batch_group of
+    a list of (batched type, prepared values) tuples. Returns the list of results for each tuple.
+    """
+    groups = {}
+    for i, (arg_type, _) in enumerate(pending):
+        groups.setdefault(arg_type.batch_group, []).append(i)
+
+    started = [None] * len(pending)
+    for indexes in groups.itervalues():
+        values = [value for i in indexes for value in pending[i][1]]
+        results = list(getattr(pending[indexes[0]][0], method_name)(values)) if values else []
+
+        offset = 0
+        for i in indexes:
+            count = len(pending[i][1])
+            started[i] = results[offset:offset + count]
+            offset += count
+
+    return started
+
+
+def is_future(value):
+    """Returns whether value is a future: an ndb Future (e.g. returned by a tasklet) or anything
+    with a concurrent.futures-like result()/done() interface
+    """
+    return hasattr(value, 'get_result') or (hasattr(value, 'result') and hasattr(value, 'done'))
+
+
+def future_result(future):
+    """Waits for a future and returns its result, raising its exception if it failed"""
+    if hasattr(future, 'get_result'):
+        return future.get_result()
+
+    return future.result()
+
+
+class ParseFuture(object):
+    """The result of :meth:`RequestParser.parse_args_async`: the request's arguments, some of which
+    are still being converted. :meth:`get_result` waits for them and returns the parsed namespace.
+    """
+
+    def __init__(self, join):
+        self._join = join
+        self._done = False
+        self._result = None
+        self._error = None
+
+    def done(self):
+        return self._done
+
+    def get_result(self):
+        if not self._done:
+            try:
+                self._result = self._join()
+            except Exception as error:  # pylint: disable=W0703
+                self._error = error
+
+            self._join = None
+            self._done = True
+
+        if self._error is not None:
+            raise self._error
+
+        return self._result
+
+    result = get_result
+
+
+class ListType(object):
+    """Base class for argument types that convert all of an argument's values at once.
+
+    Instead of converting each of the argument's values in the request separately, arguments
+    with a list type pass all of them (e.g. repeated query params, or a single comma separated
+    or JSON array value) to one :meth:`convert_values` call, whose result is the argument's value.
+    Use them with the default store action and validate values in the type rather than with choices.
+    """
+    cost = 20
+
+    def convert_values(self, values):
+        """Returns the argument's value given the list of its (non-None) values in the request"""
+        raise NotImplementedError()
+
+    def __call__(self, value):
+        return self.convert_values([value])
+
+
+def _own_copy(arg):
+    """Returns a shallow, unfrozen copy of an argument shared with another parser"""
+    arg_copy = copy.copy(arg)
+    object.__setattr__(arg_copy, '_frozen', False)
+    return arg_copy
+
+
+def _versions(args):
+    return [arg.version for arg in args]
+
 
 class RequestParser(object):
     """Enables adding and parsing of multiple arguments in the context of a
@@ -204,12 +1490,159 @@ class RequestParser(object):
         parser.add_argument('foo')
         parser.add_argument('int_bar', type=int)
         args = parser.parse_args()
+
+        With stream_json=True, JSON bodies are read from the request's body stream and only the
+        values of the parser's arguments are decoded (see :class:`ParseContext`), which saves
+        decoding large bodies whose other keys the parser doesn't look at. It's slower than the
+        default for small bodies and for bodies made of many small values, so only enable it for
+        handlers that receive large bodies they mostly ignore. The body can still be read by the
+        handler afterwards, at the cost of copying non-seekable bodies in full; handlers that
+        don't read the body themselves can pass keep_body=False to stream it without the copy.
+
+        With namespace_class=LazyNamespace, values are only converted when the handler reads
+        them, see :class:`LazyNamespace`.
+
+        With a positive memo_size, the parsed values of up to memo_size distinct requests are
+        memoized in an LRU cache, keyed by the raw values the parser reads from the request (its
+        arguments' names in their locations). Only arguments whose value only depends on their
+        raw values take part (see :func:`_is_deterministic`), others are parsed every time.
+        Memoized values are copied unless they're immutable, and LazyNamespace results aren't
+        memoized. See :attr:`memo_stats`.
         """
 
-    def __init__(self, argument_class=Argument, namespace_class=Namespace):
-        self.args = []
+    _frozen = False
+    _compiled_async = None
+
+    def __init__(self, argument_class=Argument, namespace_class=Namespace, parent=None, stream_json=False,
+                 memo_size=0, keep_body=True):
         self.argument_class = argument_class
         self.namespace_class = namespace_class
+        self.stream_json = stream_json
+        self.keep_body = keep_body
+        self.memo_size = memo_size
+        self._memo = LRUCache(memo_size) if memo_size > 0 else None
+        self._parent = parent
+        self._args = []
+        self._overrides = {}
+        self._index = {}
+        self._shared = frozenset()
+        self._compiled = None
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise TypeError("Can't modify a frozen RequestParser")
+
+        super(RequestParser, self).__setattr__(name, value)
+
+    @property
+    def args(self):
+        """The list of the parser's arguments.
+
+            A parser created by :meth:`extend`/:meth:`copy` shares its parent's arguments until
+            this list is accessed, at which point it gets its own list, holding its own (shallow)
+            copies of the arguments it shared. Modifying them doesn't affect the parent.
+            """
+        if self._parent is not None:
+            own = set(id(arg) for arg in self._args)
+            own.update(id(arg) for arg in self._overrides.itervalues() if arg is not None)
+            self.args = [arg if id(arg) in own else _own_copy(arg) for arg in self._iter_args()]
+        elif self._shared:
+            shared = self._shared
+            self.args = [_own_copy(arg) if id(arg) in shared else arg for arg in self._args]
+
+        return self._args
+
+    @args.setter
+    def args(self, args):
+        self._parent = None
+        self._overrides = {}
+        self._shared = frozenset()
+        self._args = args
+
+    @property
+    def frozen(self):
+        return self._frozen
+
+    def freeze(self):
+        """Makes the parser and its arguments immutable and compiles it.
+
+            All the state of parsing a request lives in a :class:`ParseContext` local to the
+            parse_args() call, so a frozen parser can be defined once at module level and shared
+            by all the threads of a multi-threaded server. Use :meth:`copy` to derive a
+            modifiable parser from a frozen one.
+            """
+        if not self._frozen:
+            # Shared arguments are copied first, so that the parent's arguments aren't frozen
+            args = tuple(self.args)
+            for arg in args:
+                arg.freeze()
+
+            self.args = args
+            self.compile()
+            object.__setattr__(self, '_frozen', True)
+
+        return self
+
+    def _ensure_not_frozen(self):
+        if self._frozen:
+            raise TypeError("Can't modify a frozen RequestParser")
+
+    def _iter_args(self):
+        if self._parent is not None:
+            overrides = self._overrides
+            for arg in self._parent._iter_args():
+                if arg.name not in overrides:
+                    yield arg
+                elif overrides[arg.name] is not None:
+                    yield overrides[arg.name]
+
+        for arg in self._args:
+            yield arg
+
+    def _own_position(self, name):
+        """Returns the position of the argument called name in this parser's own list of arguments, or None"""
+        args = self._args
+        position = self._index.get(name)
+        if position is not None and position < len(args) and args[position].name == name:
+            return position
+
+        # The index is missing name or is stale (arguments were added or args was modified
+        # directly), rebuild it. It's only a cache so it's rebuilt even when the parser is frozen.
+        object.__setattr__(self, '_index', dict((arg.name, i) for i, arg in reversed(list(enumerate(args)))))
+        return self._index.get(name)
+
+    def _has_inherited(self, name):
+        parser = self._parent
+        while parser is not None:
+            if name in parser._overrides:
+                return parser._overrides[name] is not None
+
+            if parser._own_position(name) is not None:
+                return True
+
+            parser = parser._parent
+
+        return False
+
+    def _set_argument(self, name, new_arg):
+        """Replaces (or removes, when new_arg is None) the argument called name. Returns whether it was found."""
+        position = self._own_position(name)
+        if position is not None:
+            if new_arg is None:
+                del self._args[position]
+                self._index = {}
+            else:
+                self._args[position] = new_arg
+            return True
+
+        if name in self._overrides:
+            if self._overrides[name] is None:
+                return False
+        elif not self._has_inherited(name):
+            return False
+
+        self._overrides[name] = new_arg
+        return True
 
     def add_argument(self, *args, **kwargs):
         """Adds an argument to be parsed.
@@ -220,35 +1653,331 @@ class RequestParser(object):
             See :class:`Argument`'s constructor for documentation on the
             available options.
             """
+        self._ensure_not_frozen()
         if len(args) == 1 and isinstance(args[0], self.argument_class):
-            self.args.append(args[0])
+            self._args.append(args[0])
         else:
-            self.args.append(self.argument_class(*args, **kwargs))
+            self._args.append(self.argument_class(*args, **kwargs))
         return self
 
+    def compile(self):
+        """Compiles the parser's arguments into a single function that takes a request and
+            returns the parsed namespace. See :meth:`Argument.compile`.
+
+            The compiled function is cached and rebuilt whenever the parser's arguments change:
+            when arguments are added, replaced or removed, or their attributes are set (see
+            :attr:`Argument.version`). parse_args() compiles on first use so calling this is only needed to pay the
+            compilation cost up front (e.g. at import time).
+            """
+        compiled = self._compiled
+        if self._frozen:
+            return compiled[2]
+
+        args = self._args if self._parent is None else list(self._iter_args())
+        if compiled is None or compiled[0] != args or compiled[1] != _versions(args):
+            args = list(args)
+            compiled = (args, _versions(args), self._compile(args))
+            self._compiled = compiled
+
+        return compiled[2]
+
+    def _compile(self, args):
+        keys = tuple(arg.dest or arg.name for arg in args)
+        names = frozenset(arg.name for arg in args)
+        if self._memo is not None:
+            self._memo.clear()
+
+        parse_values = self._compile_values(args, self._memo)
+        namespace_class = self.namespace_class
+        stream_json, keep_body = self.stream_json, self.keep_body
+
+        if inspect.isclass(namespace_class) and issubclass(namespace_class, LazyNamespace):
+            # Arguments parsed as a whole go last, after the other arguments' required checks
+            stages = tuple(sorted(((key,) + arg.compile_lazy() for key, arg in zip(keys, args)),
+                                  key=lambda stage: stage[2] is None))
+
+            def parse_lazy(request):
+                context = ParseContext(request, names, stream_json, keep_body)
+                results = namespace_class()
+                for key, lookup, resolve in stages:
+                    values = lookup(context)
+                    if resolve is None:
+                        results[key] = values
+                    elif values:
+                        results.defer(key, resolve, values)
+                    else:
+                        results[key] = resolve(values)
+
+                return results
+
+            return parse_lazy
+
+        if inspect.isclass(namespace_class) and issubclass(namespace_class, Record):
+            record_class = namespace_class.for_fields(keys)
+
+            def parse_record(request):
+                return record_class(*parse_values(ParseContext(request, names, stream_json, keep_body)))
+
+            return parse_record
+
+        def parse_args(request):
+            results = namespace_class()
+            for key, value in zip(keys, parse_values(ParseContext(request, names, stream_json, keep_body))):
+                results[key] = value
+
+            return results
+
+        return parse_args
+
+    @staticmethod
+    def _compile_values(args, memo=None):
+        """Returns a function that takes a :class:`ParseContext` and returns the list of the args' parsed values.
+
+        Parsing fails as early and cheaply as possible: the raw values of all the args are looked
+        up, and required args checked for, before any value is converted. Values are then
+        converted cheapest first (see :class:`Argument`'s cost) and batched args are resolved last.
+        Arguments that override parse() are parsed as a whole, in cost order.
+
+        With a memo (an :class:`~webapp2_restful.cache.LRUCache`), the values of deterministic
+        args are memoized by their raw values.
+        """
+        count = len(args)
+        lookups = []
+        steps = []
+        for position, arg in enumerate(args):
+            cost = _argument_cost(arg)
+            if _is_overridden(arg, 'parse'):
+                steps.append((cost, position, arg.compile(), None, None, None))
+                continue
+
+            batched = arg.batched
+            lookup, convert, finish = arg.compile_stages(batched)
+            lookups.append((position, lookup, arg.required, arg))
+            steps.append((cost, position, None, convert, finish, arg.type if batched else None))
+
+        steps.sort(key=lambda step: step[:2])
+        lookups, steps = tuple(lookups), tuple(step[1:] for step in steps)
+        batched = tuple((position, finish) for position, _, _, finish, arg_type in steps if arg_type is not None)
+
+        memoized = tuple(position for position, arg in enumerate(args) if _is_deterministic(arg))
+        if memo is None or not memoized:
+            memo = None
+        else:
+            memoized_set = frozenset(memoized)
+            other_steps = tuple(step for step in steps if step[0] not in memoized_set)
+
+        def parse_values(context):
+            raw = [None] * count
+            for position, lookup, required, arg in lookups:
+                found = lookup(context)
+                if required and not found:
+                    raise MissingParameterError(arg)
+
+                raw[position] = found
+
+            values = [None] * count
+            key = cached = None
+            parse_steps = steps
+            if memo is not None:
+                key = _memo_key(raw, memoized)
+                cached = memo.get(key) if key is not None else None
+                if cached is not None:
+                    for position, value in zip(memoized, cached):
+                        values[position] = _copy_result(value)
+                    parse_steps = other_steps
+
+            pending = []
+            for position, parse, convert, finish, arg_type in parse_steps:
+                if parse is not None:
+                    values[position] = parse(context)
+                elif arg_type is not None:
+                    pending.append((arg_type, convert(raw[position])))
+                else:
+                    values[position] = finish(convert(raw[position]))
+
+            if pending:
+                for (position, finish), resolved in zip(batched, _resolve_batches(pending)):
+                    values[position] = finish(resolved)
+
+            if key is not None and cached is None:
+                memo.set(key, tuple(_copy_result(values[position]) for position in memoized))
+
+            return values
+
+        return parse_values
+
     def parse_args(self, request):
-        results = self.namespace_class()
+        return self.compile()(request)
 
-        for arg in self.args:
-            value = arg.parse(request)
-            key = arg.dest or arg.name
-            results[key] = value
+    def parse_args_async(self, request):
+        """Parses the request like :meth:`parse_args`, without waiting for the conversions that
+        return futures (see :func:`is_future`), and returns a :class:`ParseFuture`. Ex::
 
-        return results
+            future = parser.parse_args_async(self.request)
+            ...
+            args = future.get_result()
+
+        Argument types can return futures (e.g. ndb tasklets, or futures of a thread pool) and
+        batched types can return them from :meth:`BatchedType.resolve_batch_async`, so that all
+        the arguments' lookups run concurrently and are waited for once, in get_result().
+        Synchronous types work as in :meth:`parse_args`. Missing required arguments and errors
+        of synchronous conversions are raised right away, errors of futures by get_result().
+        Parse results aren't memoized.
+        """
+        return self.compile_async()(request)
+
+    def compile_async(self):
+        """Compiles the parser for :meth:`parse_args_async`, see :meth:`compile`"""
+        args = tuple(self._iter_args())
+        compiled = self._compiled_async
+        if compiled is None or compiled[0] != args or compiled[1] != _versions(args):
+            compiled = (args, _versions(args), self._compile_async(args))
+            # It's only a cache so it's set even when the parser is frozen
+            object.__setattr__(self, '_compiled_async', compiled)
+
+        return compiled[2]
+
+    def _compile_async(self, args):
+        keys = tuple(arg.dest or arg.name for arg in args)
+        names = frozenset(arg.name for arg in args)
+        namespace_class = self.namespace_class
+        stream_json, keep_body = self.stream_json, self.keep_body
+        count = len(args)
+
+        if inspect.isclass(namespace_class) and issubclass(namespace_class, Record):
+            build = namespace_class.for_fields(keys)
+        else:
+            def build(*values):
+                results = namespace_class()
+                for key, value in zip(keys, values):
+                    results[key] = value
+
+                return results
+
+        lookups = []
+        steps = []
+        for position, arg in enumerate(args):
+            if _is_overridden(arg, 'parse'):
+                steps.append((position, arg.compile(), None, None, None))
+            elif arg.batched:
+                lookup, convert, finish = arg.compile_stages(batched=True)
+                lookups.append((position, lookup, arg.required, arg))
+                steps.append((position, None, convert, finish, arg))
+            else:
+                lookup, start, join = arg.compile_async()
+                lookups.append((position, lookup, arg.required, arg))
+                steps.append((position, None, start, join, None))
+
+        lookups, steps = tuple(lookups), tuple(steps)
+
+        def parse_async(request):
+            context = ParseContext(request, names, stream_json, keep_body)
+            raw = [None] * count
+            for position, lookup, required, arg in lookups:
+                found = lookup(context)
+                if required and not found:
+                    raise MissingParameterError(arg)
+
+                raw[position] = found
+
+            values = [None] * count
+            started = []
+            pending = []
+            batched = []
+            for position, parse, start, join, batched_arg in steps:
+                if parse is not None:
+                    values[position] = parse(context)
+                elif batched_arg is not None:
+                    prepared = start(raw[position])
+                    pending.append((batched_arg.type, prepared))
+                    batched.append((position, join, batched_arg, prepared))
+                else:
+                    started.append((position, join, start(raw[position])))
+
+            started_batches = _start_batches(pending, 'resolve_batch_async') if pending else []
+
+            def join_all():
+                for position, join, results in started:
+                    values[position] = join(results)
+
+                for (position, finish, arg, prepared), results in zip(batched, started_batches):
+                    resolved = []
+                    for value, result in zip(prepared, results):
+                        if is_future(result):
+                            try:
+                                result = future_result(result)
+                            except Exception as error:
+                                if arg.ignore:
+                                    continue
+                                raise InvalidParameterValue(arg, value, error)
+
+                        if result is not None:
+                            resolved.append(result)
+
+                    values[position] = finish(resolved)
+
+                return build(*values)
+
+            return ParseFuture(join_all)
+
+        return parse_async
+
+    @staticmethod
+    def cache_key(args):
+        """Returns a stable key (a hex digest) of parsed args, e.g. for caching responses.
+
+        Requests with the same parsed values get the same key regardless of how they were sent:
+        the order of the params, whether a value came from the query string or the JSON body,
+        etc. Values are normalized first: dates become ISO strings, decimals strings, sets
+        sorted lists, arrays lists and entities/keys their urlsafe keys. UTF-8 byte strings are
+        keyed as the text they encode, other byte strings by their bytes. Declare arguments with
+        case_sensitive=False for values whose case doesn't matter.
+
+        :param args: The result of :meth:`parse_args` (a Namespace, Record or dict)
+        """
+        return hashlib.sha1(_canonical_text(_canonical(args))).hexdigest()
+
+    @property
+    def memo_stats(self):
+        """The memo's hits/misses/evictions/size counters, or None if the parser doesn't memoize results"""
+        return self._memo.stats if self._memo is not None else None
+
+    def extend(self):
+        """Creates a parser that inherits this parser's arguments.
+
+            The new parser references this parser's arguments instead of copying them and only
+            stores its own additions, replacements and removals, so deriving many parsers from
+            a shared base is cheap. Arguments added to or replaced in this parser later on are
+            seen by the new parser, unless it overrides them. The new parser copies the arguments
+            it inherits when its :attr:`args` are accessed or it's frozen, see :attr:`args`.
+            """
+        return self.__class__(self.argument_class, self.namespace_class, parent=self, stream_json=self.stream_json,
+                              memo_size=self.memo_size, keep_body=self.keep_body)
 
     def copy(self):
-        """ Creates a copy of this RequestParser with the same set of arguments """
-        parser_copy = self.__class__(self.argument_class, self.namespace_class)
-        parser_copy.args = deepcopy(self.args)
-        return parser_copy
+        """ Creates a copy of this RequestParser with the same set of arguments. The copy is never frozen.
 
+            The copy gets its own list of this parser's current arguments, so arguments added to,
+            replaced in or removed from either parser later on don't affect the other. The
+            :class:`Argument` objects themselves are shared until the copy's :attr:`args` are
+            accessed or it's frozen, when it gets its own copies of them (copy on write). Use
+            :meth:`extend` for a parser that keeps seeing this parser's changes.
+            """
+        parser_copy = self.__class__(self.argument_class, self.namespace_class, stream_json=self.stream_json,
+                                     memo_size=self.memo_size, keep_body=self.keep_body)
+        parser_copy.args = list(self._iter_args())
+        parser_copy._shared = frozenset(id(arg) for arg in parser_copy._args)
+        return parser_copy
 
     def replace_argument(self, name, *args, **kwargs):
         """ Replace the argument matching the given name with a new version. """
+        self._ensure_not_frozen()
         new_arg = self.argument_class(name, *args, **kwargs)
-        for index, arg in enumerate(self.args[:]):
-            if new_arg.name == arg.name:
-                del self.args[index]
-                self.args.append(new_arg)
-                break
+        self._set_argument(new_arg.name, new_arg)
+        return self
+
+    def remove_argument(self, name):
+        """ Remove the argument matching the given name. """
+        self._ensure_not_frozen()
+        self._set_argument(name, None)
         return self
@@ -1,59 +1,711 @@
 # -*- coding: utf-8 -*-
-import base64
+import array
+import binascii
+import numbers
 import re
+import string
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 import jsonschema
+from jsonschema.validators import validator_for
+
+from webapp2_restful.reqparse import ListType
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 __author__ = 'ekampf'
 
 
+# The regular expressions datetime.strptime uses for these directives
+_DATE_DIRECTIVES = {
+    'Y': r'(\d\d\d\d)',
+    'm': r'(1[0-2]|0[1-9]|[1-9])',
+    'd': r'(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])',
+    'H': r'(2[0-3]|[0-1]\d|\d)',
+    'M': r'([0-5]\d|\d)',
+    'S': r'(6[0-1]|[0-5]\d|\d)',
+    'f': r'([0-9]{1,6})',
+}
+
+_DATE_FIELD_WIDTHS = {'Y': 4, 'm': 2, 'd': 2, 'H': 2, 'M': 2, 'S': 2}
+
+_ISO8601_RE = re.compile(r'(\d{4})-(\d\d)-(\d\d)(?:[T ](\d\d):(\d\d)(?::(\d\d)(?:[.,](\d{1,6})\d*)?)?)?'
+                         r'(Z|[+-]\d\d(?::?\d\d)?)?\Z', re.IGNORECASE)
+
+
+def _datetime_builder(fields):
+    """Returns a function building a datetime from the strings matched for fields (strptime's defaults for the rest)"""
+    positions = tuple(fields.index(field) if field in fields else None for field in 'YmdHMS')
+    defaults = (1900, 1, 1, 0, 0, 0)
+    microsecond = fields.index('f') if 'f' in fields else None
+
+    def build(values):
+        parts = [default if position is None else int(values[position])
+                 for position, default in zip(positions, defaults)]
+        if microsecond is not None:
+            parts.append(int(values[microsecond].ljust(6, '0')))
+
+        return datetime(*parts)
+
+    return build
+
+
+def _parse_iso8601(in_date):
+    match = _ISO8601_RE.match(in_date)
+    if match is None:
+        raise ValueError('time data %r is not an ISO 8601 date' % in_date)
+
+    year, month, day, hour, minute, second, microsecond, offset = match.groups()
+    result = datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0),
+                      int(microsecond.ljust(6, '0')) if microsecond else 0)
+
+    if offset and offset.upper() != 'Z':
+        sign = -1 if offset[0] == '-' else 1
+        result -= sign * timedelta(hours=int(offset[1:3]), minutes=int(offset[-2:]) if len(offset) > 3 else 0)
+
+    return result
+
+
+def _parse_epoch(in_date):
+    return datetime.utcfromtimestamp(float(in_date))
+
+
+# pylint: disable=R0914
+def compile_date_format(date_format):
+    """
+    Returns a function that parses date strings like datetime.strptime(date_string, date_format),
+    without strptime's lock, cache lookups and generic format handling.
+
+    Formats made only of %Y %m %d %H %M %S %f %% and literal characters are compiled into a
+    regular expression matching what strptime accepts. When every field has a fixed width
+    (no %f), fully zero-padded values are parsed by slicing and the regular expression is only
+    used for the others. Other formats fall back to strptime.
+
+    Two special formats are also supported: DateStringArgument.ISO8601 (optional time, fraction
+    and UTC offset; returns a naive UTC datetime) and DateStringArgument.EPOCH (seconds since
+    the epoch; returns a naive UTC datetime).
+    """
+    if date_format == DateStringArgument.ISO8601:
+        return _parse_iso8601
+    elif date_format == DateStringArgument.EPOCH:
+        return _parse_epoch
+
+    # layout holds ('field', directive) and ('literal', character) items, or None for variable width items
+    pattern, fields, layout = [], [], []
+    i = 0
+    while i < len(date_format):
+        char = date_format[i]
+        if char == '%':
+            directive = date_format[i + 1:i + 2]
+            if directive == '%':
+                pattern.append('%')
+                layout.append(('literal', '%'))
+            elif directive in _DATE_DIRECTIVES and directive not in fields:
+                pattern.append(_DATE_DIRECTIVES[directive])
+                fields.append(directive)
+                layout.append(('field', directive) if directive in _DATE_FIELD_WIDTHS else None)
+            else:
+                return lambda in_date: datetime.strptime(in_date, date_format)
+            i += 2
+        elif char.isspace():
+            while i < len(date_format) and date_format[i].isspace():
+                i += 1
+            pattern.append(r'\s+')
+            layout.append(None)
+        else:
+            pattern.append(re.escape(char))
+            layout.append(('literal', char))
+            i += 1
+
+    regex = re.compile(''.join(pattern) + r'\Z', re.IGNORECASE)
+    build = _datetime_builder(fields)
+
+    def parse(in_date):
+        match = regex.match(in_date)
+        if match is None:
+            raise ValueError('time data %r does not match format %r' % (in_date, date_format))
+
+        return build(match.groups())
+
+    if None in layout:
+        return parse
+
+    return _compile_sliced_date_parser(layout, parse)
+
+
+# pylint: disable=W0122
+def _compile_sliced_date_parser(layout, parse):
+    """
+    Generates a parser for fully zero-padded values of a format whose fields all have a fixed
+    width (layout is the format's list of ('field', directive) and ('literal', character) items).
+    Values of any other shape are passed on to parse.
+    """
+    offset, conditions, slices, arguments = 0, [], [], {}
+    for kind, item in layout:
+        if kind == 'field':
+            end = offset + _DATE_FIELD_WIDTHS[item]
+            slices.append('in_date[%d:%d]' % (offset, end))
+            arguments[item] = 'int(in_date[%d:%d])' % (offset, end)
+            offset = end
+        else:
+            conditions.append('in_date[%d] in %r' % (offset, item.lower() + item.upper()))
+            offset += 1
+
+    build_args = ', '.join(arguments.get(field, str(default)) for field, default in zip('YmdHMS', (1900, 1, 1, 0, 0, 0)))
+    source = '\n'.join([
+        'def parse_sliced(in_date):',
+        '    if len(in_date) == %d%s:' % (offset, ''.join(' and ' + condition for condition in conditions)),
+        '        digits = %s' % ' + '.join(slices),
+        # max() rules out non-ASCII unicode digits, which strptime doesn't accept
+        '        if digits.isdigit() and max(digits) <= "9":',
+        '            return datetime(%s)' % build_args,
+        '    return parse(in_date)',
+    ])
+
+    namespace = {'datetime': datetime, 'parse': parse}
+    exec source in namespace
+    return namespace['parse_sliced']
+
+
 class DateStringArgument(object):
+    """
+    Parses date strings into datetimes.
+
+    date_format is a strptime format, one of the special ISO8601/EPOCH formats, or a list of
+    them to try in turn. Formats are compiled by :func:`compile_date_format` and, with several
+    formats, the last one to succeed is tried first on the next call.
+    """
+    cost = 5
+    deterministic = True
+    ISO8601 = 'iso8601'
+    EPOCH = 'epoch'
+
     def __init__(self, date_format='%Y-%m-%d %H:%M:%S%f'):
         self.date_format = date_format
+        formats = [date_format] if isinstance(date_format, basestring) else list(date_format)
+        self._parsers = tuple((fmt, compile_date_format(fmt)) for fmt in formats)
 
     def __call__(self, in_date):
-        return datetime.strptime(in_date, self.date_format)
+        parsers = self._parsers
+        if len(parsers) == 1:
+            return parsers[0][1](in_date)
+
+        for i, (_, parse) in enumerate(parsers):
+            try:
+                result = parse(in_date)
+            except ValueError:
+                continue
+
+            if i:
+                self._parsers = (parsers[i],) + parsers[:i] + parsers[i + 1:]
+
+            return result
+
+        raise ValueError('time data %r does not match any of the formats %r' % (in_date, [fmt for fmt, _ in parsers]))
+
+
+_validators = {}
+
+
+def get_schema_validator(schema):
+    """Returns a jsonschema validator for schema, checking the schema itself the first time it's seen.
+
+    Validators are cached by the schema's canonical JSON so all the arguments that use the
+    same schema share one validator.
+    """
+    key = json.dumps(schema, sort_keys=True)
+    validator = _validators.get(key)
+    if validator is None:
+        cls = validator_for(schema)
+        cls.check_schema(schema)
+        validator = _validators[key] = cls(schema)
+
+    return validator
+
+
+_FAST_TYPES = {
+    'string': lambda value: isinstance(value, basestring),
+    'integer': lambda value: isinstance(value, (int, long)) and not isinstance(value, bool),
+    'number': lambda value: isinstance(value, numbers.Number) and not isinstance(value, bool),
+    'boolean': lambda value: isinstance(value, bool),
+    'null': lambda value: value is None,
+    'array': lambda value: isinstance(value, list),
+    'object': lambda value: isinstance(value, dict),
+}
+
+_FAST_ANNOTATIONS = frozenset(['$schema', 'id', 'title', 'description', 'default'])
+
+
+def _fail(message):
+    raise jsonschema.ValidationError(message)
+
+
+# pylint: disable=R0911,R0912
+def compile_fast_validator(schema):
+    """Compiles schema into a function that validates instances without going through jsonschema.
+
+    Only a common subset of JSON schema draft 4 is supported: type, enum, properties, required,
+    additionalProperties, items (a single schema), min/maxLength, min/maxItems and
+    minimum/maximum. Returns None if schema uses anything else. The function raises
+    :class:`jsonschema.ValidationError` like jsonschema does, but error messages may differ.
+    """
+    if not isinstance(schema, dict) or schema.get('$schema', jsonschema.Draft4Validator.META_SCHEMA['$schema']) \
+            != jsonschema.Draft4Validator.META_SCHEMA['$schema']:
+        return None
+
+    checks = []
+    properties = {}
+
+    for keyword, value in schema.iteritems():
+        if keyword in _FAST_ANNOTATIONS:
+            continue
+        elif keyword == 'type':
+            types = [value] if isinstance(value, basestring) else value
+            if not all(t in _FAST_TYPES for t in types):
+                return None
+
+            type_checks = [_FAST_TYPES[t] for t in types]
+            checks.append(lambda instance, type_checks=type_checks, types=value:
+                          any(check(instance) for check in type_checks) or _fail('%r is not of type %r' % (instance, types)))
+        elif keyword == 'enum':
+            checks.append(lambda instance, enum=value:
+                          instance in enum or _fail('%r is not one of %r' % (instance, enum)))
+        elif keyword == 'properties':
+            for name, subschema in value.iteritems():
+                properties[name] = compile_fast_validator(subschema)
+                if properties[name] is None:
+                    return None
+
+            checks.append(lambda instance, properties=properties: not isinstance(instance, dict) or all(
+                validate(instance[name]) or True for name, validate in properties.iteritems() if name in instance))
+        elif keyword == 'required':
+            if not isinstance(value, list):
+                return None
+
+            checks.append(lambda instance, required=value: not isinstance(instance, dict) or all(
+                name in instance or _fail('%r is a required property' % name) for name in required))
+        elif keyword == 'additionalProperties':
+            if isinstance(value, bool):
+                if not value:
+                    checks.append(lambda instance: not isinstance(instance, dict) or all(
+                        name in properties or _fail('Additional properties are not allowed (%r was unexpected)' % name)
+                        for name in instance))
+            else:
+                validate_additional = compile_fast_validator(value)
+                if validate_additional is None:
+                    return None
+
+                checks.append(lambda instance, validate=validate_additional: not isinstance(instance, dict) or all(
+                    validate(item) or True for name, item in instance.iteritems() if name not in properties))
+        elif keyword == 'items':
+            validate_item = compile_fast_validator(value)
+            if validate_item is None:
+                return None
+
+            checks.append(lambda instance, validate=validate_item: not isinstance(instance, list) or all(
+                validate(item) or True for item in instance))
+        elif keyword in ('minLength', 'maxLength', 'minItems', 'maxItems'):
+            sized = basestring if keyword.endswith('Length') else list
+            if keyword.startswith('min'):
+                checks.append(lambda instance, limit=value, sized=sized: not isinstance(instance, sized) or
+                              len(instance) >= limit or _fail('%r is too short' % (instance,)))
+            else:
+                checks.append(lambda instance, limit=value, sized=sized: not isinstance(instance, sized) or
+                              len(instance) <= limit or _fail('%r is too long' % (instance,)))
+        elif keyword in ('minimum', 'maximum'):
+            if schema.get('exclusiveMinimum') or schema.get('exclusiveMaximum'):
+                return None
+
+            if keyword == 'minimum':
+                checks.append(lambda instance, limit=value: not _FAST_TYPES['number'](instance) or
+                              instance >= limit or _fail('%r is less than the minimum of %r' % (instance, limit)))
+            else:
+                checks.append(lambda instance, limit=value: not _FAST_TYPES['number'](instance) or
+                              instance <= limit or _fail('%r is greater than the maximum of %r' % (instance, limit)))
+        elif keyword in ('exclusiveMinimum', 'exclusiveMaximum') and not value:
+            continue
+        else:
+            return None
+
+    checks = tuple(checks)
+
+    def validate(instance):
+        for check in checks:
+            check(instance)
+
+    return validate
 
 
 class JSONArgument(object):
-    def __init__(self, schema=None):
+    """
+    Decodes a JSON string and optionally validates it against a JSON schema.
+
+    The schema is checked and its validator built once, when the argument is created.
+    With fast_validation=True, schemas that only use the subset of JSON schema supported by
+    :func:`compile_fast_validator` are validated without going through jsonschema.
+    """
+    cost = 50
+    deterministic = True
+
+    def __init__(self, schema=None, fast_validation=False):
         self.schema = schema
+        self._validate = None
+
+        if schema is not None:
+            if fast_validation:
+                get_schema_validator(schema)
+                self._validate = compile_fast_validator(schema)
+
+            if self._validate is None:
+                self._validate = get_schema_validator(schema).validate
 
     def __call__(self, json_str):
         if json_str is None:
             return None
 
         json_obj = json.loads(json_str)
-        if self.schema is not None:
-            jsonschema.validate(json_obj, self.schema)
+        if self._validate is not None:
+            self._validate(json_obj)
 
         return json_obj
 
 
-class EmailArgument(object):
-    def __init__(self, email_regex='^[a-z0-9!#$%&''*+/=?^_`{|}~-]+(?:\\.[a-z0-9!#$%&''*+/=?^_`{|}~-]+)*@(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\\.)+[a-z0-9](?:[a-z0-9-]*[a-z0-9])?$'):
-        self.email_regex = email_regex
+_INTEGER_TYPECODES = frozenset('bBhHiIlL')
+_FLOAT_TYPECODES = frozenset('fd')
+
+
+class NumericListArgument(ListType):
+    """
+    Converts all of an argument's values into a compact array.array of numbers (or a NumPy
+    array, if use_numpy). Values can be repeated params (ids=1&ids=2), comma separated (ids=1,2)
+    or JSON arrays (ids=[1,2], or an array in the JSON body), and are converted in bulk: numbers
+    are decoded by the json module's C scanner rather than one int()/float() call per value.
+
+    :param typecode: The array.array typecode of the values ('l' by default, 'd' for floats...).
+        The typecode's range is checked for free, e.g. 'B' only accepts 0-255.
+    :param min_value: The minimum allowed value
+    :param max_value: The maximum allowed value
+    :param choices: A collection of the allowed values
+    :param max_length: The maximum number of values, checked before they're converted
+    :param use_numpy: Return a NumPy array (sharing the array.array's memory)
+    """
+    deterministic = True
+
+    def __init__(self, typecode='l', min_value=None, max_value=None, choices=None, max_length=None,
+                 use_numpy=False):
+        if typecode in _INTEGER_TYPECODES:
+            self._item_type = int
+        elif typecode in _FLOAT_TYPECODES:
+            self._item_type = float
+        else:
+            raise ValueError('typecode must be a numeric array typecode, got %r' % typecode)
+
+        if use_numpy and numpy is None:
+            raise Exception("NumPy Required")
+
+        self.typecode = typecode
+        self.min_value = min_value
+        self.max_value = max_value
+        self.choices = frozenset(choices) if choices is not None else None
+        self.max_length = max_length
+        self.use_numpy = use_numpy
+
+    def convert_values(self, values):
+        try:
+            # Repeated params (ids=1&ids=2,3) are joined and decoded together
+            text = ','.join(values)
+        except TypeError:
+            text = None
+
+        if text is not None and '[' not in text:
+            items = self._split(text)
+        else:
+            items = []
+            for value in values:
+                if isinstance(value, (list, tuple)):
+                    if any(item is True or item is False for item in value):
+                        raise ValueError('Expected numbers, got a boolean')
+                    items.extend(value)
+                elif isinstance(value, basestring):
+                    items.extend(self._split(value))
+                else:
+                    items.append(value)
+
+                if self.max_length is not None and len(items) > self.max_length:
+                    raise ValueError('More than %d values' % self.max_length)
+
+        try:
+            result = array.array(self.typecode, items)
+        except TypeError:
+            # Values json couldn't decode as numbers (strings in a JSON array, "1.0" for an int array...)
+            result = array.array(self.typecode, [self._convert_item(item) for item in items])
+        except OverflowError as ex:
+            raise ValueError(str(ex))
+
+        self._validate(result)
+        return numpy.frombuffer(result, dtype=self.typecode) if self.use_numpy else result
+
+    def _split(self, value):
+        text = value.strip()
+        if not text:
+            return []
+
+        if self.max_length is not None and text.count(',') >= self.max_length:
+            raise ValueError('More than %d values' % self.max_length)
+
+        if 'true' in text or 'false' in text:
+            raise ValueError('Expected numbers, got a boolean')
+
+        if isinstance(text, unicode):
+            # json's C scanner is several times faster on str
+            text = text.encode('ascii')
+
+        items = json.loads(text if text[0] == '[' else '[' + text + ']')
+        if not isinstance(items, list):
+            raise ValueError('Expected a list of numbers')
+
+        return items
+
+    def _convert_item(self, item):
+        if isinstance(item, basestring):
+            return self._item_type(item)
+
+        if self._item_type is int and isinstance(item, float):
+            raise ValueError('Expected integers, got %r' % item)
+
+        if not isinstance(item, numbers.Number):
+            raise ValueError('Expected numbers, got %r' % (item,))
+
+        return item
+
+    def _validate(self, values):
+        if not values:
+            return
+
+        if self.min_value is not None and min(values) < self.min_value:
+            raise ValueError('%r is less than %r' % (min(values), self.min_value))
+
+        if self.max_value is not None and max(values) > self.max_value:
+            raise ValueError('%r is greater than %r' % (max(values), self.max_value))
+
+        if self.choices is not None and not self.choices.issuperset(values):
+            invalid = next(value for value in values if value not in self.choices)
+            raise ValueError('%r is not a valid choice' % invalid)
+
+
+class PatternArgument(object):
+    """
+    Validates string values against a regular expression, compiled once when the argument is created.
+
+    Values are first normalized (see :meth:`normalize`) and checked by :meth:`precheck`, which
+    subclasses use to cheaply reject values (by length, required characters...) before running
+    the regular expression. Validated values are returned normalized, invalid ones raise ValueError.
+
+    :param pattern: A regular expression string or compiled pattern (defaults to the class' pattern)
+    :param flags: re flags to compile pattern with
+    :param memo_size: If positive, up to this many recently validated values are remembered
+        so that validating them again is a dict lookup. The memo is cleared when full.
+    """
+    cost = 5
+    deterministic = True
+    pattern = None
+    flags = 0
+    min_length = 0
+    max_length = None
+    error_message = 'Invalid value %s'
+
+    def __init__(self, pattern=None, flags=None, memo_size=0):
+        pattern = pattern if pattern is not None else self.pattern
+        flags = flags if flags is not None else self.flags
+        self.regex = re.compile(pattern, flags) if isinstance(pattern, basestring) else pattern
+        self.memo_size = memo_size
+        self._memo = {} if memo_size > 0 else None
+
+    def normalize(self, value):
+        return value
+
+    def precheck(self, value):
+        return len(value) >= self.min_length and (self.max_length is None or len(value) <= self.max_length)
+
+    def __call__(self, value):
+        value = self.normalize(value)
+
+        memo = self._memo
+        if memo is not None and value in memo:
+            return value
+
+        if not (self.precheck(value) and self.regex.match(value)):
+            raise ValueError(self.error_message % value)
+
+        if memo is not None:
+            if len(memo) >= self.memo_size:
+                memo.clear()
+            memo[value] = True
 
-    def __call__(self, email):
-        if not re.match(self.email_regex, email.lower()):
-            raise ValueError('Invalid email address %s' % email)
+        return value
 
-        return email.lower()
+
+class EmailArgument(PatternArgument):
+    pattern = '^[a-z0-9!#$%&''*+/=?^_`{|}~-]+(?:\\.[a-z0-9!#$%&''*+/=?^_`{|}~-]+)*@(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\\.)+[a-z0-9](?:[a-z0-9-]*[a-z0-9])?$'
+    max_length = 254
+    error_message = 'Invalid email address %s'
+
+    def __init__(self, email_regex=None, memo_size=0):
+        super(EmailArgument, self).__init__(email_regex, memo_size=memo_size)
+        self.email_regex = self.regex.pattern
+
+    def normalize(self, value):
+        return value.lower()
+
+    def precheck(self, value):
+        return '@' in value and super(EmailArgument, self).precheck(value)
+
+
+class UUIDArgument(PatternArgument):
+    """A UUID in its hex form, with or without hyphens. Returned lowercased."""
+    pattern = r'[0-9a-f]{8}(-?)[0-9a-f]{4}\1[0-9a-f]{4}\1[0-9a-f]{4}\1[0-9a-f]{12}\Z'
+    min_length = 32
+    max_length = 36
+    error_message = 'Invalid UUID %s'
+
+    def normalize(self, value):
+        return value.lower()
+
+    def precheck(self, value):
+        return len(value) in (32, 36)
+
+
+class SlugArgument(PatternArgument):
+    """Lowercase letters and digits, in words separated by single hyphens"""
+    pattern = r'[a-z0-9]+(?:-[a-z0-9]+)*\Z'
+    min_length = 1
+    max_length = 255
+    error_message = 'Invalid slug %s'
+
+
+class HexIDArgument(PatternArgument):
+    """A hexadecimal id, optionally of an exact length. Returned lowercased."""
+    pattern = r'[0-9a-f]+\Z'
+    min_length = 1
+    error_message = 'Invalid hex id %s'
+
+    def __init__(self, length=None, memo_size=0):
+        super(HexIDArgument, self).__init__(memo_size=memo_size)
+        if length is not None:
+            self.min_length = self.max_length = length
+
+    def normalize(self, value):
+        return value.lower()
+
+
+class PhoneArgument(PatternArgument):
+    """An E.164 phone number. Spaces, dots, hyphens and parentheses are removed."""
+    pattern = r'\+?[1-9][0-9]{6,14}\Z'
+    min_length = 7
+    max_length = 16
+    error_message = 'Invalid phone number %s'
+
+    _separators = re.compile(r'[\s().-]+')
+
+    def normalize(self, value):
+        return self._separators.sub('', value)
+
+
+_URLSAFE_TO_STANDARD = string.maketrans('-_', '+/')
 
 
 class Base64StringArgument(object):
+    """
+    Decodes URL-safe (or standard) base 64 values.
+
+    Values can be str, unicode, bytearray or memoryview and are decoded with binascii from a
+    memoryview over them rather than copied first (URL-safe values are translated to the
+    standard alphabet, which takes one copy). Unpadded values are accepted: their whole
+    4 character groups and trailing partial group are decoded separately instead of copying
+    the value to pad it.
+
+    :param max_size: The maximum decoded size in bytes. Larger values are rejected before being decoded.
+    :param result_type: The type of the decoded value - str (the default), bytearray or memoryview
+    """
+    cost = 5
+
+    def __init__(self, max_size=None, result_type=str):
+        if result_type not in (str, bytearray, memoryview):
+            raise ValueError('result_type must be str, bytearray or memoryview')
+
+        self.max_size = max_size
+        self.result_type = result_type
+        # Memoized results are copied, which memoryviews can't be
+        self.deterministic = result_type is not memoryview
+
     def __call__(self, s):
         try:
-            return base64.urlsafe_b64decode(str(s))
-        except Exception as ex:
-            raise ValueError("Invalid base 64 value. %s" % ex.message)
+            if isinstance(s, unicode):
+                s = s.encode('ascii')
+
+            if isinstance(s, (str, bytearray)):
+                if s.find('-') != -1 or s.find('_') != -1:
+                    s = s.translate(_URLSAFE_TO_STANDARD)
+                result = self._decode(memoryview(s))
+            elif isinstance(s, memoryview):
+                # We can't search a memoryview for URL-safe characters without copying it, but as
+                # binascii skips them the decoded value comes out short (or misaligned) if it had any
+                try:
+                    result = self._decode(s, verify_size=True)
+                except binascii.Error:
+                    result = None
+
+                if result is None:
+                    result = self._decode(memoryview(s.tobytes().translate(_URLSAFE_TO_STANDARD)))
+            else:
+                raise TypeError('Expected a string, got %s' % type(s).__name__)
+        except (TypeError, ValueError, binascii.Error) as ex:
+            raise ValueError("Invalid base 64 value. %s" % ex)
+
+        if self.result_type is str:
+            return result
+
+        return self.result_type(result)
+
+    def _decode(self, data, verify_size=False):
+        size = len(data)
+        padding = 0
+        while padding < 2 and size > padding and data[size - padding - 1] == '=':
+            padding += 1
+
+        if padding and size % 4:
+            raise ValueError('Incorrect padding')
+
+        if size % 4 == 1:
+            raise ValueError('Incorrect length')
+
+        decoded_size = (size - padding) * 3 // 4
+        if self.max_size is not None and decoded_size > self.max_size:
+            raise ValueError('Decoded value is longer than %d bytes' % self.max_size)
+
+        partial = size % 4
+        if not partial:
+            result = binascii.a2b_base64(data)
+        else:
+            result = binascii.a2b_base64(data[:size - partial])
+            result += binascii.a2b_base64(data[size - partial:].tobytes() + '=' * (4 - partial))
+
+        if verify_size and len(result) != decoded_size:
+            return None
+
+        return result
 
 
 class SafeStringArgument(object):
     """
     Like a simple str argument but handles unicode input by stripping it...
     """
+    cost = 1
+    deterministic = True
+
     def __call__(self, s):
         if isinstance(s, unicode):
             return s.encode('ascii', 'ignore')
@@ -1,30 +1,219 @@
 # -*- coding: utf-8 -*-
 import base64
+import copy
+import threading
+
+from webapp2_restful.cache import LRUCache
+from webapp2_restful.reqparse import BatchedType
 
 try:
     from google.appengine.ext import ndb
 except ImportError:
-    raise Exception("NDB Required")
+    ndb = None
 
 __author__ = 'ekampf'
 
 
-class EntityIDArgument(object):
-    def __init__(self, kind, key_only=False, is_base64=False):
+class NDBClient(object):
+    """
+    The datastore client entity arguments use by default. Any object with the same key/get_multi
+    interface can be passed to the arguments instead (e.g. an in-memory stand-in in tests).
+    """
+    def __init__(self):
+        if ndb is None:
+            raise Exception("NDB Required")
+
+    def key(self, kind, entity_id):
+        return ndb.Key(kind, entity_id)
+
+    def get_multi(self, keys):
+        return ndb.get_multi(keys)
+
+    def get_multi_async(self, keys):
+        return ndb.get_multi_async(keys)
+
+
+_default_client = None
+
+
+def get_default_client():
+    """Returns the NDBClient shared by the entity arguments created without a client, so that they're
+    batched together
+    """
+    global _default_client  # pylint: disable=W0603
+    if _default_client is None:
+        _default_client = NDBClient()
+
+    return _default_client
+
+
+class _Missing(object):
+    """Marks ids known not to exist in the caches. Pickles to the module's singleton."""
+    def __reduce__(self):
+        return '_MISSING'
+
+
+_MISSING = _Missing()
+
+
+class EntityCache(object):
+    """
+    A read-through cache of entities by key, for entity arguments of frequently looked up
+    entities (the current user, store, app config...).
+
+    Keys are looked up in a process-local LRU+TTL cache first, then in an optional second-tier
+    backend with a memcache-like interface (get_multi/set_multi/delete_multi, e.g. App Engine's
+    memcache module or :class:`webapp2_restful.cache.LocalMemcache`) and only then fetched from
+    the datastore. Ids that don't exist are cached too, for negative_ttl seconds.
+
+    The local cache is shared by all the requests and threads of the process, so get_multi
+    returns copies of the cached entities (ndb entities are copied through their protocol
+    buffers, as when they're pickled): handlers can modify the entities they're given without
+    other requests seeing the changes. With copy_entities=False the cached entities themselves
+    are returned, which saves the copies but makes them read-only: a handler that modifies one
+    changes it for every request that looks it up until it expires.
+
+    :param max_size: The maximum number of entities in the local cache
+    :param ttl: Seconds entities are cached for (None to cache them until evicted locally)
+    :param negative_ttl: Seconds missing ids are cached for. 0 disables negative caching.
+    :param backend: An optional second-tier cache client
+    :param key_prefix: Prefix of the backend's keys
+    :param copy_entities: Whether to return copies of the cached entities
+    """
+    def __init__(self, max_size=1000, ttl=60, negative_ttl=10, backend=None, key_prefix='entity:',
+                 copy_entities=True):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.local = LRUCache(max_size, ttl)
+        self.backend = backend
+        self.key_prefix = key_prefix
+        self.copy_entities = copy_entities
+        self.local_hits = 0
+        self.backend_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def backend_key(key):
+        return repr(key)
+
+    def get_multi(self, keys, fetch_multi):
+        """Returns the entities of keys (None for missing ones), fetching the ones that aren't cached with fetch_multi"""
+        results = self.local.get_multi(keys)
+        local_hits = len(results)
+
+        missing = [key for key in keys if key not in results]
+        backend_hits = 0
+        if missing and self.backend is not None:
+            backend_keys = dict((self.backend_key(key), key) for key in missing)
+            found = self.backend.get_multi(backend_keys.keys(), key_prefix=self.key_prefix)
+            for backend_key, value in found.iteritems():
+                key = backend_keys[backend_key]
+                results[key] = value
+                self._set_local(key, value)
+
+            backend_hits = len(found)
+            missing = [missing_key for missing_key in missing if missing_key not in results]
+
+        if missing:
+            fetched = dict(zip(missing, fetch_multi(missing)))
+            self.set_multi(fetched)
+            results.update(fetched)
+
+        with self._lock:
+            self.local_hits += local_hits
+            self.backend_hits += backend_hits
+            self.negative_hits += sum(1 for key in keys if results.get(key) is _MISSING)
+            self.misses += len(missing)
+
+        entities = [results.get(entity_key) for entity_key in keys]
+        if self.copy_entities:
+            return [None if entity is None or entity is _MISSING else copy.deepcopy(entity) for entity in entities]
+
+        return [None if entity is _MISSING else entity for entity in entities]
+
+    def set_multi(self, entities):
+        """Caches a dict of key -> entity (None for ids that don't exist)"""
+        found = dict((key, entity) for key, entity in entities.iteritems() if entity is not None)
+        not_found = dict((key, _MISSING) for key, entity in entities.iteritems() if entity is None)
+        if not self.negative_ttl:
+            not_found = {}
+
+        for key, value in found.iteritems():
+            self.local.set(key, value, self.ttl)
+        for key, value in not_found.iteritems():
+            self.local.set(key, value, self.negative_ttl)
+
+        if self.backend is not None:
+            for mapping, ttl in ((found, self.ttl), (not_found, self.negative_ttl)):
+                if mapping:
+                    self.backend.set_multi(dict((self.backend_key(key), value) for key, value in mapping.iteritems()),
+                                           time=ttl or 0, key_prefix=self.key_prefix)
+
+    def delete_multi(self, keys):
+        """Invalidates the cached entities of keys (e.g. after they're updated)"""
+        self.local.delete_multi(keys)
+        if self.backend is not None:
+            self.backend.delete_multi([self.backend_key(key) for key in keys], key_prefix=self.key_prefix)
+
+    def _set_local(self, key, value):
+        self.local.set(key, value, self.negative_ttl if value is _MISSING else self.ttl)
+
+    @property
+    def stats(self):
+        return dict(local_hits=self.local_hits, backend_hits=self.backend_hits, negative_hits=self.negative_hits,
+                    misses=self.misses, hits=self.local_hits + self.backend_hits)
+
+
+class EntityIDArgument(BatchedType):
+    """
+    Converts an entity id into the entity (or its key, if key_only).
+
+    When parsed by a RequestParser, the entities of all the entity arguments sharing a client
+    (arguments created without one share the default client) and cache are fetched with a
+    single get_multi call. Pass an :class:`EntityCache` to look
+    entities up in it before going to the datastore.
+    With :meth:`~webapp2_restful.reqparse.RequestParser.parse_args_async`, uncached entities are
+    fetched with the client's get_multi_async, if it has one.
+    """
+    def __init__(self, kind, key_only=False, is_base64=False, client=None, cache=None):
         self.kind = kind
         self.key_only = key_only
         self.is_base64 = is_base64
+        self.client = client or get_default_client()
+        self.cache = cache
 
-    def __call__(self, entity_id):
+    @property
+    def batch_group(self):
+        return None if self.key_only else (self.client, self.cache)
+
+    def prepare(self, entity_id):
         if self.is_base64:
             entity_id = base64.urlsafe_b64decode(str(entity_id))
 
+        return self.client.key(self.kind, entity_id)
+
+    def resolve_batch(self, keys):
+        if self.cache is None:
+            return self.client.get_multi(keys)
+
+        return self.cache.get_multi(keys, self.client.get_multi)
+
+    def resolve_batch_async(self, keys):
+        """Returns futures of the entities when there's no cache and the client has get_multi_async"""
+        if self.cache is None and hasattr(self.client, 'get_multi_async'):
+            return self.client.get_multi_async(keys)
+
+        return self.resolve_batch(keys)
+
+    def __call__(self, entity_id):
         if self.key_only:
-            return ndb.Key(self.kind, entity_id)
-        else:
-            return ndb.Key(self.kind, entity_id).get()
+            return self.prepare(entity_id)
+
+        return super(EntityIDArgument, self).__call__(entity_id)
 
 
 class EntityLongIDArgument(EntityIDArgument):
-    def __call__(self, entity_id):
-        return super(EntityLongIDArgument, self).__call__(long(entity_id))
+    def prepare(self, entity_id):
+        return super(EntityLongIDArgument, self).prepare(long(entity_id))
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Extracts the values of a set of top-level keys from a JSON object read from a stream,
+without decoding (or holding in memory) the rest of the document.
+"""
+import json
+import re
+from json.decoder import scanstring
+
+__author__ = 'ekampf'
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_STRUCTURAL = re.compile(r'[,{}\[\]"]')
+
+
+class _StreamReader(object):
+    """A window over a stream. Data before the offset passed to :meth:`fill` is discarded when reading more."""
+
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+
+    def fill(self, keep_from):
+        """Reads another chunk, dropping the buffered data before keep_from. Returns how much
+        offsets into the buffer moved by, or None at the end of the stream.
+        """
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            return None
+
+        self.buf = self.buf[keep_from:] + chunk
+        self.pos -= keep_from
+        return keep_from
+
+    def read_rest(self):
+        return self.buf[self.pos:] + self.stream.read()
+
+    def skip_whitespace(self):
+        """Moves past whitespace and returns the next character ('' at the end of the stream)"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+
+            if self.fill(self.pos) is None:
+                return ''
+
+    def read_string(self, encoding):
+        start = self.pos
+        while True:
+            try:
+                value, self.pos = scanstring(self.buf, start + 1, encoding, True)
+                return value
+            except ValueError:
+                # Most likely the string continues in the next chunk
+                self.pos = start
+                shift = self.fill(start)
+                if shift is None:
+                    raise
+
+                start -= shift
+
+    def scan_value(self, keep):
+        """Finds the end of the value starting at pos, which ends at a ',' or '}' outside of any
+        nested value or string. Returns its (start, end) offsets into the buffer when keep is set;
+        otherwise the value's data is discarded as it's scanned and nothing is returned.
+        """
+        start = pos = self.pos
+        buf = self.buf
+        depth = 0
+        in_string = False
+
+        while True:
+            if in_string:
+                # str.find is much faster than a regular expression on long strings
+                quote = buf.find('"', pos)
+                backslash = buf.find('\\', pos, len(buf) if quote == -1 else quote)
+                if backslash != -1:
+                    if backslash + 1 < len(buf):
+                        pos = backslash + 2
+                        continue
+
+                    # Keep the backslash so the escaped character is skipped after reading more
+                    pos = backslash
+                elif quote != -1:
+                    in_string = False
+                    pos = quote + 1
+                    continue
+                else:
+                    pos = len(buf)
+            else:
+                match = _STRUCTURAL.search(buf, pos)
+                if match is not None:
+                    char = buf[match.start()]
+                    if char == '"':
+                        in_string = True
+                    elif char == '{' or char == '[':
+                        depth += 1
+                    elif depth:
+                        if char != ',':
+                            depth -= 1
+                    else:
+                        self.pos = match.start()
+                        return (start, self.pos) if keep else None
+
+                    pos = match.end()
+                    continue
+
+                pos = len(buf)
+
+            self.pos = pos
+            shift = self.fill(start if keep else pos)
+            if shift is None:
+                raise ValueError('Unexpected end of JSON body')
+
+            start -= shift
+            pos -= shift
+            buf = self.buf
+
+
+def extract_json_keys(stream, names, encoding='utf-8', chunk_size=DEFAULT_CHUNK_SIZE):
+    """Reads a JSON object from stream and returns a dict of its top-level keys that are in names.
+
+    The stream is read chunk_size bytes at a time. The values of the other keys are skipped
+    without being decoded or validated (only the structure of the document is tracked) and
+    without holding more than a chunk of them in memory. Documents that aren't JSON objects
+    are decoded whole, as json.loads would.
+
+    Raises ValueError if the document is malformed.
+    """
+    reader = _StreamReader(stream, chunk_size)
+    char = reader.skip_whitespace()
+    if char != '{':
+        return json.loads(reader.read_rest(), encoding)
+
+    result = {}
+    reader.pos += 1
+    char = reader.skip_whitespace()
+    if char == '}':
+        reader.pos += 1
+    else:
+        while True:
+            if char != '"':
+                raise ValueError('Expecting property name enclosed in double quotes')
+
+            key = reader.read_string(encoding)
+            if reader.skip_whitespace() != ':':
+                raise ValueError("Expecting ':' delimiter")
+
+            reader.pos += 1
+            if not reader.skip_whitespace():
+                raise ValueError('Unexpected end of JSON body')
+
+            if key in names:
+                start, end = reader.scan_value(keep=True)
+                result[key] = json.loads(reader.buf[start:end], encoding)
+            else:
+                reader.scan_value(keep=False)
+
+            char = reader.skip_whitespace()
+            reader.pos += 1
+            if char == '}':
+                break
+
+            if char != ',':
+                raise ValueError("Expecting ',' delimiter")
+
+            char = reader.skip_whitespace()
+
+    if reader.skip_whitespace():
+        raise ValueError('Extra data after the JSON object')
+
+    return result
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+import functools
+import hashlib
+import threading
+import time
+
+from webob import Response
+
+from webapp2_restful.cache import LRUCache
+from webapp2_restful.reqparse import RequestParser
+
+__author__ = 'ekampf'
+
+
+class ResponseCache(object):
+    """
+    Caches the full responses of handler actions (typically a :class:`~webapp2_restful.routes.ResourceRoute`'s
+    index/show) keyed by their parsed arguments. Ex::
+
+        responses = ResponseCache(ttl=30)
+
+        class PhotosHandler(webapp2.RequestHandler):
+            @responses.cached(photos_parser, resource='photos')
+            def index(self, args):
+                ...
+
+            @responses.invalidates('photos')
+            def create(self):
+                ...
+
+    Requests that parse to the same values (see :meth:`RequestParser.cache_key`) and have the
+    same route args share a cached response, whatever the order or encoding of their params.
+
+    Each resource's cached responses can be invalidated at once with :meth:`invalidate`:
+    the keys of a resource's responses include a generation number, stored in the backend,
+    which invalidating changes.
+
+    Responses are shared by all the requests that parse to the same values, so responses that
+    set cookies or have a private or no-store Cache-Control aren't cached, and strip_headers are
+    removed from the cached ones. Actions whose responses depend on who's asking (the current
+    user, an auth header...) have to say so with vary (see :meth:`cached`), e.g.
+    vary=('Authorization',) or vary=lambda request: current_user_id(request).
+
+    :param backend: Where responses are cached: an :class:`~webapp2_restful.cache.LRUCache` (the
+        default, holding max_size responses) or a client with a memcache-like get/set/delete
+        interface (e.g. App Engine's memcache module or :class:`~webapp2_restful.cache.LocalMemcache`)
+    :param ttl: Seconds responses are cached for (None to cache them until evicted/invalidated)
+    :param key_prefix: Prefix of the backend's keys
+    :param max_size: The size of the default LRUCache backend
+    :param strip_headers: Headers removed from cached responses, as they're specific to the
+        request that was cached (add e.g. request ids or per-user headers your app sets)
+    :param vary: The default vary of :meth:`cached`
+    """
+    def __init__(self, backend=None, ttl=60, key_prefix='response:', max_size=1000,
+                 strip_headers=('Authentication-Info', 'Proxy-Authentication-Info'), vary=None):
+        self.backend = backend if backend is not None else LRUCache(max_size)
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self.strip_headers = frozenset(header.lower() for header in strip_headers)
+        self.vary = vary
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _set(self, key, value, ttl):
+        if ttl is None:
+            self.backend.set(key, value)
+        else:
+            self.backend.set(key, value, ttl)
+
+    def generation(self, resource):
+        """Returns the resource's current generation, starting a new one if it isn't cached"""
+        key = '%sgeneration:%s' % (self.key_prefix, resource)
+        generation = self.backend.get(key)
+        if generation is None:
+            # Time based so that a generation that was evicted isn't reused
+            generation = int(time.time() * 1000)
+            self._set(key, generation, None)
+
+        return generation
+
+    def invalidate(self, resource):
+        """Invalidates all the cached responses of resource"""
+        key = '%sgeneration:%s' % (self.key_prefix, resource)
+        generation = self.backend.get(key)
+        self._set(key, max(int(time.time() * 1000), (generation or 0) + 1), None)
+
+    def key(self, resource, action, args_key, route_args=(), route_kwargs=None, vary_key=None):
+        """Returns the backend key of a response"""
+        route = repr((tuple(route_args), sorted((route_kwargs or {}).items())))
+        digest = hashlib.sha1('%s\n%s\n%s\n%r' % (action, args_key, route, vary_key)).hexdigest()
+        return '%s%s:%s:%s' % (self.key_prefix, resource, self.generation(resource), digest)
+
+    def get(self, key):
+        """Returns the cached (status, headerlist, body) tuple of key, or None"""
+        cached = self.backend.get(key)
+        with self._lock:
+            if cached is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return cached
+
+    @staticmethod
+    def vary_key(vary, request):
+        """Returns what a response varies on for request: vary(request) if vary is callable, the values
+        of the request headers named in vary otherwise
+        """
+        if vary is None:
+            return None
+
+        if callable(vary):
+            return vary(request)
+
+        return tuple(request.headers.get(header) for header in vary)
+
+    @staticmethod
+    def cacheable(response):
+        """Returns whether a response can be shared with other requests: successful (200) responses
+        that don't set cookies and whose Cache-Control isn't private or no-store
+        """
+        if response.status_int != 200 or 'Set-Cookie' in response.headers or 'Set-Cookie2' in response.headers:
+            return False
+
+        cache_control = response.headers.get('Cache-Control', '').lower()
+        return not any(directive.split('=')[0].strip() in ('private', 'no-store')
+                       for directive in cache_control.split(','))
+
+    def set(self, key, response, ttl=None):
+        """Caches a webob response, without its strip_headers"""
+        headerlist = [(name, value) for name, value in response.headerlist if name.lower() not in self.strip_headers]
+        self._set(key, (response.status, headerlist, response.body), self.ttl if ttl is None else ttl)
+
+    def cached(self, parser, resource=None, ttl=None, methods=('GET',), pass_args=True, vary=None):
+        """Decorates a handler method to cache its responses.
+
+        The request is parsed with parser before looking the response up. Only responses that
+        can be shared are cached (see :meth:`cacheable`), and only for the given HTTP methods.
+        Errors raised while parsing propagate as usual.
+
+        The cached response is the one the method returns if it returns a webob Response, the
+        handler's response if it returns None. Methods that return anything else aren't cached.
+        Cached responses are replayed into the handler's response.
+
+        :param parser: The action's :class:`RequestParser`
+        :param resource: The resource name used for invalidation. Defaults to the handler class' name.
+        :param ttl: Overrides the cache's ttl
+        :param methods: The HTTP methods whose responses are cached
+        :param pass_args: Whether to pass the parsed args to the handler method (after self).
+            Otherwise the method has to parse the request itself.
+        :param vary: What else than the parsed args and route args responses depend on: a list of
+            request header names (e.g. ('Authorization',)) or a function of the request returning
+            a hashable key (e.g. the current user's id). Defaults to the cache's vary.
+        """
+        vary = self.vary if vary is None else vary
+
+        def decorator(method):
+            @functools.wraps(method)
+            def wrapper(handler, *args, **kwargs):
+                request = handler.request
+                parsed = parser.parse_args(request)
+                call_args = (parsed,) + args if pass_args else args
+                if request.method not in methods:
+                    return method(handler, *call_args, **kwargs)
+
+                name = resource or type(handler).__name__
+                key = self.key(name, method.__name__, RequestParser.cache_key(parsed), args, kwargs,
+                               self.vary_key(vary, request))
+                cached = self.get(key)
+                if cached is not None:
+                    status, headerlist, body = cached
+                    response = handler.response
+                    response.status = status
+                    response.headerlist = list(headerlist)
+                    response.body = body
+                    return None
+
+                result = method(handler, *call_args, **kwargs)
+                response = handler.response if result is None else result
+                if isinstance(response, Response) and self.cacheable(response):
+                    self.set(key, response, ttl)
+
+                return result
+
+            return wrapper
+
+        return decorator
+
+    def invalidates(self, *resources):
+        """Decorates a handler method (e.g. create/update/destroy) to invalidate the given resources'
+        cached responses after it returns without raising
+        """
+        def decorator(method):
+            @functools.wraps(method)
+            def wrapper(handler, *args, **kwargs):
+                result = method(handler, *args, **kwargs)
+                for resource in resources:
+                    self.invalidate(resource)
+
+                return result
+
+            return wrapper
+
+        return decorator
+
+    @property
+    def stats(self):
+        return dict(hits=self.hits, misses=self.misses)
@@ -1,5 +1,9 @@
-from webapp2 import Route
+import re
+import urllib
+
+from webapp2 import Route, _get_route_variables
 from webapp2_extras.routes import MultiRoute
+from webob import exc
 
 from inflection import singularize, pluralize
 
@@ -7,6 +11,97 @@ __author__ = 'ekampf'
 
 # pylint:disable=C0326,R0902
 
+class MethodDispatchRoute(Route):
+    """
+    A route that dispatches requests to a different handler method per HTTP method. Ex::
+
+        MethodDispatchRoute('/photos', PhotosHandler, dict(GET='index', POST='create'), name='photos')
+
+    The template is matched once per request and the handler method is then looked up by the
+    request's method. Matches return the method's own :class:`webapp2.Route` (see :attr:`method_routes`),
+    so ``route.handler_method`` is the handler method that is called. Requests with any other
+    method raise a 405 error built once per route, with an ``Allow`` header listing the route's
+    methods. webapp2's default matcher replaces it with an error of its own, use
+    :func:`allow_header_matcher` to respond with it.
+
+    :param template: The route template
+    :param handler: The handler class
+    :param handler_methods: A dict of HTTP method to handler method name
+    :param name: The route name (shared by all its methods for uri_for)
+    """
+    def __init__(self, template, handler, handler_methods, name=None, defaults=None, build_only=False, schemes=None):
+        super(MethodDispatchRoute, self).__init__(template, handler=handler, name=name, defaults=defaults,
+                                                  build_only=build_only, methods=sorted(handler_methods),
+                                                  schemes=schemes)
+        self.handler_methods = dict(handler_methods)
+        self.method_routes = dict((method, Route(template, handler=handler, handler_method=handler_method, name=name,
+                                                 defaults=defaults, build_only=build_only, methods=[method],
+                                                 schemes=schemes))
+                                  for method, handler_method in self.handler_methods.iteritems())
+        self.method_not_allowed = exc.HTTPMethodNotAllowed(headers=[('Allow', ', '.join(self.methods))])
+
+    def match(self, request):
+        """Matches the request, see :meth:`webapp2.Route.match`"""
+        match = self.regex.match(urllib.unquote(request.path))
+        if not match or self.schemes and request.scheme not in self.schemes:
+            return None
+
+        route = self.method_routes.get(request.method)
+        if route is None:
+            raise self.method_not_allowed
+
+        args, kwargs = _get_route_variables(match, self.defaults.copy())
+        return route, args, kwargs
+
+    def __repr__(self):
+        return '<MethodDispatchRoute(%r, %r, handler_methods=%r, name=%r)>' % (
+            self.template, self.handler, self.handler_methods, self.name)
+
+
+def allow_header_matcher(router, request):
+    """A :class:`webapp2.Router` matcher like webapp2's default one, except that when routes match
+    the path but not the method it raises the first such route's HTTPMethodNotAllowed error (e.g. a
+    :class:`MethodDispatchRoute`'s, with its Allow header) rather than a new one. Ex::
+
+        app = webapp2.WSGIApplication([ResourceRoute('photos', PhotosHandler)])
+        app.router.set_matcher(allow_header_matcher)
+    """
+    method_not_allowed = None
+    for route in router.match_routes:
+        try:
+            match = route.match(request)
+            if match:
+                return match
+        except exc.HTTPMethodNotAllowed as error:
+            method_not_allowed = method_not_allowed or error
+
+    if method_not_allowed is not None:
+        raise method_not_allowed
+
+    raise exc.HTTPNotFound()
+
+
+def _merge_routes(routes):
+    """Merges the routes that share a template, handler and name into :class:`MethodDispatchRoute`
+    objects, each in the position of the first route it merges. When routes share a method the first
+    one's handler method is used, as when matching them in order.
+    """
+    groups = []
+    by_key = {}
+    for route in routes:
+        key = (route.template, route.handler, route.name)
+        group = by_key.get(key)
+        if group is None:
+            group = by_key[key] = {}
+            groups.append((key, group))
+
+        for method in route.methods:
+            group.setdefault(method, route.handler_method)
+
+    return [MethodDispatchRoute(template, handler, handler_methods, name=name)
+            for (template, handler, name), handler_methods in groups]
+
+
 class ResourceRoute(MultiRoute):
     ALL_REST_ACTIONS = ['index', 'create', 'show', 'update', 'destroy']
 
@@ -48,6 +143,9 @@ class ResourceRoute(MultiRoute):
                                                                                      photo_id,
                                                                                      comment_id)
 
+        Routes that share a path are merged into a single :class:`MethodDispatchRoute` (e.g. /photos
+        for index and create), so a path is matched once whatever the request's method.
+
 
         :param name: The resource name. Has to be plural ('People', 'Posts', 'Users', ...)
         :param handler: The handler class to handle the resource
@@ -84,8 +182,9 @@ class ResourceRoute(MultiRoute):
         self.__actions        = [a if isinstance(a, tuple) else (str(a), 'GET') for a in self.__actions]
         self.__member_actions = [a if isinstance(a, tuple) else (str(a), 'GET') for a in self.__member_actions]
 
-        routes = self.__get_routes()
-        super(ResourceRoute, self).__init__(routes)
+        # One route per action, used to build the routes of resources this is a sub resource of
+        self.__action_routes = self.__get_routes()
+        super(ResourceRoute, self).__init__(_merge_routes(self.__action_routes))
 
     def __get_routes(self):
         singular_name = singularize(self.name).replace('-', '_')
@@ -116,7 +215,189 @@ class ResourceRoute(MultiRoute):
             routes.append(Route(resource_path + '/' + action_name, handler=self.__handler, handler_method=action_name.replace('-', '_'), methods=['OPTIONS', http_method], name="%s_%s" % (self.__name_prefix + singular_name, action_name)))
 
         for sub in self.__sub_resources:
-            for sub_route in sub.get_routes():
+            for sub_route in sub.__action_routes:
                 routes.append(Route(resource_path + sub_route.template, handler=sub_route.handler, handler_method=sub_route.handler_method, methods=sub_route.methods, name="%s_%s" % (self.__name_prefix + singular_name, sub_route.name)))
 
         return routes
+
+
+# A template segment that's a single placeholder: <name>, <name:regex> or <:regex>
+_PLACEHOLDER_RE = re.compile(r'^<([a-zA-Z_]\w*)?(?::([^>]*))?>$')
+
+# Placeholder regexes that can only match within a path segment (they can't match a '/')
+_SEGMENT_REGEX_RE = re.compile(r'^(?:[A-Za-z0-9_\-\[\]+*?{},|()]|\\[dw])*$')
+
+_DEFAULT_SEGMENT_REGEX = '[^/]+'
+
+
+def _parse_segments(template):
+    """Returns the segments of a Route template as a list of static strings and (name, match) tuples for
+    placeholders (match is None for placeholders matching any segment), or None if the template has
+    placeholders that aren't whole path segments or that may match across segments.
+    """
+    segments = []
+    for part in template.split('/'):
+        if '<' not in part and '>' not in part:
+            segments.append(part)
+            continue
+
+        placeholder = _PLACEHOLDER_RE.match(part)
+        if placeholder is None:
+            return None
+
+        name, regex = placeholder.groups()
+        if not regex or regex == _DEFAULT_SEGMENT_REGEX:
+            segments.append((name, None))
+        elif _SEGMENT_REGEX_RE.match(regex):
+            segments.append((name, re.compile('(?:%s)\\Z' % regex).match))
+        else:
+            return None
+
+    return segments
+
+
+def _matches_by_template(route):
+    """Returns whether route matches requests like webapp2.Route (by template, methods and schemes
+    only), i.e. it's a Route or MethodDispatchRoute that doesn't override match()
+    """
+    match = getattr(type(route), 'match', None)
+    return getattr(match, '__func__', None) in (Route.match.__func__, MethodDispatchRoute.match.__func__)
+
+
+class _RadixNode(object):
+    __slots__ = ('static', 'placeholders', 'routes')
+
+    def __init__(self):
+        self.static = {}
+        self.placeholders = []
+        self.routes = []
+
+    def child(self, segment):
+        if not isinstance(segment, tuple):
+            return self.static.setdefault(segment, _RadixNode())
+
+        for placeholder, node in self.placeholders:
+            if placeholder == segment:
+                return node
+
+        node = _RadixNode()
+        self.placeholders.append((segment, node))
+        return node
+
+
+class RadixRoute(MultiRoute):
+    """
+    Matches requests against a set of routes (e.g. a hierarchy of :class:`ResourceRoute` objects)
+    using a radix tree of their path segments, rather than trying each route's regex in turn. Ex::
+
+        app = webapp2.WSGIApplication([
+            RadixRoute([
+                ResourceRoute('photos', PhotosHandler, sub_resources=[...]),
+                ResourceRoute('users', UsersHandler),
+            ])
+        ])
+
+    A path is matched by walking down the tree one segment at a time, so matching takes time
+    proportional to the path's length rather than to the number of routes. Static segments are
+    dict lookups and placeholders match any segment, or a segment matching their regex.
+
+    Matches are the same as matching the routes in order: the first route (in the order of
+    get_match_routes()) whose template matches the path and that allows the request's method
+    and scheme wins, and HTTPMethodNotAllowed is raised when templates match but no route
+    allows the method (the first such :class:`MethodDispatchRoute`'s error, with its Allow
+    header). Routes whose placeholders aren't whole segments or may match across segments,
+    and routes that aren't :class:`webapp2.Route` or :class:`MethodDispatchRoute` instances
+    or override match() (e.g. to check the host or headers), are matched by calling their
+    match() in turn. Routes keep their names, so uri_for works as usual.
+    """
+    def __init__(self, routes):
+        super(RadixRoute, self).__init__(routes)
+        self._root = _RadixNode()
+        self._fallback = []
+
+        for order, route in enumerate(super(RadixRoute, self).get_match_routes()):
+            segments = _parse_segments(route.template) if _matches_by_template(route) else None
+            if segments is None:
+                self._fallback.append((order, route))
+                continue
+
+            node = self._root
+            for segment in segments:
+                node = node.child(segment)
+            node.routes.append((order, route))
+
+    def get_match_routes(self):
+        yield self
+
+    def match(self, request):
+        """Matches the request against the routes, see :meth:`webapp2.BaseRoute.match`"""
+        segments = urllib.unquote(request.path).split('/')
+        candidates = []
+        self._collect(self._root, segments, 0, [], candidates)
+
+        best = None
+        not_allowed = None
+        method = request.method
+        for order, route, values in candidates:
+            if best is not None and order > best[0]:
+                continue
+
+            if route.schemes and request.scheme not in route.schemes:
+                continue
+
+            if route.methods and method not in route.methods:
+                if not_allowed is None or order < not_allowed[0]:
+                    not_allowed = (order, getattr(route, 'method_not_allowed', None))
+                continue
+
+            best = (order, route, values)
+
+        for order, route in self._fallback:
+            if best is not None and order > best[0]:
+                break
+
+            try:
+                result = route.match(request)
+            except exc.HTTPMethodNotAllowed as error:
+                if not_allowed is None or order < not_allowed[0]:
+                    not_allowed = (order, error)
+                continue
+
+            if result:
+                return result
+
+        if best is not None:
+            _, route, values = best
+            args = []
+            kwargs = dict(route.defaults)
+            for name, value in values:
+                if name:
+                    kwargs[name] = value
+                else:
+                    args.append(value)
+
+            if isinstance(route, MethodDispatchRoute):
+                route = route.method_routes[method]
+
+            return route, tuple(args), kwargs
+
+        if not_allowed is not None:
+            raise not_allowed[1] or exc.HTTPMethodNotAllowed()
+
+        return None
+
+    def _collect(self, node, segments, depth, values, candidates):
+        """Adds the (order, route, placeholder values) of the routes matching segments[depth:] under node"""
+        if depth == len(segments):
+            for order, route in node.routes:
+                candidates.append((order, route, values))
+            return
+
+        segment = segments[depth]
+        child = node.static.get(segment)
+        if child is not None:
+            self._collect(child, segments, depth + 1, values, candidates)
+
+        for (name, match), child in node.placeholders:
+            if (segment and match is None) or (match is not None and match(segment)):
+                self._collect(child, segments, depth + 1, values + [(name, segment)], candidates)